@@ -0,0 +1,124 @@
+import math
+
+import numpy as np
+
+# Solusi analitik untuk a = b = 0 (u, v, P, R konstan) dengan pelepasan sesaat di satu sel:
+# puff Gaussian yang bergerak dengan (u, v) dan melebar dengan P, R, tanpa iterasi waktu.
+#   c(x, y, t) = c_bg(x, t) + (c_rilis - c_in) gx(x, t) gy(y, t)
+# gx, gy adalah Gaussian yang dikonvolusi dengan sel pelepasan (lebar dx, dy), jadi untuk t kecil
+# nilainya mendekati field awal diskret, bukan puncak tak hingga dari sumber titik.
+# Boundary mengikuti analyze_stream / apply_bc:
+#   x = 0 ditahan nol   -> image negatif di -x0 dengan bobot exp(-u x0 / P) (eksak untuk adveksi-difusi setengah bidang),
+#                          background c_in berkurang dari hulu menurut solusi Ogata-Banks
+#   x = m (Neumann)     -> tanpa image, puff keluar dari domain seperti outflow
+#   y = 0, y = n        -> image cermin berulang (tebing sungai), eksak untuk v = 0, aproksimasi untuk v kecil
+# Karena x dan y terpisah, satu frame penuh hanya butuh O(nx + ny) evaluasi erf dan satu outer product.
+
+def exp_erfc(a, z):
+    # exp(a) * erfc(z) tanpa overflow untuk a <= z**2 (selalu benar pada suku Ogata-Banks)
+    if z < 5:
+        return math.exp(a) * math.erfc(z)
+    series = 1 - 1 / (2 * z**2) + 3 / (4 * z**4) - 15 / (8 * z**6)
+    return math.exp(a - z**2) / (z * math.sqrt(math.pi)) * series
+
+erf = np.frompyfunc(math.erf, 1, 1)
+
+def box_profile(coord, center, width, spread):
+    # Gaussian dengan simpangan spread = sqrt(2 D t) dikonvolusi dengan sel [center - width/2, center + width/2],
+    # bernilai 1 di dalam sel untuk spread -> 0
+    scale = math.sqrt(2) * spread
+    upper = np.asarray(erf((coord - center + width / 2) / scale), dtype=float)
+    lower = np.asarray(erf((coord - center - width / 2) / scale), dtype=float)
+    return 0.5 * (upper - lower)
+
+def get_constant(field, name):
+    field = np.asarray(field)
+    value = float(field.flat[0])
+    if field.min() != value or field.max() != value:
+        raise ValueError(f"The analytical solution needs a constant {name} field, set a = 0 and b = 0 and do not use rasters.")
+    return value
+
+def get_coefficients(u, v, P, R):
+    # u, v, P, R: angka atau field konstan
+    u, v, P, R = get_constant(u, "u"), get_constant(v, "v"), get_constant(P, "P"), get_constant(R, "R")
+    if P <= 0 or R <= 0:
+        raise ValueError("The analytical solution needs positive diffusion coefficients P0 and R0.")
+    return u, v, P, R
+
+class GaussianPuff:
+    # c0: field awal (background c_in + satu sel pelepasan seperti get_initial_field)
+    def __init__(self, u, v, P, R, c0, x_grid, y_grid):
+        self.u, self.v, self.P, self.R = get_coefficients(u, v, P, R)
+        self.x_grid = np.asarray(x_grid, dtype=float)
+        self.y_grid = np.asarray(y_grid, dtype=float)
+        self.width = self.y_grid[-1]
+
+        c0 = np.asarray(c0, dtype=np.float64)
+        self.c_in = float(c0[-1, -1]) # get_x_y_input tidak pernah menaruh pelepasan di tepi
+        release = np.flatnonzero(c0 != self.c_in)
+        if len(release) != 1:
+            raise ValueError("The analytical solution needs a uniform background with a single release cell.")
+        self.x_in, self.y_in = np.unravel_index(release[0], c0.shape)
+        self.x0, self.y0 = self.x_grid[self.x_in], self.y_grid[self.y_in]
+        self.c0 = c0
+        self.delta_x = self.x_grid[1] - self.x_grid[0]
+        self.delta_y = self.y_grid[1] - self.y_grid[0]
+        self.excess = c0[self.x_in, self.y_in] - self.c_in
+
+    def gx(self, x, time):
+        spread = math.sqrt(2 * self.P * time)
+        main = box_profile(x, self.x0 + self.u * time, self.delta_x, spread)
+        image = box_profile(x, -self.x0 + self.u * time, self.delta_x, spread)
+        return main - math.exp(-self.u * self.x0 / self.P) * image
+
+    def gy(self, y, time):
+        spread = math.sqrt(2 * self.R * time)
+        center = self.y0 + self.v * time
+        # image secukupnya sampai sebaran 6 sigma tercakup
+        n_images = int(math.ceil(6 * spread / (2 * self.width))) + 1
+        total = np.zeros(np.shape(y))
+        for n in range(-n_images, n_images + 1):
+            offset = 2 * n * self.width
+            total += box_profile(y, offset + center, self.delta_y, spread) + box_profile(y, offset - center, self.delta_y, spread)
+        return total
+
+    def background(self, x, time):
+        # c_in awal, air bersih (c = 0) masuk dari x = 0
+        x = np.asarray(x, dtype=float)
+        if self.c_in == 0:
+            return np.zeros(x.shape)
+        root = 2 * math.sqrt(self.P * time)
+        inflow = [0.5 * math.erfc((xi - self.u * time) / root) + 0.5 * exp_erfc(self.u * xi / self.P, (xi + self.u * time) / root)
+                  for xi in x.ravel()]
+        return self.c_in * (1 - np.reshape(inflow, x.shape))
+
+    def concentration(self, x, y, time):
+        # x, y dalam meter dan di-broadcast (misalnya (nx, 1) dan (1, ny)), time dalam detik
+        if time <= 0:
+            raise ValueError("Use the initial field for time 0.")
+        return self.background(x, time) + self.excess * self.gx(x, time) * self.gy(y, time)
+
+    def frame(self, time):
+        if time <= 0:
+            return self.c0.copy()
+        return self.concentration(self.x_grid[:, None], self.y_grid[None, :], time)
+
+    def history(self, times, i, j):
+        # riwayat di sel (i, j) untuk setiap waktu di times
+        return np.array([self.c0[i, j] if time <= 0 else float(self.concentration(self.x_grid[i], self.y_grid[j], time)) for time in times])
+
+    def fill(self, delta_t, steps, frames, probe_points, probe_history, record_steps, transect_data):
+        # mengisi buffer yang dialokasikan analyze_stream untuk step > 0 (step 0 sudah diisi dari c0)
+        for n, k in enumerate(steps):
+            if k > 0:
+                frames[n] = self.frame(k * delta_t)
+        times = np.arange(len(probe_history)) * delta_t
+        for n, (i, j) in enumerate(probe_points):
+            probe_history[1:, n] = self.history(times[1:], i, j)
+        for k in record_steps:
+            if k == 0:
+                continue
+            for data in transect_data:
+                ix, iy = data['cells']
+                data['values'][len(data['steps'])] = self.concentration(self.x_grid[ix], self.y_grid[iy], k * delta_t)
+                data['steps'].append(int(k))
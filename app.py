@@ -2,22 +2,372 @@ import streamlit as st
 import numpy as np
 
 from simulation import (
-    get_uv, get_pr, 
+    get_fields,
+    get_snapshot_every,
     get_delta_t, 
     check_stability,
-    get_meshgrid, 
     get_x_y_input,
-    analyze, 
+    analyze_stream,
+    get_stream_result,
+    get_probe_result,
+    get_monitoring_points,
+    get_probe_labels,
+    concentration_at_probes,
+    concentration_along_transect,
+    probes_to_csv,
+    transect_to_csv,
     concentration_at_target_point, 
     concentration_at_y_across_x, 
+    get_target_point_stats,
+    target_point_chart,
+    transect_chart,
+    figure_png,
+    CHART_POINTS,
+    ANIMATION_CSS,
     show_animation,
-    export_gif
+    export_animation,
+    check_precision,
+    check_reference,
+    SPINUP_CELLS
 )
+from cache import ResultCache, simulation_key, QUERY_KEYS
+from query import RunQuery, retarget_result
+from analytic import get_coefficients
+from instrument import Profiler, configure_logging, log_event, array_info
+from jobs import JobManager
 import tutorial
 import ui
-import io
+import os
+import logging
+from functools import partial
+import plotly.graph_objects as go
 from datetime import datetime
 
+# semua yang dihasilkan satu run (field, hasil analyze, figure, animasi), disimpan di ResultCache
+CACHED_KEYS = [
+    'analyzed', 'run_info', 'stream_result', 'store_path',
+    'xi', 'yi', 'xi_coordinate', 'yi_coordinate', 'xt', 'yt', 'grid_x', 'grid_y',
+    'target_chart', 'transect_chart', 'target_png', 'transect_png',
+    'max_concentration', 'max_concentration_idx', 'max_concentration_t', 'delta_t', 'end_time',
+    'xt_coordinate', 'yt_coordinate', 'stop_reason', 'stop_step',
+    'probe_fig', 'probe_csv', 'transect_outputs',
+    'animation_fig', 'animation_html', 'animation_frames', 'worst'
+]
+
+@st.cache_resource
+def get_result_cache():
+    # satu cache untuk semua sesi di server, batas byte bisa diatur lewat environment variable
+    return ResultCache(
+        memory_bytes=int(float(os.environ.get("HYDROVISION_CACHE_MEMORY_MB", 256)) * 2**20),
+        disk_bytes=int(float(os.environ.get("HYDROVISION_CACHE_DISK_MB", 1024)) * 2**20),
+        cache_dir=os.environ.get("HYDROVISION_CACHE_DIR", os.path.join(".cache", "results"))
+    )
+
+@st.cache_resource
+def get_job_manager():
+    # satu executor untuk semua sesi di server, jumlah job bersamaan dan antrean dibatasi
+    return JobManager(
+        max_workers=int(os.environ.get("HYDROVISION_MAX_JOBS", 2)),
+        max_queued=int(os.environ.get("HYDROVISION_MAX_QUEUED_JOBS", 4)),
+        keep_seconds=float(os.environ.get("HYDROVISION_JOB_KEEP_SECONDS", 600))
+    )
+
+configure_logging()
+
+def cancel_job():
+    if "job_id" in st.session_state:
+        get_job_manager().cancel(st.session_state.job_id)
+
+def live_heatmap(field, k, delta_t):
+    fig = go.Figure(data=[go.Heatmap(z=np.rot90(np.flipud(field), k=-1), colorscale='Inferno')])
+    fig.update_layout(title=f"t = {k * delta_t:.2f}s", height=400, margin=dict(l=10, r=10, t=40, b=10))
+    return fig
+
+def field_heatmap(field, x, y, title, colorbar_title):
+    fig = go.Figure(data=[go.Heatmap(z=np.rot90(np.flipud(field), k=-1), x=x, y=y, colorscale='Inferno', colorbar=dict(title=colorbar_title))])
+    fig.update_layout(title=title, xaxis_title="x (m)", yaxis_title="y (m)", height=400, margin=dict(l=10, r=10, t=40, b=10))
+    return fig
+
+def get_outputs(result, run_info, profiler, animate=True):
+    # semua yang ditampilkan halaman Analyze untuk satu run, tanpa memanggil st.* agar bisa berjalan di thread job
+    c, c_history, c_x_history, frame_steps = get_stream_result(result)
+    t = result['last_step']
+    params = run_info['params']
+    x, y = run_info['x'], run_info['y']
+    delta_t = run_info['delta_t']
+    grid_x, grid_y = run_info['grid_x'], run_info['grid_y']
+    xt, yt = params['xt'], params['yt']
+    x_in_coordinate, y_in_coordinate = run_info['x_in_coordinate'], run_info['y_in_coordinate']
+    xt_coordinate, yt_coordinate = run_info['xt_coordinate'], run_info['yt_coordinate']
+    chart_points = int(params.get('chart_points', CHART_POINTS))
+    chart_decimation = params.get('chart_decimation', 'minmax')
+    with profiler.stage("plots", history_length=len(c_history), chart_points=chart_points):
+        max_concentration, max_concentration_idx, max_concentration_t, delta_t, end_time = get_target_point_stats(t, delta_t, c_history)
+        target_chart = target_point_chart(t, delta_t, c_history, xt_coordinate, yt_coordinate, chart_points, chart_decimation)
+        c_x_history = {step: np.array(values) for step, values in c_x_history.items()}
+        x_transect_chart = transect_chart(c_x_history, x, yt_coordinate, chart_points, chart_decimation)
+    # PNG Matplotlib dibuat saat tombol download ditekan, bukan di setiap run
+    target_png = partial(figure_png, concentration_at_target_point, t, delta_t, np.array(c_history), xt_coordinate, yt_coordinate, chart_points, chart_decimation)
+    transect_png = partial(figure_png, concentration_at_y_across_x, c_x_history, x, yt_coordinate, chart_points, chart_decimation)
+    outputs = {'analyzed': True}
+
+    outputs['xi'] = params['x0']
+    outputs['yi'] = params['y0']
+    outputs['xi_coordinate'] = x_in_coordinate
+    outputs['yi_coordinate'] = y_in_coordinate
+
+    outputs['xt'] = xt
+    outputs['yt'] = yt
+    outputs['grid_x'] = grid_x
+    outputs['grid_y'] = grid_y
+
+    outputs['target_chart'] = target_chart
+    outputs['max_concentration'] = max_concentration
+    outputs['max_concentration_idx'] = max_concentration_idx
+    outputs['max_concentration_t'] = max_concentration_t
+    outputs['delta_t'] = delta_t
+    outputs['end_time'] = end_time
+    outputs['xt_coordinate'] = xt_coordinate
+    outputs['yt_coordinate'] = yt_coordinate
+
+    outputs['transect_chart'] = x_transect_chart
+    outputs['target_png'] = target_png
+    outputs['transect_png'] = transect_png
+    outputs['store_path'] = run_info.get('store_path')
+    outputs['stop_reason'] = result.get('stop_reason')
+    outputs['stop_step'] = result.get('stop_step')
+
+    # titik pantau dan transect tambahan (probe 0 dan transect 0 adalah target, sudah ada di grafik target dan transect x)
+    probe_history, probe_points = get_probe_result(result)
+    outputs['probe_fig'] = None
+    outputs['probe_csv'] = None
+    if len(probe_points) > 1:
+        probe_labels = get_probe_labels(probe_points, x, y)
+        outputs['probe_fig'] = concentration_at_probes(delta_t, probe_history, probe_labels)
+        outputs['probe_csv'] = probes_to_csv(delta_t, probe_history, probe_labels)
+    outputs['transect_outputs'] = [
+        (transect['name'], concentration_along_transect(transect, x, y), transect_to_csv(transect, x, y, delta_t))
+        for transect in result['transects'][1:]
+    ]
+    query = RunQuery.from_result(result, x, y, delta_t)
+    outputs['worst'] = query.worst(exclude=[query.nearest_cell(x_in_coordinate, y_in_coordinate)])
+
+    if not animate:
+        return outputs
+
+    with profiler.stage("animation", frames=len(c)) as record:
+        animation_fig, html_buf, animation_frames = show_animation(
+            c, delta_t, x, y, frame_steps,
+            max_frames=params.get('max_frames'),
+            frame_sampling=params.get('frame_sampling', 'uniform'),
+            max_cells=params.get('max_cells'),
+            quantize=None if params.get('quantize', 'full') == 'full' else params['quantize']
+        )
+        record['html_bytes'] = len(html_buf.getvalue())
+        outputs['animation_fig'] = animation_fig
+        outputs['animation_html'] = html_buf
+        outputs['animation_frames'] = animation_frames
+    return outputs
+
+def store_results(result, run_info, profiler, animate=True):
+    st.session_state.update(get_outputs(result, run_info, profiler, animate))
+
+def simulation_job(job, run_info, c, xt_idx, yt_idx, profiler, probes=None, transects=None, resume=None):
+    # berjalan di thread JobManager: tidak menyentuh st.session_state, hasilnya disalin oleh collect_job
+    params = run_info['params']
+    t = int(params['t'])
+    u, v, P, R = run_info['fields']
+    delta_x = params['len_x'] / (run_info['grid_x'] - 1)
+    delta_y = params['len_y'] / (run_info['grid_y'] - 1)
+    start = resume['checkpoint']['step'] if resume is not None else 0
+    solver = params.get('solver', 'ftcs')
+    live = bool(params.get('live'))
+    result = {}
+    # stream_every selalu diisi agar progress dan pembatalan diperiksa sekitar 50 kali per run
+    stream = analyze_stream(t, c, P, R, u, v, delta_x, delta_y, run_info['delta_t'], xt_idx, yt_idx,
+                            snapshot_every=get_snapshot_every(params), solver=solver, backend=params.get('backend', 'numpy'),
+                            stream_every=max(1, (t - start) // 50), result=result, store_path=run_info.get('store_path'),
+                            store_meta={'params': params}, stop_criteria=params.get('stop_criteria'), probes=probes, transects=transects,
+                            active_region=params.get('active_region', False), resume=resume, track_peaks=True)
+    with profiler.stage("stepping", t=t, resumed_from=start, solver=solver, backend=params.get('backend', 'numpy'), live=live) as record:
+        for k, field, c_history in stream:
+            job.report((k - start) / max(t - start, 1), f"Step {k} of {t}", preview=(k, run_info['delta_t'], field, np.array(c_history)) if live else None)
+            if job.cancelled():
+                break
+        stream.close() # checkpoint dan store ditulis sampai step terakhir yang sudah dihitung
+        record['steps_computed'] = result['last_step'] - start
+        record['active_full_step'] = result['active_full_step']
+        record['arrays'] = array_info(frames=result['frames'])
+    if tuple(result['probes'][0]) != (xt_idx, yt_idx):
+        # lanjutan dari hasil retarget: probe asli yang direkam, target dibaca ulang dari frame run gabungan
+        with profiler.stage("retarget", xt=int(xt_idx), yt=int(yt_idx)) as record:
+            query = RunQuery.from_result(result, run_info['x'], run_info['y'], run_info['delta_t'])
+            result = retarget_result(result, int(xt_idx), int(yt_idx), query)
+            record['exact'] = bool(result['target_exact'])
+    job.report(1.0, "Building the plots and the animation...")
+    return {'run_info': run_info, 'stream_result': result, 'outputs': get_outputs(result, run_info, profiler), 'profiler': profiler}
+
+def submit_simulation(*args, **kwargs):
+    # session_state hanya menyimpan job_id, job lama sesi ini dibatalkan
+    job_manager = get_job_manager()
+    if "job_id" in st.session_state:
+        job_manager.cancel(st.session_state.pop("job_id"))
+    try:
+        st.session_state.job_id = job_manager.submit(simulation_job, *args, name="simulation", **kwargs)
+    except RuntimeError as error:
+        st.warning(str(error))
+
+def collect_job(job, result_cache):
+    if job.status == "failed":
+        st.error(f"**Error!!**\n\nThe simulation failed: {job.error}")
+        return
+    if job.result is None:
+        st.info("The simulation was cancelled before it started.")
+        return
+    run_info = job.result['run_info']
+    st.session_state.run_info = run_info
+    st.session_state.stream_result = job.result['stream_result']
+    st.session_state.profiler = job.result['profiler']
+    st.session_state.update(job.result['outputs'])
+    st.session_state.from_cache = False
+    st.session_state.retargeted = False
+    if job.status == "cancelled":
+        # tombol cancel ditekan: hasil sampai step terakhir yang sudah dihitung, tidak disimpan di cache
+        st.info(f"Simulation stopped at iteration {job.result['stream_result']['last_step']}.")
+    elif run_info.get('store_path') is None:
+        # run yang disimpan ke disk (frame memmap di runs/) tidak disalin ke cache, selalu dijalankan ulang
+        result_cache.put(simulation_key(run_info['params']), {key: st.session_state[key] for key in CACHED_KEYS})
+
+@st.fragment(run_every=1.0)
+def show_job_progress():
+    job = get_job_manager().get(st.session_state.get("job_id"))
+    if job is None or job.done():
+        st.rerun()
+    st.progress(job.progress, text=job.message)
+    st.button("Cancel Simulation", on_click=cancel_job, use_container_width=True, type="secondary", disabled=job.cancelled())
+    if job.preview is not None:
+        k, delta_t, field, c_history = job.preview
+        col_live_1, col_live_2 = st.columns(2)
+        with col_live_1:
+            st.plotly_chart(live_heatmap(field, k, delta_t), key="live_heatmap")
+        with col_live_2:
+            st.line_chart(c_history, x_label="Iteration", y_label="Concentration at target")
+
+def job_progress(job, message, fraction):
+    # callback progress untuk core.analyze dan export_animation: False menghentikan pekerjaan setelah cancel
+    job.report(fraction, message)
+    return not job.cancelled()
+
+def precision_job(job, params):
+    try:
+        check = check_precision(params, progress=partial(job_progress, job, "Running the simulation in float32 and float64..."))
+    except ValueError as error:
+        check = {'error': str(error)}
+    return None if check is None else {'precision_check': check}
+
+def reference_job(job, params):
+    try:
+        check = check_reference(params, progress=partial(job_progress, job, "Running the simulation and evaluating the analytical solution..."))
+    except ValueError as error:
+        check = {'error': str(error)}
+    return None if check is None else {'reference_check': check}
+
+def export_job(job, stream_result, run_info, export_format, profiler):
+    c, _, _, frame_steps = get_stream_result(stream_result)
+    params = run_info['params']
+    with profiler.stage("export", format=export_format):
+        try:
+            data = export_animation(
+                c, run_info['delta_t'], run_info['x'], run_info['y'], frame_steps,
+                fmt=export_format,
+                max_frames=params.get('max_frames'),
+                frame_sampling=params.get('frame_sampling', 'uniform'),
+                progress=partial(job_progress, job, f"Generating {export_format.upper()}...")
+            )
+        except RuntimeError as error:
+            return {'animation_export_error': str(error)}
+    return None if data is None else {'animation_gif': data, 'animation_gif_format': export_format}
+
+def submit_task(key, func, *args):
+    # pekerjaan tambahan atas run yang sudah selesai (pemeriksaan, ekspor) lewat JobManager yang sama dengan simulasi,
+    # satu job per key per sesi. Hasil job berupa dict yang disalin ke session_state oleh collect_task
+    job_manager = get_job_manager()
+    tasks = st.session_state.setdefault("task_jobs", {})
+    if key in tasks:
+        job_manager.cancel(tasks.pop(key))
+    try:
+        tasks[key] = job_manager.submit(func, *args, name=key)
+    except RuntimeError as error:
+        st.warning(str(error))
+
+def cancel_task(key):
+    if key in st.session_state.get("task_jobs", {}):
+        get_job_manager().cancel(st.session_state.task_jobs[key])
+
+def cancel_tasks():
+    for key in list(st.session_state.get("task_jobs", {})):
+        get_job_manager().cancel(st.session_state.task_jobs.pop(key))
+
+@st.fragment(run_every=1.0)
+def show_task_progress(key):
+    job = get_job_manager().get(st.session_state.get("task_jobs", {}).get(key))
+    if job is None or job.done():
+        st.rerun()
+    st.progress(job.progress, text=job.message)
+    st.button("Cancel", on_click=cancel_task, args=(key,), key=f"cancel_{key}", use_container_width=True, type="secondary", disabled=job.cancelled())
+
+def collect_task(key):
+    # True selama job masih berjalan (progress ditampilkan di tempat pemanggil)
+    tasks = st.session_state.get("task_jobs", {})
+    if key not in tasks:
+        return False
+    job_manager = get_job_manager()
+    job = job_manager.get(tasks[key])
+    if job is None:
+        del tasks[key]
+        return False
+    if not job.done():
+        show_task_progress(key)
+        return True
+    job_manager.pop(tasks.pop(key))
+    if job.status == "failed":
+        st.error(f"**Error!!**\n\n{job.error}")
+    elif job.result is None:
+        st.info("Cancelled.")
+    else:
+        st.session_state.update(job.result)
+    return False
+
+def continue_run(extra_steps):
+    # lanjutkan run terakhir dari checkpoint-nya, hanya step tambahan yang dihitung
+    run_info = st.session_state.run_info
+    previous = st.session_state.stream_result
+    params = dict(run_info['params'])
+    params['t'] = previous['checkpoint']['step'] + int(extra_steps)
+    xt_idx, yt_idx = previous['probes'][0]
+    resume = previous
+    if 'recorded_probes' in previous:
+        # hasil retarget: riwayat target hanya interpolasi, yang dilanjutkan probe yang benar-benar direkam
+        resume = dict(previous, probes=previous['recorded_probes'], probe_history=previous['recorded_history'])
+    cancel_tasks()
+    st.session_state.pop("animation_gif", None)
+    submit_simulation(dict(run_info, params=params), None, xt_idx, yt_idx, Profiler(track_memory=params.get('profile_memory', False)), resume=resume)
+
+def retarget(params, profiler):
+    # hanya titik target (atau pengaturan grafik) yang berubah: riwayat dan transect target dibaca dari frame run terakhir,
+    # simulasi dan animasi tidak dijalankan ulang
+    run_info = st.session_state.run_info
+    x, y = run_info['x'], run_info['y']
+    _, _, _, _, xt_coordinate, yt_coordinate, xt_idx, yt_idx = get_x_y_input(x, params['x0'], y, params['y0'], params['xt'], params['yt'])
+    with profiler.stage("retarget", xt=int(xt_idx), yt=int(yt_idx)) as record:
+        query = RunQuery.from_result(st.session_state.stream_result, x, y, run_info['delta_t'])
+        result = retarget_result(st.session_state.stream_result, int(xt_idx), int(yt_idx), query)
+        record['exact'] = bool(result['target_exact'])
+    run_info = dict(run_info, params=params, xt_coordinate=xt_coordinate, yt_coordinate=yt_coordinate)
+    st.session_state.run_info = run_info
+    st.session_state.stream_result = result
+    store_results(result, run_info, profiler, animate=False)
+
 st.set_page_config(page_title="HydroVision", layout="wide")
 
 st.markdown(
@@ -51,95 +401,117 @@ else:
         params = ui.render_input_panel()
         ss3 = "\u00B3"
         st.write("")
+        result_cache = get_result_cache()
 
-        if st.button("Analyze and Run Simulation", use_container_width=True, type="primary"):
+        # exact_rerun: tombol di peringatan target interpolasi, simulasi dijalankan ulang tanpa retarget maupun cache
+        exact_rerun = st.session_state.pop("exact_rerun", False)
+        if st.button("Analyze and Run Simulation", use_container_width=True, type="primary") or exact_rerun:
             if "animation_gif" in st.session_state:
                 del st.session_state["animation_gif"]
-            grid_x = int(params['grid_x'])
-            grid_y = int(params['grid_y'])
-            t = int(params['t'])
-            c = np.zeros((t+1, grid_x, grid_y))
-            delta_x = params['len_x'] / (grid_x-1)
-            delta_y = params['len_y'] / (grid_y-1)
-            x, y, X, Y = get_meshgrid(c, delta_x, delta_y)
-            
-            u, v = get_uv(params['u0'], params['v0'], params['a'], params['b'], x, y)
-            P, R = get_pr(params['P0'], params['R0'], params['a'], params['b'], x, y)
-
-            delta_t = get_delta_t(u, v, delta_x, delta_y, P, R)
-            print("delta t =", delta_t)
-
-            stable, CFL, dt_diff_limit = check_stability(u, v, P, R, delta_x, delta_y, delta_t)
-
-            # advection = """
-            #                 Advection (Courant–Friedrichs–Lewy condition):
-            #                     |u| Δt / Δx  +  |v| Δt / Δy  ≤  1"""
-
-            # diffusion = """
-            #                 Diffusion stability:
-            #                     Δt  ≤  1 / ( 2 * ( P/Δx²  +  R/Δy² ) )"""
-
-            advection = " |u|·Δt/Δx  +  |v|·Δt/Δy  ≤  1 "
-            diffusion = " Δt ≤ 1 / ( 2·(P/Δx² + R/Δy²) ) "
-
-            if not stable:
-                st.error(f"**Error!!**\n\nComputed delta_t is unstable with the CFL value of {CFL} and delta t limit of {dt_diff_limit}. Adjust parameters. You can refer to the advection and diffusion stability formula below.\n\nAdvection (Courant–Friedrichs–Lewy condition):\n\n\t{advection}\n\nDiffusion stability:\n\n\t{diffusion}")
-                st.session_state.analyzed = False
+            st.session_state.pop("precision_check", None)
+            st.session_state.pop("reference_check", None)
+            st.session_state.pop("animation_export_error", None)
+            cancel_tasks()
+            cache_key = simulation_key(params)
+            profiler = Profiler(track_memory=params.get('profile_memory', False))
+            previous_params = st.session_state.run_info['params'] if st.session_state.get("analyzed") and "run_info" in st.session_state else None
+            # run yang disimpan ke disk selalu dijalankan ulang agar folder runs/ terisi
+            # run yang dihentikan dengan tombol stop belum lengkap, jadi tidak dipakai ulang
+            same_run = (not params.get('save_run') and not exact_rerun and previous_params is not None and simulation_key(previous_params) == cache_key
+                        and (st.session_state.stream_result['last_step'] == int(params['t']) or st.session_state.stream_result['stop_reason'] is not None))
+            with profiler.stage("cache_lookup") as record:
+                cached = None if params.get('save_run') or same_run or exact_rerun else result_cache.get(cache_key)
+                record['hit'] = cached is not None
+                record['same_run'] = same_run
+            if same_run or cached is not None:
+                # hasil langsung tersedia, tanpa job
+                st.session_state.profiler = profiler
+                st.session_state.retargeted = False
+            if same_run:
+                # simulasi sama dengan run terakhir di sesi ini, paling banyak titik target atau pengaturan grafik yang berubah
+                st.session_state.retargeted = any(previous_params.get(key) != params.get(key) for key in QUERY_KEYS)
+                st.session_state.from_cache = not st.session_state.retargeted
+                if st.session_state.retargeted:
+                    retarget(params, profiler)
+            elif cached is not None:
+                for key, value in cached.items():
+                    st.session_state[key] = value
+                st.session_state.from_cache = True
+                # entry cache bisa berasal dari run dengan titik target atau pengaturan grafik lain
+                cached_params = st.session_state.run_info['params']
+                if any(cached_params.get(key) != params.get(key) for key in QUERY_KEYS):
+                    retarget(params, profiler)
             else:
-                c[0, :, :] = np.ones_like(c[0, :, :]) * params.get('c_in', 0.1)
-                xt = params['xt']
-                yt = params['yt']
-                x_in_coordinate, y_in_coordinate, x_in, y_in, xt_coordinate, yt_coordinate, xt_idx, yt_idx = get_x_y_input(x, params['x0'], y, params['y0'], xt, yt)
-                c[0, x_in, y_in] = (params['m'] / params['Q'])
-                print(f"concentration at {x_in} {y_in}", c[0, x_in, y_in])
-                c, c_history, c_x_history = analyze(t, c, P, R, u, v, delta_x, delta_y, delta_t, xt_idx, yt_idx)
-                fig1, max_concentration, max_concentration_idx, max_concentration_t, delta_t, end_time = concentration_at_target_point(t, delta_t, c_history, xt_coordinate, yt_coordinate)
-                buf1 = io.BytesIO()
-                fig1.savefig(buf1, format="png")
-                buf1.seek(0)
-                fig2 = concentration_at_y_across_x(c_x_history, x, yt_coordinate)
-                buf2 = io.BytesIO()
-                fig2.savefig(buf2, format="png")
-                buf2.seek(0)
-                st.session_state.analyzed = True
-
-                st.session_state.xi = params['x0']
-                st.session_state.yi = params['y0']
-                st.session_state.xi_coordinate = x_in_coordinate
-                st.session_state.yi_coordinate = y_in_coordinate
-
-                st.session_state.xt = xt
-                st.session_state.yt = yt
-                st.session_state.grid_x = grid_x
-                st.session_state.grid_y = grid_y
-
-                st.session_state.fig1 = fig1
-                st.session_state.max_concentration = max_concentration
-                st.session_state.max_concentration_idx = max_concentration_idx
-                st.session_state.max_concentration_t = max_concentration_t
-                st.session_state.delta_t = delta_t
-                st.session_state.end_time = end_time
-                st.session_state.xt_coordinate = xt_coordinate
-                st.session_state.yt_coordinate = yt_coordinate
-
-                st.session_state.fig2 = fig2
-                st.session_state.buf1 = buf1
-                st.session_state.buf2 = buf2
-
-
-                
-                with st.spinner("Running simulation... please wait..."):
-                    animation_fig, html_buf, animation_frames = show_animation(c, delta_t, x, y)
-                    # st.write("")
-                    st.session_state.animation_fig = animation_fig
-                    st.session_state.animation_html = html_buf
-                    st.session_state.animation_frames = animation_frames
+                grid_x = int(params['grid_x'])
+                grid_y = int(params['grid_y'])
+                t = int(params['t'])
+                with profiler.stage("fields", grid_x=grid_x, grid_y=grid_y) as record:
+                    c = np.zeros((grid_x, grid_y), dtype=params.get('dtype', 'float64'))
+                    x, y, delta_x, delta_y, u, v, P, R = get_fields(params)
+                    record['arrays'] = array_info(u=u, v=v, P=P, R=R)
+
+                solver = params.get('solver', 'ftcs')
+                with profiler.stage("stability", solver=solver) as record:
+                    delta_t = get_delta_t(u, v, delta_x, delta_y, P, R, solver=solver)
+                    stable, CFL, dt_diff_limit = check_stability(u, v, P, R, delta_x, delta_y, delta_t, solver=solver)
+                    record.update(delta_t=float(delta_t), CFL=float(CFL), stable=bool(stable))
+
+                # advection = """
+                #                 Advection (Courant–Friedrichs–Lewy condition):
+                #                     |u| Δt / Δx  +  |v| Δt / Δy  ≤  1"""
+
+                # diffusion = """
+                #                 Diffusion stability:
+                #                     Δt  ≤  1 / ( 2 * ( P/Δx²  +  R/Δy² ) )"""
+
+                advection = " |u|·Δt/Δx  +  |v|·Δt/Δy  ≤  1 "
+                diffusion = " Δt ≤ 1 / ( 2·(P/Δx² + R/Δy²) ) "
+
+                analytic_error = None
+                if solver == "analytic":
+                    try:
+                        get_coefficients(u, v, P, R)
+                    except ValueError as error:
+                        analytic_error = str(error)
+
+                if analytic_error is not None:
+                    st.error(f"**Error!!**\n\n{analytic_error}")
+                    st.session_state.analyzed = False
+                elif not stable:
+                    st.error(f"**Error!!**\n\nComputed delta_t is unstable with the CFL value of {CFL} and delta t limit of {dt_diff_limit}. Adjust parameters. You can refer to the advection and diffusion stability formula below.\n\nAdvection (Courant–Friedrichs–Lewy condition):\n\n\t{advection}\n\nDiffusion stability:\n\n\t{diffusion}")
+                    st.session_state.analyzed = False
+                else:
+                    c[:, :] = np.ones_like(c) * params.get('c_in', 0.1)
+                    xt = params['xt']
+                    yt = params['yt']
+                    x_in_coordinate, y_in_coordinate, x_in, y_in, xt_coordinate, yt_coordinate, xt_idx, yt_idx = get_x_y_input(x, params['x0'], y, params['y0'], xt, yt)
+                    probes, transects = get_monitoring_points(params, x, y)
+                    c[x_in, y_in] = (params['m'] / params['Q'])
+                    log_event("release", logging.DEBUG, x_in=int(x_in), y_in=int(y_in), concentration=float(c[x_in, y_in]))
+                    run_info = {
+                        'params': params, 'x': x, 'y': y, 'delta_t': delta_t, 'grid_x': grid_x, 'grid_y': grid_y, 'fields': (u, v, P, R),
+                        'x_in_coordinate': x_in_coordinate, 'y_in_coordinate': y_in_coordinate,
+                        'xt_coordinate': xt_coordinate, 'yt_coordinate': yt_coordinate
+                    }
+                    run_info['store_path'] = os.path.join("runs", f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}") if params.get('save_run') else None
+                    submit_simulation(run_info, c, xt_idx, yt_idx, profiler, probes=probes, transects=transects)
+
+        # job simulasi sesi ini: tampilkan progress sampai selesai, lalu salin hasilnya ke session_state
+        if "job_id" in st.session_state:
+            job_manager = get_job_manager()
+            job = job_manager.get(st.session_state.job_id)
+            if job is None:
+                # job sudah dibuang (server dijalankan ulang atau hasil terlalu lama tidak diambil)
+                del st.session_state["job_id"]
+            elif job.done():
+                job_manager.pop(st.session_state.pop("job_id"))
+                collect_job(job, result_cache)
+            else:
+                show_job_progress()
 
         if "analyzed" in st.session_state and st.session_state.analyzed == True:
-            fig1 = st.session_state.fig1
-            fig2 = st.session_state.fig2
-            buf1 = st.session_state.buf1
-            buf2 = st.session_state.buf2
+            target_chart = st.session_state.target_chart
+            x_transect_chart = st.session_state.transect_chart
             fig = st.session_state.animation_fig
             html_buf = st.session_state.animation_html
 
@@ -162,31 +534,133 @@ else:
             yi_coordinate = st.session_state.yi_coordinate
             
             st.write("")
+            if st.session_state.get("from_cache"):
+                st.caption("These results were loaded from the result cache, an identical run was computed before.")
+            if st.session_state.get("retargeted"):
+                st.caption("Only the target point or chart options changed, so the results were read from the previous run without rerunning the simulation.")
+            if not st.session_state.get("stream_result", {}).get('target_exact', True):
+                snapshot_every = get_snapshot_every(st.session_state.run_info['params'])
+                st.warning(f"The history at this target point is interpolated between snapshots saved every {snapshot_every} iterations, so the highest concentration and its time may be understated. Rerun the simulation to record the exact history at this point.")
+                st.button("Rerun for the exact target history", on_click=st.session_state.update, kwargs={'exact_rerun': True}, use_container_width=True, type="secondary")
+            if st.session_state.get("stop_reason"):
+                stop_messages = {
+                    "steady_state": "the concentration field stopped changing",
+                    "plume_exit": "almost all of the released pollutant has left the river section",
+                    "target_decayed": "the concentration at the target point has peaked and decayed"
+                }
+                st.info(f"The simulation stopped early at iteration {st.session_state.stop_step} because {stop_messages[st.session_state.stop_reason]}.")
+            if st.session_state.get("store_path"):
+                st.caption(f"This run was saved to {st.session_state.store_path} (frames.npy and meta.json).")
+            run_params = st.session_state.run_info['params'] if "run_info" in st.session_state else {}
+            if "checkpoint" in st.session_state.get("stream_result", {}) and run_params.get('solver', 'ftcs') != "analytic":
+                with st.expander("Continue the simulation"):
+                    st.write(f"The run ended at iteration {st.session_state.stream_result['checkpoint']['step']}. You can continue it from there, only the additional iterations are computed.")
+                    extra_steps = st.number_input("Additional Iterations", min_value=1, max_value=4000, value=100)
+                    if st.button(f"Continue for {extra_steps} more steps", use_container_width=True, type="secondary"):
+                        continue_run(extra_steps)
+                        st.rerun()
+            if run_params.get('dtype') == "float32":
+                with st.expander("Precision check"):
+                    st.write("This run used single precision (float32). You can rerun the same parameters in double precision (float64) and compare the results.")
+                    if st.button("Compare with a float64 run", use_container_width=True, type="secondary"):
+                        st.session_state.pop("precision_check", None)
+                        submit_task("precision_check", precision_job, run_params)
+                    if collect_task("precision_check"):
+                        pass
+                    elif "error" in st.session_state.get("precision_check", {}):
+                        st.warning(st.session_state.precision_check['error'])
+                    elif st.session_state.get("precision_check", {}).get('dtype') == "float32":
+                        precision = st.session_state.precision_check
+                        col_p1, col_p2, col_p3 = st.columns(3)
+                        col_p1.metric("Max relative error at target", f"{precision['max_rel_error_target']:.2e}")
+                        col_p2.metric("Max relative error in final field", f"{precision['max_rel_error_field']:.2e}")
+                        col_p3.metric("Peak concentration error", f"{precision['peak_rel_error']:.2e}")
+                        if precision['agrees']:
+                            st.success(f"float32 agrees with float64 within a relative tolerance of {precision['rtol']:g}.")
+                        else:
+                            st.warning(f"float32 differs from float64 by more than {precision['rtol']:g}, use float64 for these parameters.")
+            if run_params.get('a') == 0 and run_params.get('b') == 0 and run_params.get('solver', 'ftcs') != "analytic":
+                with st.expander("Accuracy check"):
+                    st.write("With uniform velocity and diffusion (a = b = 0) the concentration has a closed-form solution (a Gaussian puff). You can compare this run with it at the same times.")
+                    if st.button("Compare with the analytical solution", use_container_width=True, type="secondary"):
+                        st.session_state.pop("reference_check", None)
+                        submit_task("reference_check", reference_job, run_params)
+                    if collect_task("reference_check"):
+                        pass
+                    elif "error" in st.session_state.get("reference_check", {}):
+                        st.warning(st.session_state.reference_check['error'])
+                    elif "reference_check" in st.session_state:
+                        reference = st.session_state.reference_check
+                        st.caption(f"Compared from step {reference['spinup_step']}, once the puff is at least {SPINUP_CELLS} grid cells wide; before that a single-cell release cannot match the analytical puff on this grid.")
+                        col_r1, col_r2, col_r3 = st.columns(3)
+                        col_r1.metric("Max relative error at target", f"{reference['max_rel_error_target']:.2e}")
+                        col_r2.metric("Max relative error in frames", f"{reference['max_rel_error_field']:.2e}")
+                        col_r3.metric("Peak concentration error", f"{reference['peak_rel_error']:.2e}")
+                        if reference['agrees']:
+                            st.success(f"The {reference['solver'].upper()} result agrees with the analytical solution within a relative tolerance of {reference['rtol']:g}.")
+                        else:
+                            st.warning(f"The {reference['solver'].upper()} result differs from the analytical solution by more than {reference['rtol']:g}. A finer grid, or the ADI scheme, usually reduces the error.")
             st.write(f"You have entered the release point ({xi}, {yi}) and target point ({xt}, {yt}). This program will automatically divide x and y into {grid_x} x grids and {grid_y} y grids, so the release and target points you entered may not be in the resulting grid. Therefore, the program will automatically search for the closest point to your release and target point. Based on your input, the release point will be at ({round(xi_coordinate,2)}, {round(yi_coordinate,2)}) and the target point will be at ({round(xt_coordinate,2)}, {round(yt_coordinate,2)})")
 
             col_1, col_2 = st.columns(2)
             with col_1:
-                st.pyplot(fig1)
+                st.plotly_chart(target_chart)
                 st.write(f"The plot above shows the concentration at the target point ({round(xt_coordinate,2)}, {round(yt_coordinate,2)}) throughout the iteration with a delta t of {round(delta_t, 5)} seconds, with a total time of {round(end_time, 5)} seconds. The highest concentration is {round(max_concentration,2)} kg/m{ss3} at t = {round(max_concentration_t,5)} second(s).")
                 st.download_button(
                     label="Download Plot 1 as PNG",
-                    data=buf1,
+                    data=st.session_state.target_png,
                     file_name=f"concentration_at_target_point_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png",
                     mime="image/png",
                     use_container_width=True
                 )
             with col_2:
-                st.pyplot(fig2)
+                st.plotly_chart(x_transect_chart)
                 st.write(f"The plot above shows the pollutant concentration along the river (x-axis) at y = {round(yt_coordinate,2)} at various timestamps.")
                 st.download_button(
                     label="Download Plot 2 as PNG",
-                    data=buf2,
+                    data=st.session_state.transect_png,
                     file_name=f"concentration_at_y_across_x_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png",
                     mime="image/png",
                     use_container_width=True
                 )
-            
+
+            if st.session_state.get("probe_fig") is not None or st.session_state.get("transect_outputs"):
+                st.subheader("Monitoring points and transects")
+                if st.session_state.get("probe_fig") is not None:
+                    st.pyplot(st.session_state.probe_fig)
+                    st.download_button(
+                        "Download Monitoring Point Histories (CSV)",
+                        data=st.session_state.probe_csv,
+                        file_name=f"monitoring_points_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
+                for name, transect_fig, transect_csv in st.session_state.get("transect_outputs", []):
+                    st.pyplot(transect_fig)
+                    st.download_button(
+                        f"Download {name} (CSV)",
+                        data=transect_csv,
+                        file_name=f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                        mime="text/csv",
+                        use_container_width=True,
+                        key=f"download_{name}"
+                    )
+
+            worst = st.session_state.get("worst")
+            if worst is not None:
+                st.subheader("Worst concentration in the river")
+                st.write(f"Away from the release point, the highest concentration anywhere in the river during the simulation is {worst['value']:.4g} kg/m{ss3}, reached at ({round(worst['x'],2)}, {round(worst['y'],2)}) at t = {round(worst['time'],5)} second(s).")
+                with st.expander("Peak and arrival time maps"):
+                    run_info = st.session_state.run_info
+                    query = RunQuery.from_result(st.session_state.stream_result, run_info['x'], run_info['y'], run_info['delta_t'])
+                    peak = query.peak_map()
+                    if peak is not None:
+                        st.plotly_chart(field_heatmap(peak, query.x, query.y, "Highest concentration reached in each cell", f"kg/m{ss3}"))
+                    threshold = st.number_input(f"Arrival Threshold above Background (kg/m{ss3})", min_value=0.0, value=float(f"{0.01 * worst['value']:.3g}"), format="%.4g")
+                    st.plotly_chart(field_heatmap(query.arrival_map(threshold), query.x, query.y, "Time the pollution first arrives (blank: never)", "s"))
+
             if "animation_fig" in st.session_state:
+                st.markdown(ANIMATION_CSS, unsafe_allow_html=True)
                 st.plotly_chart(st.session_state.animation_fig)
 
                 st.write("\n\n")
@@ -214,39 +688,48 @@ else:
                         type="secondary"
                     )
 
-                if "animation_gif" in st.session_state:
+                export_mime = {"gif": "image/gif", "webp": "image/webp", "mp4": "video/mp4"}
+                if collect_task("animation_export"):
+                    pass
+                elif "animation_gif" in st.session_state:
+                    export_format = st.session_state.get("animation_gif_format", "gif")
                     st.download_button(
-                        "Download GIF File",
+                        f"Download {export_format.upper()} File",
                         data=st.session_state.animation_gif,
-                        file_name="animation.gif",
-                        mime="image/gif",
+                        file_name=f"animation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}",
+                        mime=export_mime[export_format],
                         type="secondary",
                         use_container_width=True
                     )
-                elif "animation_fig" in st.session_state and "animation_frames" in st.session_state:
-                    if st.button("Generate GIF", use_container_width=True, type="secondary"):
-                        progress = st.progress(0)
-                        with st.spinner("Generating GIF... please wait. This might take a while."):
-                            gif_bytes = export_gif(
-                                st.session_state.animation_fig,
-                                st.session_state.animation_frames,
-                                progress=progress
-                            )
-
-                            st.session_state.animation_gif = gif_bytes
-
-                            st.success("GIF generated!")
-
-                            st.download_button(
-                                "Download GIF File",
-                                data=gif_bytes,
-                                file_name=f"animation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.gif",
-                                mime="image/gif",
-                                use_container_width=True,
-                                type="secondary"
-                            )
-                
-                
+                elif "stream_result" in st.session_state and "run_info" in st.session_state:
+                    if "animation_export_error" in st.session_state:
+                        st.error(st.session_state.pop("animation_export_error"))
+                    export_format = st.selectbox("Animation File Format", ["gif", "webp", "mp4"], format_func=str.upper)
+                    if st.button(f"Generate {export_format.upper()}", use_container_width=True, type="secondary"):
+                        profiler = st.session_state.get("profiler") or Profiler()
+                        submit_task("animation_export", export_job, st.session_state.stream_result, st.session_state.run_info, export_format, profiler)
+                        st.rerun()
+
+        if params.get('profile') and st.session_state.get("profiler") is not None:
+            with st.expander("Performance"):
+                records = st.session_state.profiler.records
+                st.write(f"Total measured time: {st.session_state.profiler.total():.3f} s over {len(records)} stages.")
+                st.dataframe([
+                    {
+                        'stage': record['stage'],
+                        'wall time (s)': round(record['wall_s'], 4),
+                        'CPU time (s)': round(record['cpu_s'], 4),
+                        'allocated peak (MB)': round(record['alloc_peak_bytes'] / 2**20, 2) if 'alloc_peak_bytes' in record else None,
+                        'array memory (MB)': round(sum(a['nbytes'] for a in record['arrays'].values()) / 2**20, 2) if 'arrays' in record else None
+                    } for record in records
+                ], use_container_width=True)
+                st.json(records, expanded=False)
+
+        with st.expander("Result cache statistics"):
+            st.json(result_cache.summary())
+
+        with st.expander("Background job statistics"):
+            st.json(get_job_manager().summary())
 
     elif page == "Help":
         ui.render_help()
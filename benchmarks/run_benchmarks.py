@@ -0,0 +1,185 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import get_uv, get_pr, get_delta_t, get_initial_field, DEFAULT_PARAMS, analyze
+from simulation import (
+    concentration_at_target_point,
+    concentration_at_y_across_x,
+    target_point_chart,
+    transect_chart,
+    show_animation,
+    export_animation,
+    export_gif
+)
+
+# Benchmark seluruh pipeline: field, analyze, plot, animasi dan ekspor, untuk matriks ukuran grid x iterasi.
+# Hasil ditulis sebagai JSON agar bisa dibandingkan antar commit:
+#   python benchmarks/run_benchmarks.py -o before.json
+#   python benchmarks/run_benchmarks.py -o after.json --compare before.json
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        # selain Linux: pakai puncak RSS proses (kB di Linux, byte di macOS)
+        scale = 2**20 if sys.platform == "darwin" else 2**10
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+class RSSSampler:
+    # mengukur puncak RSS selama satu stage dengan sampling di thread terpisah
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak_mb = current_rss_mb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+def measure(results, case, stage, func, **extra):
+    start_rss = current_rss_mb()
+    with RSSSampler() as sampler:
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        output = func()
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+    row = dict(case, stage=stage, wall_s=wall, cpu_s=cpu, peak_rss_mb=sampler.peak_mb, rss_increase_mb=sampler.peak_mb - start_rss)
+    row.update({k: v(output, wall) if callable(v) else v for k, v in extra.items()})
+    results.append(row)
+    print(f"{case['grid']:>5}^2 t={case['iterations']:<6} {stage:<28} {wall:8.3f} s  peak RSS {sampler.peak_mb:8.1f} MB", file=sys.stderr)
+    return output
+
+def run_case(grid, iterations, results, gif_frames, kaleido):
+    params = dict(DEFAULT_PARAMS, grid_x=grid, grid_y=grid, t=iterations)
+    case = {'grid': grid, 'iterations': iterations}
+    delta_x = params['len_x'] / (grid-1)
+    delta_y = params['len_y'] / (grid-1)
+    x = np.arange(grid) * delta_x
+    y = np.arange(grid) * delta_y
+
+    u, v = measure(results, case, "get_uv", lambda: get_uv(params['u0'], params['v0'], params['a'], params['b'], x, y))
+    P, R = measure(results, case, "get_pr", lambda: get_pr(params['P0'], params['R0'], params['a'], params['b'], x, y))
+    delta_t = get_delta_t(u, v, delta_x, delta_y, P, R)
+    c, points = get_initial_field(params, x, y)
+    _, _, _, _, xt_coordinate, yt_coordinate, xt_idx, yt_idx = points
+
+    snapshot_every = max(1, iterations // 100)
+    frames, c_history, c_x_history, steps = measure(
+        results, case, "analyze",
+        lambda: analyze(iterations, c, P, R, u, v, delta_x, delta_y, delta_t, xt_idx, yt_idx, snapshot_every=snapshot_every),
+        steps_per_s=lambda out, wall: iterations / wall
+    )
+
+    def target_plot():
+        fig = concentration_at_target_point(iterations, delta_t, c_history, xt_coordinate, yt_coordinate)[0]
+        fig.canvas.draw()
+    measure(results, case, "concentration_at_target_point", target_plot)
+
+    def transect_plot():
+        fig = concentration_at_y_across_x(c_x_history, x, yt_coordinate)
+        fig.canvas.draw()
+    measure(results, case, "concentration_at_y_across_x", transect_plot)
+
+    # grafik interaktif di app (Scattergl dengan data dikurangi), PNG di atas hanya dibuat saat download
+    measure(results, case, "target_point_chart", lambda: target_point_chart(iterations, delta_t, c_history, xt_coordinate, yt_coordinate))
+    measure(results, case, "transect_chart", lambda: transect_chart(c_x_history, x, yt_coordinate))
+
+    fig, html_buf, animation_frames = measure(
+        results, case, "show_animation",
+        lambda: show_animation(frames, delta_t, x, y, steps, max_frames=200, max_cells=150, quantize="uint8"),
+        html_bytes=lambda out, wall: len(out[1].getvalue())
+    )
+    measure(results, case, "export_animation_gif",
+            lambda: export_animation(frames, delta_t, x, y, steps, fmt="gif", max_frames=gif_frames),
+            gif_bytes=lambda out, wall: len(out.getvalue()))
+    if kaleido:
+        measure(results, case, "export_gif_kaleido",
+                lambda: export_gif(fig, animation_frames[:gif_frames]),
+                gif_bytes=lambda out, wall: len(out.getvalue()))
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = {(r['grid'], r['iterations'], r['stage']): r for r in baseline['results']}
+    regressions = 0
+    print(f"\n{'case':<20} {'stage':<30} {'before':>10} {'after':>10} {'ratio':>8}")
+    for row in results:
+        key = (row['grid'], row['iterations'], row['stage'])
+        if key not in old:
+            continue
+        ratio = row['wall_s'] / old[key]['wall_s'] if old[key]['wall_s'] > 0 else float('inf')
+        flag = "  REGRESSION" if ratio > 1 + threshold else ""
+        regressions += bool(flag)
+        print(f"{row['grid']}^2 t={row['iterations']:<10} {row['stage']:<30} {old[key]['wall_s']:10.4f} {row['wall_s']:10.4f} {ratio:8.2f}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the HydroVision pipeline from field construction to export.")
+    parser.add_argument("--grids", type=int, nargs="+", default=[50, 100, 300, 1000])
+    parser.add_argument("--iterations", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--gif-frames", type=int, default=50, help="frames to export in the GIF stages")
+    parser.add_argument("--kaleido", action="store_true", help="also time the slow Kaleido-based export_gif")
+    parser.add_argument("-o", "--output", default="benchmark_report.json")
+    parser.add_argument("--compare", help="earlier JSON report to compare wall times against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = []
+    for grid in args.grids:
+        for iterations in args.iterations:
+            run_case(grid, iterations, results, args.gif_frames, args.kaleido)
+
+    report = {
+        'meta': {
+            'commit': get_commit(),
+            'timestamp': datetime.now().isoformat(timespec="seconds"),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import hashlib
+import io
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Cache hasil simulasi berdasarkan hash parameter (content-addressed), dua tingkat:
+# memori (OrderedDict, LRU) dan disk (file pickle, LRU berdasarkan waktu akses).
+# Setiap tingkat punya batas byte sendiri, entry paling lama tidak dipakai dibuang lebih dulu.
+
+# key yang tidak mempengaruhi hasil simulasi
+IGNORED_KEYS = ('live', 'save_run', 'backend', 'profile', 'profile_memory', 'active_region')
+
+# key yang hanya memilih apa yang dibaca dari hasil dan cara menggambarnya, bukan apa yang disimulasikan
+QUERY_KEYS = ('xt', 'yt', 'chart_points', 'chart_decimation')
+
+# dinaikkan jika format hasil yang disimpan berubah, agar entry lama tidak dipakai lagi
+CACHE_VERSION = 5
+
+def params_key(params):
+    canonical = {k: v for k, v in params.items() if k not in IGNORED_KEYS}
+    canonical['_cache_version'] = CACHE_VERSION
+    # angka disamakan, 1 dan 1.0 menghasilkan key yang sama
+    canonical = {k: float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else v for k, v in canonical.items()}
+    text = json.dumps(canonical, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def simulation_key(params):
+    # key tanpa QUERY_KEYS: mengganti target atau grafik tidak mengubah simulasi, hasilnya dibaca ulang lewat query.RunQuery.
+    # Kecuali EarlyStop target_threshold: step berhenti ("target_decayed") bergantung pada titik target, jadi xt/yt ikut key
+    query_keys = QUERY_KEYS
+    if (params.get('stop_criteria') or {}).get('target_threshold') is not None:
+        query_keys = tuple(key for key in QUERY_KEYS if key not in ('xt', 'yt'))
+    return params_key({k: v for k, v in params.items() if k not in query_keys})
+
+def estimate_nbytes(value):
+    # perkiraan ukuran pickle dari array numpy dan bytes di dalam value (dict, list, tuple), tanpa pickle.dumps.
+    # memmap (run di store) juga dihitung penuh karena pickle menyalin seluruh isinya
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, io.BytesIO):
+        return value.getbuffer().nbytes
+    if isinstance(value, dict):
+        return sum(estimate_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_nbytes(item) for item in value)
+    return 0
+
+class ResultCache:
+    def __init__(self, memory_bytes=256 * 2**20, disk_bytes=2**30, cache_dir=None):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.cache_dir = cache_dir
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'memory_evictions': 0, 'disk_evictions': 0, 'rejected': 0}
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                payload = self._memory[key]
+            else:
+                payload = self._read_disk(key)
+                if payload is None:
+                    self.stats['misses'] += 1
+                    return None
+                self.stats['disk_hits'] += 1
+                self._put_memory(key, payload)
+        # di-unpickle di luar lock, setiap sesi mendapat salinan sendiri
+        return pickle.loads(payload)
+
+    def put(self, key, value):
+        # entry yang jelas lebih besar dari kedua batas ditolak sebelum di-pickle, False jika tidak disimpan
+        limit = max(self.memory_bytes, self.disk_bytes if self.cache_dir is not None else 0)
+        if estimate_nbytes(value) > limit:
+            with self._lock:
+                self.stats['rejected'] += 1
+            return False
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._put_memory(key, payload)
+            self._write_disk(key, payload)
+        return True
+
+    def _put_memory(self, key, payload):
+        if len(payload) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_used -= len(self._memory.pop(key))
+        self._memory[key] = payload
+        self._memory_used += len(payload)
+        while self._memory_used > self.memory_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_used -= len(old)
+            self.stats['memory_evictions'] += 1
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key + ".pkl")
+
+    def _read_disk(self, key):
+        if self.cache_dir is None or not os.path.exists(self._disk_path(key)):
+            return None
+        path = self._disk_path(key)
+        with open(path, 'rb') as f:
+            payload = f.read()
+        os.utime(path) # tandai baru diakses untuk LRU
+        return payload
+
+    def _write_disk(self, key, payload):
+        if self.cache_dir is None or len(payload) > self.disk_bytes:
+            return
+        path = self._disk_path(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        entries = self._disk_entries()
+        used = sum(size for _, size, _ in entries)
+        for old_path, size, _ in sorted(entries, key=lambda e: e[2]):
+            if used <= self.disk_bytes:
+                break
+            if old_path != path:
+                os.remove(old_path)
+                used -= size
+                self.stats['disk_evictions'] += 1
+
+    def _disk_entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".pkl"):
+                info = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((os.path.join(self.cache_dir, name), info.st_size, info.st_mtime))
+        return entries
+
+    def summary(self):
+        with self._lock:
+            disk_entries = self._disk_entries() if self.cache_dir is not None else []
+            lookups = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['misses']
+            hits = self.stats['memory_hits'] + self.stats['disk_hits']
+            return dict(self.stats,
+                        hit_rate=hits / lookups if lookups else 0.0,
+                        memory_entries=len(self._memory),
+                        memory_bytes_used=self._memory_used,
+                        disk_entries=len(disk_entries),
+                        disk_bytes_used=sum(size for _, size, _ in disk_entries))
@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from core import DEFAULT_PARAMS, run_simulation, check_precision, check_reference
+from instrument import Profiler, configure_logging
+from store import load_run_state
+
+# Menjalankan simulasi tanpa UI: hydrovision-run params.json -o output/
+# Hanya butuh numpy (dan pyyaml jika file parameter berupa YAML).
+
+def load_params(path):
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise SystemExit("Reading YAML parameter files requires pyyaml (pip install pyyaml), or use JSON instead.")
+            loaded = yaml.safe_load(f)
+        else:
+            loaded = json.load(f)
+    params = dict(DEFAULT_PARAMS)
+    params.update(loaded or {})
+    return params
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="hydrovision-run", description="Run a HydroVision river pollution simulation without the Streamlit UI.")
+    parser.add_argument("params", help="JSON or YAML file with simulation parameters (same keys as the Analyze page, plus optional u_field, v_field, P_field, R_field paths to .npy/CSV rasters)")
+    parser.add_argument("-o", "--output", default="hydrovision_output", help="output folder for frames, histories and summary.json")
+    parser.add_argument("--snapshot-every", type=int, default=None, help="keep every N-th iteration as a frame (default: from params)")
+    parser.add_argument("--no-frames", action="store_true", help="only write the summary, keep frames in memory")
+    parser.add_argument("--log-level", default=None, help="JSON log verbosity on stderr, e.g. DEBUG or INFO (default: HYDROVISION_LOG_LEVEL or WARNING)")
+    parser.add_argument("--solver", choices=["ftcs", "adi", "analytic"], default=None, help="numerical scheme, or the closed-form Gaussian puff for a = b = 0 (default: from params, ftcs)")
+    parser.add_argument("--check-reference", action="store_true", help="compare the numerical solver with the analytical solution (a = b = 0) and report the errors in summary.json")
+    parser.add_argument("--dtype", choices=["float64", "float32"], default=None, help="floating point precision (default: from params, float64)")
+    parser.add_argument("--check-precision", action="store_true", help="also run in float64 and float32 and report their agreement in summary.json")
+    parser.add_argument("--continue", dest="continue_steps", type=int, default=None, metavar="N", help="resume the run saved in the output folder for N more steps, appending to its frames and histories")
+    parser.add_argument("--track-memory", action="store_true", help="record allocated bytes per stage with tracemalloc (slower)")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(args.log_level)
+    params = load_params(args.params)
+    if args.dtype is not None:
+        params['dtype'] = args.dtype
+    if args.solver is not None:
+        params['solver'] = args.solver
+    os.makedirs(args.output, exist_ok=True)
+    resume = None
+    if args.continue_steps is not None:
+        if args.no_frames:
+            raise SystemExit("--continue needs the frames and checkpoint saved in the output folder, remove --no-frames.")
+        try:
+            resume = load_run_state(args.output)
+        except FileNotFoundError:
+            raise SystemExit(f"No saved run with a checkpoint in {args.output}.")
+        params['t'] = resume['checkpoint']['step'] + args.continue_steps
+
+    start = time.perf_counter()
+    store_path = None if args.no_frames else args.output
+    profiler = Profiler(track_memory=args.track_memory)
+    try:
+        summary, _ = run_simulation(params, store_path=store_path, snapshot_every=args.snapshot_every, profiler=profiler, resume=resume)
+    except ValueError as error:
+        raise SystemExit(str(error))
+    summary['runtime_s'] = time.perf_counter() - start
+    summary['stages'] = profiler.records
+    if args.check_precision and summary['stable']:
+        summary['precision_check'] = check_precision(params)
+    if args.check_reference and summary['stable']:
+        try:
+            summary['reference_check'] = check_reference(params)
+        except ValueError as error:
+            summary['reference_check'] = {'error': str(error)}
+    summary['params'] = params
+
+    with open(os.path.join(args.output, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+
+    if not summary['stable']:
+        print(f"Unstable parameters: CFL = {summary['CFL']}, delta t limit = {summary['dt_diff_limit']}", file=sys.stderr)
+        return 2
+    print(f"Peak concentration {summary['max_concentration']:.4f} kg/m3 at t = {summary['max_concentration_t']:.4f} s ({summary['runtime_s']:.2f} s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,888 @@
+import hashlib
+import logging
+import math
+
+import numpy as np
+from store import create_store, extend_store, finalize_store, save_checkpoint
+from instrument import logger, log_event, Profiler, array_info
+from fields import axis_profile, build_field, get_field_specs
+
+# Inti numerik HydroVision: field koefisien, stabilitas, stencil FTCS/ADI dan analyze.
+# Modul ini hanya butuh numpy, jadi bisa dipakai untuk batch/CLI tanpa streamlit, plotly atau matplotlib.
+
+# nilai default sama dengan ui.render_input_panel
+DEFAULT_PARAMS = {
+    'grid_x': 100, 'len_x': 1000, 'a': 0.01,
+    'grid_y': 100, 'len_y': 1000, 'b': 0.01,
+    'c_in': 1.0, 'm': 10000, 'x0': 1, 'y0': 1,
+    'P0': 80.0, 'R0': 0.01, 'u0': 0.5, 'v0': 0.02,
+    't': 100, 'Q': 5.0, 'xt': 1, 'yt': 1,
+    'snapshot_every': None, 'max_frames': 200, 'solver': 'ftcs', 'backend': 'numpy', 'dtype': 'float64'
+}
+
+SPINUP_CELLS = 5 # check_reference: lebar puff minimum (dalam sel) sebelum dibandingkan dengan solusi analitik
+
+def get_uv(u0, v0, a, b, x_grid, y_grid, materialize=True):
+  # u = u0 (1 + a x), v = v0 (1 + b y), dibangun dengan broadcasting (lihat fields.py).
+  # materialize=False mengembalikan view rank-1 yang di-broadcast (read-only, tanpa alokasi penuh).
+  u = build_field(axis_profile(u0, a, "x"), x_grid, y_grid, materialize)
+  v = build_field(axis_profile(v0, b, "y"), x_grid, y_grid, materialize)
+  log_event("get_uv", logging.DEBUG, u_max=float(u.max()))
+  return u, v
+
+
+def get_pr(P0, R0, a, b, x_grid, y_grid, materialize=True):
+  P = build_field(axis_profile(P0, a, "x", power=2), x_grid, y_grid, materialize)
+  R = build_field(axis_profile(R0, b, "y", power=2), x_grid, y_grid, materialize)
+  return P, R
+
+def get_delta_t(u, v, delta_x, delta_y, P, R, solver="ftcs"):
+    # dihitung dalam float64 walaupun field float32
+    u_max = float(u.max()) # m/s
+    v_max = float(v.max()) # m/s
+    P_max = float(P.max()) # m/s
+    R_max = float(R.max()) # m/s
+
+    # Stabilitas advective
+    denom_adv = (abs(u_max)/delta_x) + (abs(v_max)/delta_y)
+    dt_adv = 1.0 / denom_adv if denom_adv > 0 else float('inf')
+
+    # Stabilitas diffusive
+    dt_diff = 0.5 / (P_max / delta_x**2 + R_max / delta_y**2)
+
+    # Pilih timestep yang aman
+    # ADI implisit untuk difusi, jadi hanya batas advective yang berlaku
+    if solver == "adi" and dt_adv != float('inf'):
+        dt_max = dt_adv
+    else:
+        dt_max = min(dt_adv, dt_diff)
+
+    log_event("get_delta_t", logging.DEBUG, u_max=float(u_max), v_max=float(v_max), dt_adv=float(dt_adv), dt_diff=float(dt_diff), delta_t=float(dt_max))
+    return dt_max
+
+def check_stability(u, v, P, R, delta_x, delta_y, delta_t, solver="ftcs"):
+    u_max = abs(float(u.max()))
+    v_max = abs(float(v.max()))
+    P_max = float(P.max())
+    R_max = float(R.max())
+
+    # Advection CFL check
+    CFL = delta_t * (u_max/delta_x + v_max/delta_y)
+    advective_stable = CFL <= 1.0
+
+    # Diffusion check
+    dt_diff_limit = 0.5 / (P_max / delta_x**2 + R_max / delta_y**2)
+    diffusive_stable = delta_t <= dt_diff_limit or solver == "adi"
+
+    # solusi analitik tidak melakukan iterasi, delta_t hanya menentukan sumbu waktu (sama dengan FTCS)
+    if solver == "analytic":
+        return True, CFL, dt_diff_limit
+    return advective_stable and diffusive_stable, CFL, dt_diff_limit
+
+def apply_bc(c, t=None):
+    # t=None berarti c adalah satu field 2D (mode rolling buffer)
+    field = c if t is None else c[t]
+    field[..., -1, :] = field[..., -2, :] # x = m
+    field[..., :, 0] = field[..., :, 1] # y = 0
+    field[..., :, -1] = field[..., :, -2] # y = n
+    return c
+
+# stencil bekerja pada dua axis terakhir, jadi juga berlaku untuk field bertumpuk (N, nx, ny)
+def cs_1_x(var, delta_x):
+    return (var[...,2:,1:-1] - var[...,0:-2,1:-1]) / (2*delta_x)
+
+def cs_1_y(var, delta_y):
+    return (var[...,1:-1,2:] - var[...,1:-1,0:-2]) / (2*delta_y)
+
+def cs_2_x(var, delta_x):
+    return (var[...,2:,1:-1] - 2*var[...,1:-1,1:-1] + var[...,0:-2,1:-1]) / (delta_x**2)
+
+def cs_2_y(var, delta_y):
+    return (var[...,1:-1,2:] - 2*var[...,1:-1,1:-1] + var[...,1:-1,0:-2]) / (delta_y**2)
+
+def get_x_y_input(x, x0, y, y0, xt, yt):
+    nearest_x_to_target_idx = (np.abs(x - x0)).argmin()
+    nearest_y_to_target_idx = (np.abs(y - y0)).argmin()
+
+    if (nearest_x_to_target_idx==0):
+        nearest_x_to_target_idx += 1
+    if (nearest_x_to_target_idx==len(x)-1):
+        nearest_x_to_target_idx -= 1
+
+    if (nearest_y_to_target_idx==0):
+        nearest_y_to_target_idx += 1
+    if (nearest_y_to_target_idx==len(y)-1):
+        nearest_y_to_target_idx -= 1
+
+    nearest_x_to_target = x[nearest_x_to_target_idx]
+    nearest_y_to_target = y[nearest_y_to_target_idx]
+
+    nearest_xt_to_target_idx = (np.abs(x - xt)).argmin()
+    nearest_yt_to_target_idx = (np.abs(y - yt)).argmin()
+
+    if (nearest_xt_to_target_idx==0):
+        nearest_xt_to_target_idx += 1
+    if (nearest_xt_to_target_idx==len(x)-1):
+        nearest_xt_to_target_idx -= 1
+
+    if (nearest_yt_to_target_idx==0):
+        nearest_yt_to_target_idx += 1
+    if (nearest_yt_to_target_idx==len(y)-1):
+        nearest_yt_to_target_idx -= 1
+
+    nearest_xt_to_target = x[nearest_xt_to_target_idx]
+    nearest_yt_to_target = y[nearest_yt_to_target_idx]
+
+    return nearest_x_to_target, nearest_y_to_target, nearest_x_to_target_idx, nearest_y_to_target_idx, nearest_xt_to_target, nearest_yt_to_target, nearest_xt_to_target_idx, nearest_yt_to_target_idx
+
+def get_meshgrid(c, delta_x, delta_y):
+    nx, ny = c.shape[-2], c.shape[-1]
+
+    x = 0 + np.arange(nx) * delta_x
+    y = 0 + np.arange(ny) * delta_y
+
+    X, Y = np.meshgrid(x, y, indexing='ij')
+
+    return x, y, X, Y
+
+def get_snapshot_steps(t, snapshot_every=1, snapshot_steps=None):
+    # step yang disimpan untuk animasi, selalu termasuk step 0 dan step t
+    if snapshot_steps is not None:
+        steps = np.asarray(snapshot_steps, dtype=int)
+        steps = steps[(steps >= 0) & (steps <= t)]
+    else:
+        steps = np.arange(0, t+1, max(1, int(snapshot_every)))
+    return np.union1d(steps, [0, t])
+
+def get_snapshot_every(params):
+    # snapshot_every kosong (None): jarak frame diturunkan dari max_frames, animasi hanya memakai
+    # paling banyak max_frames frame, jadi frame lain tidak perlu disimpan
+    snapshot_every = params.get('snapshot_every')
+    if snapshot_every is None:
+        return max(1, int(params['t']) // int(params.get('max_frames') or DEFAULT_PARAMS['max_frames']))
+    return max(1, int(snapshot_every))
+
+class FTCSOperator:
+    # Koefisien P, R, u, v tidak berubah terhadap waktu, jadi update FTCS bisa
+    # direduksi sekali di awal menjadi bobot stencil 5 titik:
+    #   c_new = wC*c + wE*c[i+1] + wW*c[i-1] + wN*c[j+1] + wS*c[j-1]
+    # step() hanya memakai buffer yang sudah dialokasikan (out=), tanpa array sementara baru.
+    # Field boleh bertumpuk (N, nx, ny) untuk ensemble, delta_t boleh berbentuk (N, 1, 1).
+    # Bobot selalu dihitung dalam float64 lalu disimpan dalam dtype (default: dtype u), misalnya float32
+    # agar loop stencil hanya membaca setengah byte.
+    def __init__(self, u, v, P, R, delta_x, delta_y, delta_t, dtype=None):
+        dtype = u.dtype if dtype is None else np.dtype(dtype)
+        u, v, P, R = (np.asarray(f, dtype=np.float64) for f in (u, v, P, R))
+        dPdx = cs_1_x(P, delta_x)
+        dRdy = cs_1_y(R, delta_y)
+        dudx = cs_1_x(u, delta_x)
+        dvdy = cs_1_y(v, delta_y)
+        P_in = P[...,1:-1,1:-1]
+        R_in = R[...,1:-1,1:-1]
+        u_in = u[...,1:-1,1:-1]
+        v_in = v[...,1:-1,1:-1]
+
+        self.delta_t = delta_t
+        self.w_c = 1 + delta_t * (-2*P_in/delta_x**2 - 2*R_in/delta_y**2 - dudx - dvdy)
+        self.w_e = delta_t * (dPdx/(2*delta_x) + P_in/delta_x**2 - u_in/(2*delta_x)) # x+1
+        self.w_w = delta_t * (-dPdx/(2*delta_x) + P_in/delta_x**2 + u_in/(2*delta_x)) # x-1
+        self.w_n = delta_t * (dRdy/(2*delta_y) + R_in/delta_y**2 - v_in/(2*delta_y)) # y+1
+        self.w_s = delta_t * (-dRdy/(2*delta_y) + R_in/delta_y**2 + v_in/(2*delta_y)) # y-1
+        for name in ('w_c', 'w_e', 'w_w', 'w_n', 'w_s'):
+            setattr(self, name, np.ascontiguousarray(getattr(self, name), dtype=dtype))
+        self._tmp = np.empty_like(self.w_c)
+
+    fused_bc = False # True jika step penuh sudah menulis boundary (x = 0 nol dan apply_bc), lihat kernels.py
+
+    def step(self, c_prev, c_next, window=None):
+        # tulis interior c_next dari c_prev, boundary diurus apply_bc.
+        # window (i0, i1, j0, j1): hanya sel [i0:i1, j0:j1] yang diupdate (lihat ActiveRegion)
+        if window is not None:
+            return self._step_window(c_prev, c_next, *window)
+        out = c_next[..., 1:-1, 1:-1]
+        tmp = self._tmp
+        np.multiply(self.w_c, c_prev[..., 1:-1, 1:-1], out=out)
+        np.multiply(self.w_e, c_prev[..., 2:, 1:-1], out=tmp)
+        np.add(out, tmp, out=out)
+        np.multiply(self.w_w, c_prev[..., 0:-2, 1:-1], out=tmp)
+        np.add(out, tmp, out=out)
+        np.multiply(self.w_n, c_prev[..., 1:-1, 2:], out=tmp)
+        np.add(out, tmp, out=out)
+        np.multiply(self.w_s, c_prev[..., 1:-1, 0:-2], out=tmp)
+        np.add(out, tmp, out=out)
+        return c_next
+
+    def _step_window(self, c_prev, c_next, i0, i1, j0, j1):
+        # operasi dan urutannya sama dengan step penuh, jadi hasil di dalam jendela identik
+        w = (Ellipsis, slice(i0-1, i1-1), slice(j0-1, j1-1))
+        out = c_next[..., i0:i1, j0:j1]
+        tmp = self._tmp[..., :i1-i0, :j1-j0]
+        np.multiply(self.w_c[w], c_prev[..., i0:i1, j0:j1], out=out)
+        np.multiply(self.w_e[w], c_prev[..., i0+1:i1+1, j0:j1], out=tmp)
+        np.add(out, tmp, out=out)
+        np.multiply(self.w_w[w], c_prev[..., i0-1:i1-1, j0:j1], out=tmp)
+        np.add(out, tmp, out=out)
+        np.multiply(self.w_n[w], c_prev[..., i0:i1, j0+1:j1+1], out=tmp)
+        np.add(out, tmp, out=out)
+        np.multiply(self.w_s[w], c_prev[..., i0:i1, j0-1:j1-1], out=tmp)
+        np.add(out, tmp, out=out)
+        return c_next
+
+def thomas_factor(lower, diag, upper):
+    # faktorisasi LU tridiagonal (algoritma Thomas) sepanjang axis 0, batch di axis 1.
+    # Koefisien tidak berubah terhadap waktu, jadi cukup difaktorkan sekali.
+    n = diag.shape[0]
+    upper_p = np.empty_like(diag)
+    inv = np.empty_like(diag)
+    inv[0] = 1 / diag[0]
+    upper_p[0] = upper[0] * inv[0]
+    for i in range(1, n):
+        inv[i] = 1 / (diag[i] - lower[i] * upper_p[i-1])
+        upper_p[i] = upper[i] * inv[i]
+    return lower, upper_p, inv
+
+def thomas_solve(factor, rhs, out):
+    lower, upper_p, inv = factor
+    n = rhs.shape[0]
+    out[0] = rhs[0] * inv[0]
+    for i in range(1, n):
+        out[i] = (rhs[i] - lower[i] * out[i-1]) * inv[i]
+    for i in range(n-2, -1, -1):
+        out[i] -= upper_p[i] * out[i+1]
+    return out
+
+class ADIOperator:
+    # Peaceman-Rachford ADI: setengah step implisit di x (y eksplisit),
+    # lalu setengah step implisit di y (x eksplisit). Difusi tidak lagi membatasi delta_t.
+    # Boundary sama dengan apply_bc: x = 0 tetap nol, x = m dan y = 0, n Neumann.
+    # Seperti FTCSOperator, koefisien dan faktorisasi dihitung dalam float64 lalu disimpan dalam dtype.
+    fused_bc = False # apply_bc dipanggil di dalam step, tetapi baris x = 0 tetap diurus analyze_stream
+
+    def __init__(self, u, v, P, R, delta_x, delta_y, delta_t, dtype=None):
+        dtype = u.dtype if dtype is None else np.dtype(dtype)
+        u, v, P, R = (np.asarray(f, dtype=np.float64) for f in (u, v, P, R))
+        nx, ny = u.shape
+        dPdx = cs_1_x(P, delta_x)
+        dRdy = cs_1_y(R, delta_y)
+        dudx = cs_1_x(u, delta_x)
+        dvdy = cs_1_y(v, delta_y)
+        P_in = P[1:-1,1:-1]
+        R_in = R[1:-1,1:-1]
+        u_in = u[1:-1,1:-1]
+        v_in = v[1:-1,1:-1]
+        h = delta_t / 2
+
+        # operator Lx dan Ly di titik interior
+        self.lx_e = h * (dPdx/(2*delta_x) + P_in/delta_x**2 - u_in/(2*delta_x))
+        self.lx_w = h * (-dPdx/(2*delta_x) + P_in/delta_x**2 + u_in/(2*delta_x))
+        self.lx_c = h * (-2*P_in/delta_x**2 - dudx)
+        self.ly_n = h * (dRdy/(2*delta_y) + R_in/delta_y**2 - v_in/(2*delta_y))
+        self.ly_s = h * (-dRdy/(2*delta_y) + R_in/delta_y**2 + v_in/(2*delta_y))
+        self.ly_c = h * (-2*R_in/delta_y**2 - dvdy)
+
+        # (I - dt/2 Lx) sepanjang x untuk setiap kolom interior y
+        lower = np.zeros((nx, ny-2))
+        diag = np.ones((nx, ny-2))
+        upper = np.zeros((nx, ny-2))
+        lower[1:-1] = -self.lx_w
+        diag[1:-1] = 1 - self.lx_c
+        upper[1:-1] = -self.lx_e
+        lower[-1] = -1 # x = m: c[-1] - c[-2] = 0
+        self.factor_x = thomas_factor(lower, diag, upper)
+
+        # (I - dt/2 Ly) sepanjang y untuk setiap baris interior x
+        lower = np.zeros((ny, nx-2))
+        diag = np.ones((ny, nx-2))
+        upper = np.zeros((ny, nx-2))
+        lower[1:-1] = -self.ly_s.T
+        diag[1:-1] = 1 - self.ly_c.T
+        upper[1:-1] = -self.ly_n.T
+        upper[0] = -1 # y = 0: c[0] - c[1] = 0
+        lower[-1] = -1 # y = n: c[-1] - c[-2] = 0
+        self.factor_y = thomas_factor(lower, diag, upper)
+
+        for name in ('lx_e', 'lx_w', 'lx_c', 'ly_n', 'ly_s', 'ly_c'):
+            setattr(self, name, getattr(self, name).astype(dtype, copy=False))
+        self.factor_x = tuple(f.astype(dtype, copy=False) for f in self.factor_x)
+        self.factor_y = tuple(f.astype(dtype, copy=False) for f in self.factor_y)
+        self.delta_t = delta_t
+        self._rhs_x = np.zeros((nx, ny-2), dtype=dtype)
+        self._rhs_y = np.zeros((nx-2, ny), dtype=dtype)
+        self._c_half = np.zeros((nx, ny), dtype=dtype)
+
+    def step(self, c_prev, c_next):
+        c_half = self._c_half
+        rhs = self._rhs_x
+        rhs[1:-1] = (c_prev[1:-1,1:-1] * (1 + self.ly_c) +
+                     self.ly_n * c_prev[1:-1,2:] +
+                     self.ly_s * c_prev[1:-1,0:-2])
+        thomas_solve(self.factor_x, rhs, c_half[:, 1:-1])
+        apply_bc(c_half)
+
+        rhs = self._rhs_y
+        rhs[:, 1:-1] = (c_half[1:-1,1:-1] * (1 + self.lx_c) +
+                        self.lx_e * c_half[2:,1:-1] +
+                        self.lx_w * c_half[0:-2,1:-1])
+        thomas_solve(self.factor_y, rhs.T, c_next[1:-1, :].T)
+        apply_bc(c_next)
+        return c_next
+
+def get_operator(solver, u, v, P, R, delta_x, delta_y, delta_t, backend="numpy", dtype=None):
+    if solver == "adi":
+        return ADIOperator(u, v, P, R, delta_x, delta_y, delta_t, dtype)
+    if backend == "numba":
+        try:
+            from kernels import NumbaFTCSOperator
+        except ImportError:
+            log_event("numba is not installed, falling back to the numpy backend", logging.WARNING)
+        else:
+            return NumbaFTCSOperator(u, v, P, R, delta_x, delta_y, delta_t, dtype)
+    return FTCSOperator(u, v, P, R, delta_x, delta_y, delta_t, dtype)
+
+class ActiveRegion:
+    # Jendela (bounding box) sel interior yang mungkin berubah, untuk update FTCS parsial.
+    # Sel boleh dilewati hanya jika update-nya identitas: sel dan keempat tetangganya masih bernilai background b
+    # dan operator memetakan field seragam b ke b. Yang kedua selalu benar untuk b = 0, tetapi tidak untuk b != 0
+    # jika div(u) != 0 (suku -c du/dx - c dv/dy), sehingga jendela awal mencakup semua sel yang tidak memenuhi
+    # keduanya (termasuk baris x = 0 yang ditahan nol). Setiap step jendela diperlebar 1 sel (radius stencil),
+    # jadi dengan tol = 0 hasilnya identik dengan update penuh. tol > 0 mengabaikan selisih kecil (aproksimasi).
+    def __init__(self, operator, c0, background=None, tol=0.0):
+        self.nx, self.ny = c0.shape
+        b = float(np.median(c0)) if background is None else background
+        uniform = np.full_like(c0, b)
+        uniform_next = uniform.copy()
+        operator.step(uniform, uniform_next)
+        seed = np.abs(c0 - b) > tol
+        seed |= np.abs(uniform_next - b) > tol
+        if abs(b) > tol:
+            seed[0, :] = True
+        ix, iy = np.nonzero(seed)
+        if len(ix) == 0:
+            # tidak ada yang berubah, jendela kosong (diperlebar dari satu sel di tengah akan salah)
+            self.box = (1, 1, 1, 1)
+            self.empty = True
+        else:
+            self.box = (int(ix.min()), int(ix.max()) + 1, int(iy.min()), int(iy.max()) + 1)
+            self.empty = False
+
+    def grow(self):
+        # jendela untuk step berikutnya: box diperlebar radius stencil, dibatasi ke interior
+        i0, i1, j0, j1 = self.box
+        if not self.empty:
+            self.box = (max(i0 - 1, 0), min(i1 + 1, self.nx), max(j0 - 1, 0), min(j1 + 1, self.ny))
+            i0, i1, j0, j1 = self.box
+        return max(i0, 1), min(i1, self.nx - 1), max(j0, 1), min(j1, self.ny - 1)
+
+    def covers_all(self):
+        return self.box == (0, self.nx, 0, self.ny)
+
+    def fraction(self):
+        i0, i1, j0, j1 = self.box
+        return 0.0 if self.empty else (i1 - i0) * (j1 - j0) / (self.nx * self.ny)
+
+class EarlyStop:
+    # Kriteria berhenti opsional untuk analyze (stop_criteria, semua key opsional):
+    #   steady_tol, steady_steps: max |c[k] - c[k-1]| < steady_tol selama steady_steps step berturut-turut
+    #   mass_fraction: massa di atas background c_in < mass_fraction * massa yang dilepas (m/Q)
+    #   target_threshold: konsentrasi target (di atas background) sudah naik melewati threshold lalu turun lagi di bawahnya
+    #   c_background: konsentrasi background, default median field awal (= c_in)
+    def __init__(self, stop_criteria, c0):
+        self.steady_tol = stop_criteria.get('steady_tol')
+        self.steady_steps = stop_criteria.get('steady_steps', 10)
+        self.mass_fraction = stop_criteria.get('mass_fraction')
+        self.target_threshold = stop_criteria.get('target_threshold')
+        self.c_background = stop_criteria.get('c_background')
+        if self.c_background is None:
+            self.c_background = float(np.median(c0))
+        self.release_mass = np.maximum(c0 - self.c_background, 0).sum()
+        self.quiet_steps = 0
+        self.target_reached = False
+        self._diff = np.empty_like(c0)
+
+    def check(self, c_prev, c_next, target_value):
+        diff = self._diff
+        if self.steady_tol is not None:
+            np.subtract(c_next, c_prev, out=diff)
+            np.abs(diff, out=diff)
+            self.quiet_steps = self.quiet_steps + 1 if diff.max() < self.steady_tol else 0
+            if self.quiet_steps >= self.steady_steps:
+                return "steady_state"
+        if self.mass_fraction is not None:
+            np.subtract(c_next, self.c_background, out=diff)
+            np.maximum(diff, 0, out=diff)
+            if diff.sum() < self.mass_fraction * self.release_mass:
+                return "plume_exit"
+        if self.target_threshold is not None:
+            excess = target_value - self.c_background
+            if excess >= self.target_threshold:
+                self.target_reached = True
+            elif self.target_reached:
+                return "target_decayed"
+        return None
+
+class PeakTracker:
+    # Konsentrasi tertinggi setiap sel dan step saat pertama tercapai, diperbarui selama iterasi
+    # (tiga operasi ufunc per step, hanya di jendela aktif jika ada), jadi pertanyaan "di mana dan kapan
+    # konsentrasi terburuk" tidak perlu membaca ulang frame (lihat query.py).
+    def __init__(self, c0, peak=None, peak_step=None):
+        self.peak = c0.copy() if peak is None else np.array(peak, dtype=c0.dtype)
+        self.peak_step = np.zeros(c0.shape, dtype=np.int32) if peak_step is None else np.array(peak_step, dtype=np.int32)
+        self._mask = np.empty(c0.shape, dtype=bool)
+
+    def update(self, k, field, window=None):
+        if window is None:
+            region = (slice(None), slice(None))
+        else:
+            # jendela interior ditambah satu sel untuk boundary yang disalin apply_bc
+            i0, i1, j0, j1 = window
+            region = (slice(max(i0 - 1, 0), i1 + 1), slice(max(j0 - 1, 0), j1 + 1))
+        peak, mask = self.peak[region], self._mask[region]
+        np.greater(field[region], peak, out=mask)
+        np.copyto(self.peak_step[region], k, where=mask)
+        np.maximum(peak, field[region], out=peak)
+
+def get_transect_cells(transect, nx, ny):
+    # transect dalam indeks grid:
+    #   {'kind': 'row', 'y': j}                          sepanjang x pada baris y = j
+    #   {'kind': 'column', 'x': i}                       sepanjang y pada kolom x = i
+    #   {'kind': 'polyline', 'points': [(i, j), ...]}    sel-sel yang dilewati segmen antar titik
+    kind = transect['kind']
+    if kind == "row":
+        return np.arange(nx), np.full(nx, int(transect['y']))
+    if kind == "column":
+        return np.full(ny, int(transect['x'])), np.arange(ny)
+    if kind == "polyline":
+        points = np.asarray(transect['points'], dtype=int)
+        ix, iy = [points[:1, 0]], [points[:1, 1]]
+        for (i0, j0), (i1, j1) in zip(points[:-1], points[1:]):
+            fraction = np.linspace(0, 1, max(abs(i1 - i0), abs(j1 - j0)) + 1)[1:]
+            ix.append(np.rint(i0 + fraction * (i1 - i0)).astype(int))
+            iy.append(np.rint(j0 + fraction * (j1 - j0)).astype(int))
+        ix, iy = np.concatenate(ix), np.concatenate(iy)
+        return np.clip(ix, 0, nx-1), np.clip(iy, 0, ny-1)
+    raise ValueError(f"Unknown transect kind {kind!r}, expected 'row', 'column' or 'polyline'.")
+
+def get_transect_steps(t, transect_steps=None):
+    # default: awal run lalu 25%, 50%, 75% dan 100% iterasi (yang dipakai plot konsentrasi sepanjang x)
+    if transect_steps is None:
+        transect_steps = [int(t * fraction) for fraction in (0, 0.25, 0.5, 0.75, 1)]
+    steps = np.asarray(transect_steps, dtype=int)
+    return np.unique(steps[(steps >= 0) & (steps <= t)])
+
+def analyze_stream(t, c, P, R, u, v, delta_x, delta_y, delta_t, xt, yt, snapshot_every=1, snapshot_steps=None, operator=None, solver="ftcs", backend="numpy", stream_every=None, result=None, store_path=None, store_meta=None, stop_criteria=None, probes=None, transects=None, transect_steps=None, active_region=False, active_tol=0.0, resume=None, track_peaks=False):
+    # c boleh berupa field awal 2D atau array (t+1, nx, ny) lama, hanya c[0] yang dipakai.
+    # dtype c (float64 atau float32) menentukan dtype operator, frame dan riwayat.
+    # Hanya dua buffer (sekarang dan sebelumnya) yang disimpan selama iterasi,
+    # frame untuk animasi hanya disimpan pada step di snapshot_steps / setiap snapshot_every.
+    # Generator ini yield (k, field, c_history) setiap stream_every step (serta step 0 dan t).
+    # result (dict) diisi selama iterasi, jadi run yang dihentikan lebih awal tetap punya hasil parsial.
+    # store_path: frame ditulis langsung ke frames.npy (memmap) di folder tersebut, lihat store.py.
+    # stop_criteria: lihat EarlyStop. Jika berhenti lebih awal, field terakhir selalu disimpan sebagai frame
+    # dan alasannya dicatat di result['stop_reason'] / result['stop_step'].
+    # probes: titik pantau tambahan [(i, j), ...], kolom 0 result['probe_history'] selalu titik target (xt, yt).
+    # Semua probe diambil sekaligus setiap step dengan satu np.take ke array (t+1, n_probe) yang sudah dialokasikan.
+    # transects: lihat get_transect_cells, transect pertama selalu baris y = yt (c_x_history),
+    # nilainya hanya disimpan pada transect_steps (lihat get_transect_steps) dan step terakhir jika berhenti lebih awal.
+    # active_region: FTCS hanya mengupdate jendela sekitar sel yang berbeda dari background (lihat ActiveRegion),
+    # sampai jendela mencakup seluruh grid. result['active_full_step'] mencatat step saat itu terjadi.
+    # solver="analytic": tanpa iterasi, frame, probe dan transect dievaluasi langsung dari puff Gaussian
+    # (lihat analytic.py, hanya untuk a = b = 0). stop_criteria dan active_region diabaikan.
+    # Di akhir run result['checkpoint'] berisi field terakhir, step, dt dan hash koefisien (juga checkpoint.npz di store_path).
+    # resume: result run sebelumnya (atau store.load_run_state) dengan checkpoint tersebut. Iterasi dilanjutkan dari
+    # step checkpoint sampai t (total step, bukan tambahan), c diabaikan, probe dan transect mengikuti run lama,
+    # frame dan riwayat lama disalin lalu ditambah (di store_path: frames.npy diperpanjang). Hasilnya identik
+    # dengan run langsung sampai t, kecuali EarlyStop yang mulai menghitung lagi dari checkpoint.
+    # track_peaks: result['peak'] dan result['peak_step'] berisi konsentrasi tertinggi per sel dan step-nya (PeakTracker),
+    # untuk solver="analytic" dihitung dari frame snapshot.
+    log_event("analyze", logging.DEBUG, delta_x=delta_x, delta_y=delta_y, delta_t=float(delta_t), xt=int(xt), yt=int(yt), t=t)
+    fields_hash = get_fields_hash(u, v, P, R, delta_x, delta_y, solver)
+    start = 0
+    if resume is not None:
+        checkpoint = resume['checkpoint']
+        if solver == "analytic":
+            raise ValueError("The analytical solution does not iterate, run it again with more steps instead.")
+        if checkpoint['fields_hash'] != fields_hash or not np.isclose(checkpoint['delta_t'], delta_t, rtol=1e-12, atol=0):
+            raise ValueError("The checkpoint was computed with different coefficients, grid, time step or scheme.")
+        start = checkpoint['step']
+        if t <= start:
+            raise ValueError(f"The run already reached step {start}, choose a larger number of steps.")
+        c = checkpoint['field']
+    c0 = c[0] if c.ndim == 3 else c
+    nx, ny = c0.shape
+    steps = get_snapshot_steps(t, snapshot_every, snapshot_steps)
+    frame_idx = 0
+    if resume is not None:
+        frame_idx = resume['frame_count']
+        steps = np.concatenate([resume['steps'][:frame_idx], steps[steps > start]])
+    if store_path is not None and resume is not None:
+        frames = extend_store(store_path, steps, frame_idx)
+    elif store_path is not None:
+        meta = {'delta_x': delta_x, 'delta_y': delta_y, 'delta_t': delta_t, 'xt': int(xt), 'yt': int(yt), 'solver': solver}
+        meta.update(store_meta or {})
+        frames = create_store(store_path, steps, c0.shape, meta, dtype=c0.dtype)
+    else:
+        frames = np.empty((len(steps),) + c0.shape, dtype=c0.dtype)
+        if resume is not None:
+            frames[:frame_idx] = resume['frames'][:frame_idx]
+    puff = None
+    if solver == "analytic":
+        from analytic import GaussianPuff
+        puff = GaussianPuff(u, v, P, R, c0, np.arange(nx) * delta_x, np.arange(ny) * delta_y)
+        stop_criteria = None
+        active_region = False
+    elif operator is None:
+        operator = get_operator(solver, u, v, P, R, delta_x, delta_y, delta_t, backend, dtype=c0.dtype)
+    early_stop = EarlyStop(stop_criteria, c0) if stop_criteria else None
+    active = None
+    if active_region:
+        if isinstance(operator, FTCSOperator):
+            active = ActiveRegion(operator, c0, tol=active_tol)
+        else:
+            log_event("active_region is only supported by the FTCS scheme, updating the full grid", logging.WARNING)
+
+    c_prev = c0.copy()
+    c_next = c0.copy() # sel di luar jendela aktif tidak pernah ditulis, jadi kedua buffer mulai dari c0
+    latest = c_prev
+    peaks = None
+    if track_peaks:
+        previous = resume if resume is not None and resume.get('peak') is not None else {}
+        peaks = PeakTracker(c0, previous.get('peak'), previous.get('peak_step'))
+
+    if resume is not None:
+        probe_points = [(int(i), int(j)) for i, j in resume['probes']]
+    else:
+        probe_points = [(int(xt), int(yt))] + [(int(i), int(j)) for i, j in (probes or [])]
+    probe_flat = np.ravel_multi_index(tuple(np.array(probe_points).T), (nx, ny))
+    probe_history = np.empty((t+1, len(probe_points)), dtype=c0.dtype)
+    if resume is not None:
+        probe_history[:start+1] = resume['probe_history'][:start+1]
+    else:
+        np.take(c_prev, probe_flat, out=probe_history[0])
+
+    record_steps = get_transect_steps(t, transect_steps)
+    record_steps = record_steps[record_steps > start] if resume is not None else record_steps
+    transect_data = []
+    if resume is not None and resume.get('transects'):
+        # transect lama beserta nilai yang sudah direkam
+        for old in resume['transects']:
+            recorded = len(old['steps'])
+            values = np.empty((recorded + len(record_steps) + 1, old['values'].shape[1]), dtype=c0.dtype)
+            values[:recorded] = old['values'][:recorded]
+            transect_data.append(dict(old, steps=list(old['steps']), values=values))
+    else:
+        for transect in [{'kind': "row", 'y': int(yt), 'name': "target_row"}] + list(transects or []):
+            ix, iy = get_transect_cells(transect, nx, ny)
+            transect_data.append({
+                'name': transect.get('name', f"transect_{len(transect_data)}"), 'kind': transect['kind'],
+                'cells': (ix, iy), 'flat': np.ravel_multi_index((ix, iy), (nx, ny)),
+                'steps': [], 'values': np.empty((len(record_steps) + 1, len(ix)), dtype=c0.dtype) # +1: step berhenti lebih awal
+            })
+
+    def record_transects(k, field):
+        for data in transect_data:
+            np.take(field, data['flat'], out=data['values'][len(data['steps'])])
+            data['steps'].append(k)
+
+    record_idx = 0
+    if resume is None:
+        if record_steps[record_idx] == 0:
+            record_transects(0, c_prev)
+            record_idx += 1
+        if steps[frame_idx] == 0:
+            frames[frame_idx] = c_prev
+            frame_idx += 1
+
+    if result is None:
+        result = {}
+    result.update(frames=frames, steps=steps, frame_count=frame_idx, probes=probe_points, probe_history=probe_history,
+                  transects=transect_data, last_step=start, stop_reason=None, stop_step=None, active_full_step=None,
+                  peak=peaks.peak if peaks else None, peak_step=peaks.peak_step if peaks else None)
+    try:
+        if stream_every:
+            yield start, c_prev.copy(), probe_history[:start+1, 0]
+
+        if puff is not None:
+            puff.fill(delta_t, steps, frames, probe_points, probe_history, record_steps[record_idx:], transect_data)
+            frame_idx = len(steps)
+            result.update(frame_count=frame_idx, last_step=t)
+            latest = frames[-1]
+            if peaks is not None:
+                peak_idx = np.argmax(frames, axis=0)
+                peaks.peak[...] = np.take_along_axis(frames, peak_idx[None], axis=0)[0]
+                peaks.peak_step[...] = steps[peak_idx]
+            if stream_every:
+                yield t, np.array(frames[-1]), probe_history[:, 0]
+            return
+
+        for k in range(start+1, t+1):
+            window = None
+            if active is not None:
+                window = active.grow()
+                operator.step(c_prev, c_next, window)
+                if active.covers_all():
+                    # jendela sudah seluas grid, sisa run memakai update penuh
+                    active = None
+                    result['active_full_step'] = k
+            else:
+                operator.step(c_prev, c_next)
+            if window is not None or not operator.fused_bc:
+                c_next[0, :] = 0 # x = 0 tidak pernah diupdate, tetap nol seperti sebelumnya
+                apply_bc(c_next)
+            latest = c_next
+            if peaks is not None:
+                peaks.update(k, c_next, window)
+            np.take(c_next, probe_flat, out=probe_history[k])
+            stop_reason = early_stop.check(c_prev, c_next, probe_history[k, 0]) if early_stop else None
+            if stop_reason is not None:
+                steps[frame_idx] = k # k < t, jadi masih ada slot frame
+            if frame_idx < len(steps) and steps[frame_idx] == k:
+                frames[frame_idx] = c_next
+                frame_idx += 1
+                result['frame_count'] = frame_idx
+            if (record_idx < len(record_steps) and record_steps[record_idx] == k) or stop_reason is not None:
+                record_transects(k, c_next)
+                record_idx += 1
+            result['last_step'] = k
+            if k % 1000 == 0 and logger.isEnabledFor(logging.DEBUG):
+                log_event("step", logging.DEBUG, k=k, c_min=float(c_next.min()), c_max=float(c_next.max()))
+            if stop_reason is not None:
+                result['stop_reason'] = stop_reason
+                result['stop_step'] = k
+            if stream_every and (k % stream_every == 0 or k == t or stop_reason is not None):
+                yield k, c_next.copy(), probe_history[:k+1, 0]
+            if stop_reason is not None:
+                break
+            c_prev, c_next = c_next, c_prev
+    finally:
+        result['checkpoint'] = {'field': np.array(latest), 'step': result['last_step'], 'delta_t': float(delta_t), 'fields_hash': fields_hash}
+        if store_path is not None:
+            save_checkpoint(store_path, result['checkpoint'])
+            finalize_store(store_path, frames, probe_history[:result['last_step']+1, 0], probe_history=probe_history[:result['last_step']+1],
+                           frame_count=frame_idx, last_step=result['last_step'], steps=[int(k) for k in steps],
+                           stop_reason=result['stop_reason'], probes=probe_points, peak=result['peak'], peak_step=result['peak_step'],
+                           **(store_meta if resume is not None and store_meta else {}))
+
+def get_fields_hash(u, v, P, R, delta_x, delta_y, solver="ftcs"):
+    # hash koefisien untuk checkpoint, view hasil broadcast (stride 0) di-hash dalam bentuk rank-1-nya.
+    # Sumbu yang nilainya konstan juga dipadatkan: pickle (cache hasil) menyalin view broadcast menjadi array penuh
+    digest = hashlib.sha256(f"{solver}:{float(delta_x)!r}:{float(delta_y)!r}".encode())
+    for field in (u, v, P, R):
+        field = np.asarray(field)
+        compact = field[tuple(slice(None) if stride else slice(0, 1) for stride in field.strides)]
+        for axis in range(compact.ndim):
+            first = compact.take([0], axis=axis)
+            if compact.shape[axis] > 1 and np.array_equal(compact, np.broadcast_to(first, compact.shape)):
+                compact = first
+        digest.update(repr((field.shape, compact.shape, field.dtype.str)).encode())
+        digest.update(np.ascontiguousarray(compact).tobytes())
+    return digest.hexdigest()
+
+def get_transect_history(transect):
+    # {step: nilai sepanjang transect} untuk step yang sudah direkam
+    return {step: transect['values'][n] for n, step in enumerate(transect['steps'])}
+
+def get_stream_result(result):
+    # potong hasil analyze_stream sampai step terakhir yang sudah dihitung
+    frame_count = result['frame_count']
+    c_history = result['probe_history'][:result['last_step']+1, 0]
+    c_x_history = get_transect_history(result['transects'][0])
+    return result['frames'][:frame_count], c_history, c_x_history, result['steps'][:frame_count]
+
+def get_probe_result(result):
+    # riwayat semua probe (last_step+1, n_probe), kolom 0 = titik target
+    return result['probe_history'][:result['last_step']+1], result['probes']
+
+def analyze(t, c, P, R, u, v, delta_x, delta_y, delta_t, xt, yt, snapshot_every=1, snapshot_steps=None, operator=None, solver="ftcs", backend="numpy", store_path=None, store_meta=None, stop_criteria=None, result=None, probes=None, transects=None, transect_steps=None, active_region=False, active_tol=0.0, resume=None, track_peaks=False, progress=None):
+    # result (opsional): dict yang diisi analyze_stream, misalnya untuk membaca stop_reason atau probe_history
+    # progress (opsional): dipanggil dengan fraksi step selesai sekitar 50 kali per run, jika mengembalikan False
+    # iterasi dihentikan di situ (hasil parsial, seperti tombol cancel di app)
+    if result is None:
+        result = {}
+    start = resume['checkpoint']['step'] if resume is not None else 0
+    stream = analyze_stream(t, c, P, R, u, v, delta_x, delta_y, delta_t, xt, yt, snapshot_every=snapshot_every, snapshot_steps=snapshot_steps,
+                            operator=operator, solver=solver, backend=backend, result=result, store_path=store_path, store_meta=store_meta,
+                            stop_criteria=stop_criteria, probes=probes, transects=transects, transect_steps=transect_steps,
+                            active_region=active_region, active_tol=active_tol, resume=resume, track_peaks=track_peaks,
+                            stream_every=None if progress is None else max(1, (t - start) // 50))
+    for k, _, _ in stream:
+        if progress is not None and progress((k - start) / max(t - start, 1)) is False:
+            break
+    stream.close()
+    return get_stream_result(result)
+
+def get_fields(params):
+    grid_x = int(params['grid_x'])
+    grid_y = int(params['grid_y'])
+    delta_x = params['len_x'] / (grid_x-1)
+    delta_y = params['len_y'] / (grid_y-1)
+    x = np.arange(grid_x) * delta_x
+    y = np.arange(grid_y) * delta_y
+    # profil bawaan atau raster dari u_field, v_field, P_field, R_field, profil rank-1 tidak dimaterialisasi
+    specs = get_field_specs(params)
+    dtype = params.get('dtype', 'float64')
+    u, v, P, R = (build_field(specs[name], x, y, dtype=dtype) for name in ('u', 'v', 'P', 'R'))
+    return x, y, delta_x, delta_y, u, v, P, R
+
+def check_params(params, fields=None):
+    x, y, delta_x, delta_y, u, v, P, R = get_fields(params) if fields is None else fields
+    solver = params.get('solver', 'ftcs')
+    delta_t = get_delta_t(u, v, delta_x, delta_y, P, R, solver=solver)
+    stable, CFL, dt_diff_limit = check_stability(u, v, P, R, delta_x, delta_y, delta_t, solver=solver)
+    return bool(stable), float(CFL), float(dt_diff_limit), float(delta_t)
+
+def get_initial_field(params, x, y):
+    # background c_in dengan pelepasan sesaat m/Q di titik grid terdekat (x0, y0)
+    c = np.full((len(x), len(y)), params.get('c_in', 0.1), dtype=params.get('dtype', 'float64'))
+    x_in_coordinate, y_in_coordinate, x_in, y_in, xt_coordinate, yt_coordinate, xt_idx, yt_idx = get_x_y_input(x, params['x0'], y, params['y0'], params['xt'], params['yt'])
+    c[x_in, y_in] = params['m'] / params['Q']
+    return c, (x_in_coordinate, y_in_coordinate, x_in, y_in, xt_coordinate, yt_coordinate, xt_idx, yt_idx)
+
+def nearest_index(grid, value):
+    return int(np.abs(np.asarray(grid) - value).argmin())
+
+def get_monitoring_points(params, x, y):
+    # params['probes']: [[x, y], ...] dan params['transects']: row {'y'}, column {'x'} atau polyline {'points'},
+    # semuanya dalam meter, dikonversi ke indeks grid terdekat untuk analyze
+    probes = [(nearest_index(x, px), nearest_index(y, py)) for px, py in params.get('probes') or []]
+    transects = []
+    for n, transect in enumerate(params.get('transects') or []):
+        converted = {'kind': transect['kind'], 'name': transect.get('name', f"transect_{n+1}")}
+        if transect['kind'] == "row":
+            converted['y'] = nearest_index(y, transect['y'])
+        elif transect['kind'] == "column":
+            converted['x'] = nearest_index(x, transect['x'])
+        else:
+            converted['points'] = [(nearest_index(x, px), nearest_index(y, py)) for px, py in transect['points']]
+        transects.append(converted)
+    return probes, transects
+
+def run_simulation(params, store_path=None, snapshot_every=None, profiler=None, resume=None, progress=None):
+    # pipeline yang sama dengan app.py tanpa UI: field, dt, cek stabilitas, analyze.
+    # Mengembalikan ringkasan (dict) dan hasil analyze (None jika tidak stabil).
+    # profiler (instrument.Profiler, opsional) mencatat waktu setiap tahap.
+    # progress: lihat analyze, run yang dihentikan mengembalikan hasil sampai summary['last_step'].
+    # resume: lanjutkan run sebelumnya sampai params['t'] (lihat analyze_stream), misalnya store.load_run_state(store_path).
+    if profiler is None:
+        profiler = Profiler()
+    with profiler.stage("fields", grid_x=int(params['grid_x']), grid_y=int(params['grid_y'])) as record:
+        fields = get_fields(params)
+        x, y, delta_x, delta_y, u, v, P, R = fields
+        record['arrays'] = array_info(u=u, v=v, P=P, R=R)
+    t = int(params['t'])
+    with profiler.stage("stability"):
+        stable, CFL, dt_diff_limit, delta_t = check_params(params, fields)
+    summary = {'stable': stable, 'CFL': CFL, 'dt_diff_limit': dt_diff_limit, 'delta_t': delta_t, 'end_time': t * delta_t}
+    if not stable:
+        return summary, None
+
+    c, points = get_initial_field(params, x, y)
+    _, _, _, _, xt_coordinate, yt_coordinate, xt_idx, yt_idx = points
+    if snapshot_every is None:
+        snapshot_every = get_snapshot_every(params)
+    probes, transects = get_monitoring_points(params, x, y)
+    run_state = {}
+    with profiler.stage("stepping", t=t, solver=params.get('solver', 'ftcs'), backend=params.get('backend', 'numpy')) as record:
+        result = analyze(t, c, P, R, u, v, delta_x, delta_y, delta_t, xt_idx, yt_idx, snapshot_every=snapshot_every,
+                         solver=params.get('solver', 'ftcs'), backend=params.get('backend', 'numpy'),
+                         store_path=store_path, store_meta={'params': params},
+                         stop_criteria=params.get('stop_criteria'), result=run_state,
+                         probes=probes, transects=transects, active_region=params.get('active_region', False), resume=resume,
+                         track_peaks=params.get('track_peaks', True), progress=progress)
+        record['steps_computed'] = run_state['last_step'] - (resume['checkpoint']['step'] if resume is not None else 0)
+        record['active_full_step'] = run_state['active_full_step']
+        record['arrays'] = array_info(frames=result[0])
+    c_history = result[1]
+    max_concentration_idx = int(np.argmax(c_history))
+    summary.update({
+        'xt_coordinate': float(xt_coordinate), 'yt_coordinate': float(yt_coordinate),
+        'max_concentration': float(c_history[max_concentration_idx]),
+        'max_concentration_idx': max_concentration_idx,
+        'max_concentration_t': max_concentration_idx * delta_t,
+        'last_step': run_state['last_step'],
+        'end_time': run_state['last_step'] * delta_t,
+        'stop_reason': run_state['stop_reason']
+    })
+    probe_history, probe_points = get_probe_result(run_state)
+    summary['probes'] = [{
+        'x_coordinate': float(x[i]), 'y_coordinate': float(y[j]),
+        'max_concentration': float(probe_history[:, n].max()),
+        'max_concentration_t': int(probe_history[:, n].argmax()) * delta_t
+    } for n, (i, j) in enumerate(probe_points)]
+    return summary, result
+
+def check_precision(params, dtype="float32", rtol=1e-4, progress=None):
+    # Menjalankan params dalam float64 dan dtype lalu membandingkan riwayat konsentrasi target dan field terakhir.
+    # Error relatif dinormalisasi dengan nilai maksimum hasil float64 (riwayat target, dan untuk field:
+    # konsentrasi tertinggi di field awal), karena nilai setelah plume lewat bisa mendekati nol.
+    # progress: lihat analyze, fraksi mencakup kedua run. Jika progress mengembalikan False hasilnya None.
+    runs = {}
+    for n, name in enumerate(('float64', dtype)):
+        run_progress = None if progress is None else (lambda fraction, n=n: progress((n + fraction) / 2))
+        summary, result = run_simulation(dict(params, dtype=name), snapshot_every=int(params['t']), progress=run_progress)
+        if result is None:
+            raise ValueError(f"Unstable parameters: CFL = {summary['CFL']}, delta t limit = {summary['dt_diff_limit']}")
+        if progress is not None and progress((n + 1) / 2) is False:
+            return None
+        runs[name] = (np.asarray(result[1], dtype=np.float64), np.asarray(result[0][-1], dtype=np.float64), summary, float(np.abs(result[0][0]).max()))
+    history_64, field_64, summary_64, scale = runs['float64']
+    history, field, summary, _ = runs[dtype]
+    n = min(len(history_64), len(history))
+    target_error = float(np.abs(history[:n] - history_64[:n]).max() / np.abs(history_64[:n]).max())
+    field_error = float(np.abs(field - field_64).max() / scale)
+    return {
+        'dtype': dtype,
+        'max_rel_error_target': target_error,
+        'max_rel_error_field': field_error,
+        'peak_rel_error': abs(summary['max_concentration'] - summary_64['max_concentration']) / abs(summary_64['max_concentration']),
+        'rtol': rtol,
+        'agrees': target_error <= rtol and field_error <= rtol
+    }
+
+def check_reference(params, rtol=0.05, progress=None):
+    # Membandingkan hasil numerik (solver di params, FTCS atau ADI) dengan solusi analitik untuk a = b = 0
+    # pada waktu yang sama: riwayat target dan frame snapshot, error dinormalisasi dengan puncak analitik.
+    # Awal run (spin-up) tidak ikut dibandingkan: pelepasan satu sel tidak terwakili oleh grid sampai sebaran puff
+    # sqrt(2 P t) dan sqrt(2 R t) mencapai SPINUP_CELLS sel, sebelum itu error puncak wajar mendekati 1 bahkan untuk ADI
+    # yang konvergen. Step pertama yang dibandingkan dikembalikan sebagai spinup_step.
+    # progress: lihat analyze. Jika progress mengembalikan False hasilnya None.
+    from analytic import GaussianPuff
+    if params.get('solver', 'ftcs') == "analytic":
+        raise ValueError("Choose a numerical solver (ftcs or adi) to compare against the analytical solution.")
+    t = int(params['t'])
+    summary, result = run_simulation(params, snapshot_every=max(1, t // 10), progress=progress)
+    if result is None:
+        raise ValueError(f"Unstable parameters: CFL = {summary['CFL']}, delta t limit = {summary['dt_diff_limit']}")
+    if progress is not None and progress(1.0) is False:
+        return None
+    frames, c_history, _, steps = result
+    x, y, delta_x, delta_y, u, v, P, R = get_fields(params)
+    c0, points = get_initial_field(dict(params, dtype='float64'), x, y)
+    puff = GaussianPuff(u, v, P, R, c0, x, y)
+    delta_t = summary['delta_t']
+    spinup = max(1, math.ceil((SPINUP_CELLS * delta_x) ** 2 / (2 * puff.P * delta_t)),
+                 math.ceil((SPINUP_CELLS * delta_y) ** 2 / (2 * puff.R * delta_t)))
+    if spinup > t:
+        raise ValueError(f"The puff stays narrower than {SPINUP_CELLS} grid cells until step {spinup}, after the end of the run (t = {t}). "
+                         "Increase t, P0 or R0, or use a finer grid, to compare with the analytical solution.")
+    history = np.asarray(c_history, dtype=np.float64)
+    reference = puff.history(np.arange(len(history)) * delta_t, points[6], points[7])
+    target_error = float(np.abs(history[spinup:] - reference[spinup:]).max() / np.abs(reference[spinup:]).max())
+    field_error, scale = 0.0, 0.0
+    for frame, k in zip(frames, steps):
+        if k >= spinup:
+            expected = puff.frame(k * delta_t)
+            field_error = max(field_error, float(np.abs(np.asarray(frame, dtype=np.float64) - expected).max()))
+            scale = max(scale, float(np.abs(expected).max()))
+    field_error = field_error / scale if scale > 0 else 0.0
+    peak = float(reference[spinup:].max())
+    return {
+        'solver': params.get('solver', 'ftcs'),
+        'max_rel_error_target': target_error,
+        'max_rel_error_field': field_error,
+        'peak_numeric': float(history[spinup:].max()),
+        'peak_reference': peak,
+        'peak_rel_error': abs(float(history[spinup:].max()) - peak) / abs(peak),
+        'spinup_step': spinup,
+        'rtol': rtol,
+        'agrees': target_error <= rtol and field_error <= rtol
+    }
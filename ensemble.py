@@ -0,0 +1,96 @@
+import numpy as np
+
+from core import (
+    get_uv, get_pr,
+    get_delta_t,
+    check_stability,
+    get_x_y_input,
+    apply_bc,
+    FTCSOperator
+)
+
+# Ensemble: N set parameter (u0, v0, P0, R0, a, b, m, Q, c_in) di grid yang sama.
+# Semua member disimpan bertumpuk (N, nx, ny) dan diupdate bersama dalam satu operasi stencil.
+
+MEMBER_KEYS = ['u0', 'v0', 'P0', 'R0', 'a', 'b', 'm', 'Q', 'c_in']
+
+def get_ensemble_fields(members, x_grid, y_grid, dtype=np.float64):
+    u = np.empty((len(members), len(x_grid), len(y_grid)), dtype=dtype)
+    v = np.empty_like(u)
+    P = np.empty_like(u)
+    R = np.empty_like(u)
+    for n, member in enumerate(members):
+        u[n], v[n] = get_uv(member['u0'], member['v0'], member['a'], member['b'], x_grid, y_grid)
+        P[n], R[n] = get_pr(member['P0'], member['R0'], member['a'], member['b'], x_grid, y_grid)
+    return u, v, P, R
+
+def get_ensemble_delta_t(u, v, delta_x, delta_y, P, R):
+    return np.array([get_delta_t(u[n], v[n], delta_x, delta_y, P[n], R[n]) for n in range(u.shape[0])])
+
+def analyze_ensemble(t, c, P, R, u, v, delta_x, delta_y, delta_t, xt, yt):
+    # c: field awal (N, nx, ny), delta_t: skalar (dt bersama) atau array (N,) per member.
+    # Mengembalikan field terakhir dan riwayat konsentrasi target (N, t+1).
+    delta_t = np.asarray(delta_t, dtype=float)
+    dt = delta_t if delta_t.ndim == 0 else delta_t[:, None, None]
+    operator = FTCSOperator(u, v, P, R, delta_x, delta_y, dt, dtype=c.dtype)
+
+    c_prev = c.copy()
+    c_next = np.zeros_like(c_prev)
+    c_history = np.empty((c.shape[0], t+1), dtype=c.dtype)
+    c_history[:, 0] = c_prev[:, xt, yt]
+    for k in range(1, t+1):
+        c_next[:, 0, :] = 0 # x = 0
+        operator.step(c_prev, c_next)
+        apply_bc(c_next)
+        c_history[:, k] = c_next[:, xt, yt]
+        c_prev, c_next = c_next, c_prev
+    return c_prev, c_history
+
+def run_ensemble(members, grid_x, grid_y, len_x, len_y, t, x0, y0, xt, yt, dt_mode="shared", percentiles=(5, 50, 95), dtype=np.float64):
+    # dt_mode="shared": semua member memakai dt terkecil, sumbu waktu sama.
+    # dt_mode="member": setiap member memakai dt sendiri, envelope dihitung setelah
+    # riwayat diinterpolasi ke sumbu waktu bersama (sampai horizon member terpendek).
+    delta_x = len_x / (grid_x-1)
+    delta_y = len_y / (grid_y-1)
+    x = np.arange(grid_x) * delta_x
+    y = np.arange(grid_y) * delta_y
+
+    u, v, P, R = get_ensemble_fields(members, x, y, dtype)
+    dt_members = get_ensemble_delta_t(u, v, delta_x, delta_y, P, R)
+    delta_t = dt_members.min() if dt_mode == "shared" else dt_members
+
+    dt_check = np.broadcast_to(delta_t, dt_members.shape)
+    stable = np.array([check_stability(u[n], v[n], P[n], R[n], delta_x, delta_y, dt_check[n])[0] for n in range(len(members))])
+
+    _, _, x_in, y_in, xt_coordinate, yt_coordinate, xt_idx, yt_idx = get_x_y_input(x, x0, y, y0, xt, yt)
+    c = np.empty((len(members), grid_x, grid_y), dtype=dtype)
+    for n, member in enumerate(members):
+        c[n] = member.get('c_in', 0.1)
+        c[n, x_in, y_in] = member['m'] / member['Q']
+
+    c_last, c_history = analyze_ensemble(t, c, P, R, u, v, delta_x, delta_y, delta_t, xt_idx, yt_idx)
+
+    time_points = np.arange(t+1)[None, :] * dt_check[:, None]
+    if dt_mode == "shared":
+        time_common = time_points[0]
+        history_common = c_history
+    else:
+        time_common = np.arange(t+1) * (time_points[:, -1].min() / t)
+        history_common = np.array([np.interp(time_common, time_points[n], c_history[n]) for n in range(len(members))])
+
+    envelope = {p: np.percentile(history_common, p, axis=0) for p in percentiles}
+    peak_idx = c_history.argmax(axis=1)
+
+    return {
+        'delta_t': delta_t,
+        'stable': stable,
+        'time_points': time_points,
+        'c_history': c_history,
+        'time_common': time_common,
+        'envelope': envelope,
+        'max_concentration': c_history.max(axis=1),
+        'max_concentration_t': time_points[np.arange(len(members)), peak_idx],
+        'c_last': c_last,
+        'xt_coordinate': xt_coordinate,
+        'yt_coordinate': yt_coordinate
+    }
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+
+# Pembangun field koefisien (u, v, P, R) tanpa loop Python per sel.
+# Sebuah field bisa diberikan sebagai:
+#   angka                    -> konstan di seluruh grid
+#   callable f(X, Y)         -> dievaluasi dengan grid terbuka X (nx, 1) dan Y (1, ny)
+#   array, path .npy / .csv  -> raster (nx, ny) hasil pengukuran, baris sepanjang x, kolom sepanjang y
+# Profil yang hanya bergantung pada satu sumbu (axis_profile) menghasilkan faktor rank-1 (nx, 1) atau (1, ny)
+# yang dikembalikan sebagai view np.broadcast_to, jadi tidak pernah dialokasikan berukuran penuh
+# kecuali materialize=True (misalnya jika hasilnya akan ditulis).
+
+def axis_profile(base, rate, axis="x", power=1):
+    # base * (1 + rate * x)**power, profil bawaan HydroVision: u, v pangkat 1, P, R pangkat 2
+    def profile(X, Y):
+        coord = X if axis == "x" else Y
+        if power == 1:
+            return base * (1 + rate * coord)
+        return base * ((1 + rate * coord)**power)
+    return profile
+
+def load_raster(source):
+    # source: path atau file-like (.npy atau CSV dengan pemisah koma)
+    name = source if isinstance(source, str) else getattr(source, 'name', '')
+    if name.endswith(".npy"):
+        return np.load(source)
+    return np.loadtxt(source, delimiter=",", ndmin=2)
+
+def build_field(spec, x_grid, y_grid, materialize=False, dtype=np.float64):
+    shape = (len(x_grid), len(y_grid))
+    if callable(spec):
+        X = np.asarray(x_grid, dtype=float)[:, None]
+        Y = np.asarray(y_grid, dtype=float)[None, :]
+        field = np.asarray(spec(X, Y), dtype=float)
+    elif isinstance(spec, (str, os.PathLike)) or hasattr(spec, 'read'):
+        field = np.asarray(load_raster(spec), dtype=float)
+    else:
+        field = np.asarray(spec, dtype=float)
+
+    # profil dievaluasi dalam float64, baru dikonversi ke dtype (misalnya float32)
+    field = field.astype(dtype, copy=False)
+    try:
+        field = np.broadcast_to(field, shape)
+    except ValueError:
+        raise ValueError(f"Field of shape {field.shape} does not match the ({shape[0]}, {shape[1]}) grid.")
+    if materialize:
+        return np.array(field)
+    return field
+
+def get_field_specs(params):
+    # spesifikasi u, v, P, R dari parameter: profil bawaan, kecuali ada raster di u_field, v_field, P_field, R_field
+    specs = {
+        'u': axis_profile(params['u0'], params['a'], "x"),
+        'v': axis_profile(params['v0'], params['b'], "y"),
+        'P': axis_profile(params['P0'], params['a'], "x", power=2),
+        'R': axis_profile(params['R0'], params['b'], "y", power=2)
+    }
+    for name in specs:
+        if params.get(f"{name}_field") is not None:
+            specs[name] = params[f"{name}_field"]
+    return specs
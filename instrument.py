@@ -0,0 +1,118 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+# Instrumentasi ringan untuk setiap tahap pipeline (field, stabilitas, iterasi, plot, animasi, ekspor).
+# Setiap tahap dicatat sebagai record: wall time, CPU time, byte yang dialokasikan (opsional, tracemalloc)
+# dan ukuran array, lalu dikirim ke logger "hydrovision" sebagai JSON satu baris.
+# Verbosity diatur lewat HYDROVISION_LOG_LEVEL (DEBUG, INFO, WARNING, ...), default WARNING.
+
+logger = logging.getLogger("hydrovision")
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', {}))
+        return json.dumps(entry, default=str)
+
+def configure_logging(level=None, stream=None):
+    # aman dipanggil berkali-kali (streamlit menjalankan ulang script setiap interaksi)
+    level = level or os.environ.get("HYDROVISION_LOG_LEVEL", "WARNING")
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    if not any(isinstance(h.formatter, JsonFormatter) for h in logger.handlers):
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(JsonFormatter())
+        logger.addHandler(handler)
+        logger.propagate = False
+    return logger
+
+def log_event(event, level=logging.INFO, **fields):
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={'fields': fields})
+
+def array_info(**arrays):
+    info = {}
+    for name, a in arrays.items():
+        a = a if hasattr(a, 'nbytes') else np.asarray(a)
+        # view hasil broadcast (stride 0) hanya menempati memori sepanjang sumbu yang tidak di-broadcast
+        nbytes = a.itemsize * int(np.prod([n for n, stride in zip(a.shape, a.strides) if stride != 0]))
+        info[name] = {'shape': list(a.shape), 'dtype': str(a.dtype), 'nbytes': nbytes}
+    return info
+
+# tracemalloc berlaku untuk seluruh proses (start, reset_peak, stop), jadi hanya satu thread yang boleh memakainya
+# sekaligus. Stage di thread lain (job lain di JobManager) dicatat tanpa byte alokasi, bukan mengacaukan angka
+# pemilik. Alokasi thread lain yang berjalan bersamaan tetap ikut terhitung di stage pemilik.
+_tracing_lock = threading.Lock()
+_tracing = {'owner': None, 'depth': 0, 'started': False}
+
+def _acquire_tracing():
+    # True jika thread ini boleh memakai tracemalloc (stage bersarang di thread yang sama juga boleh)
+    with _tracing_lock:
+        owner = threading.get_ident()
+        if _tracing['owner'] not in (None, owner):
+            return False
+        if _tracing['depth'] == 0:
+            _tracing['started'] = not tracemalloc.is_tracing()
+            if _tracing['started']:
+                tracemalloc.start()
+        _tracing['owner'] = owner
+        _tracing['depth'] += 1
+        return True
+
+def _release_tracing():
+    with _tracing_lock:
+        _tracing['depth'] -= 1
+        if _tracing['depth'] == 0:
+            if _tracing['started']:
+                tracemalloc.stop()
+            _tracing.update(owner=None, started=False)
+
+class Profiler:
+    # with profiler.stage("stepping", t=t) as record:
+    #     ...
+    #     record['arrays'] = array_info(frames=frames)
+    # track_memory=True memakai tracemalloc (alokasi numpy ikut tercatat), run menjadi beberapa kali lebih lambat.
+    # Jika thread lain sedang memakai tracemalloc, record berisi 'memory_skipped' dan tanpa alloc_bytes.
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, **info):
+        record = {'stage': name}
+        record.update(info)
+        tracing = self.track_memory and _acquire_tracing()
+        if self.track_memory and not tracing:
+            record['memory_skipped'] = "another job is tracking memory"
+        if tracing:
+            tracemalloc.reset_peak()
+            mem_start = tracemalloc.get_traced_memory()[0]
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall_s'] = time.perf_counter() - wall
+            record['cpu_s'] = time.process_time() - cpu
+            if tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                record['alloc_bytes'] = current - mem_start
+                record['alloc_peak_bytes'] = peak - mem_start
+                _release_tracing()
+            self.records.append(record)
+            log_event("stage", **record)
+
+    def total(self):
+        return sum(record['wall_s'] for record in self.records)
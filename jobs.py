@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from instrument import log_event
+
+# Eksekusi job (simulasi, plot, animasi) di background, satu JobManager untuk semua sesi di server.
+# Thread pool, bukan process pool: numpy dan kernel numba melepas GIL di loop berat, dan hasil run
+# (frame, figure) tidak perlu di-pickle balik ke proses utama.
+#   manager = JobManager(max_workers=2, max_queued=4)
+#   job_id = manager.submit(func, arg, name="simulation")   # func(job, arg), job.report(...) / job.cancelled()
+#   job = manager.get(job_id); job.status, job.progress, job.result
+#   manager.cancel(job_id)
+# Job yang dibatalkan berhenti di pemeriksaan job.cancelled() berikutnya, hasil sementara (jika ada) tetap di job.result.
+
+FINISHED = ("done", "failed", "cancelled")
+
+class Job:
+    def __init__(self, job_id, name):
+        self.id = job_id
+        self.name = name
+        self.status = "queued" # queued, running, done, failed, cancelled
+        self.progress = 0.0
+        self.message = "Waiting for a free worker..."
+        self.preview = None # data terakhir untuk tampilan live, diisi oleh fungsi job
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._cancel = threading.Event()
+
+    def report(self, progress, message=None, preview=None):
+        self.progress = min(max(float(progress), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+        if preview is not None:
+            self.preview = preview
+
+    def cancel(self):
+        self._cancel.set()
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def done(self):
+        return self.status in FINISHED
+
+class JobManager:
+    def __init__(self, max_workers=2, max_queued=4, keep_seconds=3600):
+        # max_workers job berjalan bersamaan, max_queued job lain boleh menunggu, selebihnya submit ditolak
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hydrovision-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, name="job", **kwargs):
+        with self._lock:
+            self._prune()
+            active = sum(not job.done() for job in self._jobs.values())
+            if active >= self.max_workers + self.max_queued:
+                raise RuntimeError(f"The server is already running {active} jobs, try again in a moment.")
+            job = Job(uuid.uuid4().hex, name)
+            self._jobs[job.id] = job
+        log_event("job_submit", logging.INFO, job_id=job.id, name=name, active=active + 1)
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def _run(self, job, func, args, kwargs):
+        with self._lock:
+            if job.cancelled():
+                return
+            job.status = "running"
+            job.message = "Running..."
+        started = time.perf_counter()
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.status = "cancelled" if job.cancelled() else "done"
+        except Exception as error:
+            job.error = f"{type(error).__name__}: {error}"
+            job.status = "failed"
+        finally:
+            job.finished = time.time()
+            log_event("job_finish", logging.INFO, job_id=job.id, name=job.name, status=job.status,
+                      wall_s=time.perf_counter() - started, error=job.error)
+
+    def _prune(self):
+        # job selesai yang hasilnya tidak pernah diambil (sesi ditutup) dibuang setelah keep_seconds
+        now = time.time()
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done() and now - job.finished > self.keep_seconds]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def pop(self, job_id):
+        # ambil job yang sudah selesai sekali saja, lalu lepaskan dari manager
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.done():
+                del self._jobs[job_id]
+            return job
+
+    def cancel(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.cancel()
+            if job.status == "queued":
+                # belum mulai: langsung selesai agar tidak menghitung batas antrean
+                job.status = "cancelled"
+                job.finished = time.time()
+            return job
+
+    def summary(self):
+        with self._lock:
+            counts = {status: 0 for status in ("queued", "running") + FINISHED}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return dict(counts, max_workers=self.max_workers, max_queued=self.max_queued)
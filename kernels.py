@@ -0,0 +1,56 @@
+import threading
+
+from numba import njit, prange
+
+from core import FTCSOperator
+
+# Backend numba opsional: satu loop fused untuk update FTCS + boundary apply_bc.
+# Modul ini hanya di-import saat backend="numba" dipilih, jadi numba tidak wajib.
+# Kernel parallel=True hanya dipanggil dari thread utama (CLI, benchmark, sweep worker). Threading layer numba
+# tidak aman dipakai dari thread lain: workqueue menghentikan seluruh proses jika dua thread masuk bersamaan,
+# TBB membuat interpreter macet saat keluar. Thread JobManager memakai versi serial kernel yang sama.
+
+@njit(parallel=True, fastmath=False, cache=True)
+def ftcs_step_fused(c_prev, c_next, w_c, w_e, w_w, w_n, w_s):
+    nx, ny = c_prev.shape
+    for i in prange(1, nx-1):
+        for j in range(1, ny-1):
+            c_next[i, j] = (w_c[i-1, j-1] * c_prev[i, j] +
+                            w_e[i-1, j-1] * c_prev[i+1, j] +
+                            w_w[i-1, j-1] * c_prev[i-1, j] +
+                            w_n[i-1, j-1] * c_prev[i, j+1] +
+                            w_s[i-1, j-1] * c_prev[i, j-1])
+        c_next[i, 0] = c_next[i, 1] # y = 0
+        c_next[i, ny-1] = c_next[i, ny-2] # y = n
+    for j in range(ny):
+        c_next[0, j] = 0.0 # x = 0 tetap nol
+        c_next[nx-1, j] = c_next[nx-2, j] # x = m
+    return c_next
+
+@njit(parallel=True, fastmath=False, cache=True)
+def ftcs_step_window(c_prev, c_next, w_c, w_e, w_w, w_n, w_s, i0, i1, j0, j1):
+    # hanya sel [i0:i1, j0:j1], boundary diurus apply_bc di analyze
+    for i in prange(i0, i1):
+        for j in range(j0, j1):
+            c_next[i, j] = (w_c[i-1, j-1] * c_prev[i, j] +
+                            w_e[i-1, j-1] * c_prev[i+1, j] +
+                            w_w[i-1, j-1] * c_prev[i-1, j] +
+                            w_n[i-1, j-1] * c_prev[i, j+1] +
+                            w_s[i-1, j-1] * c_prev[i, j-1])
+    return c_next
+
+# prange di fungsi tanpa parallel=True sama dengan range, nogil agar job lain tetap berjalan.
+# Tanpa cache: cache numba memakai nama fungsi asli, versi serial dan paralel akan saling menimpa
+ftcs_step_fused_serial = njit(fastmath=False, nogil=True)(ftcs_step_fused.py_func)
+ftcs_step_window_serial = njit(fastmath=False, nogil=True)(ftcs_step_window.py_func)
+
+class NumbaFTCSOperator(FTCSOperator):
+    fused_bc = True # ftcs_step_fused sudah menulis semua boundary, analyze_stream tidak menyapu ulang
+
+    def step(self, c_prev, c_next, window=None):
+        parallel = threading.current_thread() is threading.main_thread()
+        if window is not None:
+            kernel = ftcs_step_window if parallel else ftcs_step_window_serial
+            return kernel(c_prev, c_next, self.w_c, self.w_e, self.w_w, self.w_n, self.w_s, *window)
+        kernel = ftcs_step_fused if parallel else ftcs_step_fused_serial
+        return kernel(c_prev, c_next, self.w_c, self.w_e, self.w_w, self.w_n, self.w_s)
@@ -0,0 +1,138 @@
+import numpy as np
+
+from store import open_store, read_probe_history, read_peaks
+
+# Query di atas run yang sudah selesai (result analyze_stream atau folder store), tanpa menjalankan ulang simulasi:
+# riwayat di sel mana pun, transect, maksimum spasial, peta waktu kedatangan dan konsentrasi terburuk.
+# Riwayat probe yang direkam selama iterasi dipakai jika ada (setiap step, eksak), selain itu dibaca dari frame:
+# eksak jika frame disimpan setiap step (snapshot_every = 1), jika tidak diinterpolasi linear antar frame.
+# Peta puncak (peak, peak_step) dihitung selama iterasi oleh core.PeakTracker, jadi worst() cukup satu argmax.
+
+class RunQuery:
+    def __init__(self, frames, steps, delta_t, x, y, probe_history=None, probes=None, peak=None, peak_step=None, last_step=None):
+        self.frames = frames
+        self.steps = np.asarray(steps, dtype=int)[:len(frames)]
+        self.delta_t = delta_t
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        self.probe_history = probe_history
+        self.probes = [tuple(int(n) for n in point) for point in (probes or [])]
+        self.peak = peak
+        self.peak_step = peak_step
+        self.last_step = int(self.steps[-1]) if last_step is None else int(last_step)
+        self._worst = {}
+
+    @classmethod
+    def from_result(cls, result, x, y, delta_t):
+        # result yang sudah di-retarget tetap membawa riwayat probe yang benar-benar direkam (recorded_*)
+        frame_count = result['frame_count']
+        last_step = result['last_step']
+        return cls(result['frames'][:frame_count], result['steps'][:frame_count], delta_t, x, y,
+                   probe_history=result.get('recorded_history', result['probe_history'])[:last_step+1],
+                   probes=result.get('recorded_probes', result['probes']),
+                   peak=result.get('peak'), peak_step=result.get('peak_step'), last_step=last_step)
+
+    @classmethod
+    def from_store(cls, path):
+        frames, meta = open_store(path)
+        nx, ny = frames.shape[1:]
+        x = np.arange(nx) * meta['delta_x']
+        y = np.arange(ny) * meta['delta_y']
+        probe_history = read_probe_history(path) if meta.get('probes') else None
+        peak, peak_step = read_peaks(path)
+        return cls(frames, meta['steps'], meta['delta_t'], x, y, probe_history=probe_history, probes=meta.get('probes'),
+                   peak=peak, peak_step=peak_step, last_step=meta.get('last_step'))
+
+    def nearest_cell(self, x_coordinate, y_coordinate):
+        return int(np.abs(self.x - x_coordinate).argmin()), int(np.abs(self.y - y_coordinate).argmin())
+
+    def frame_index(self, step):
+        # frame tersimpan yang paling dekat (tidak melewati) step
+        return max(int(np.searchsorted(self.steps, step, side="right")) - 1, 0)
+
+    def has_every_step(self):
+        return len(self.steps) == self.last_step + 1
+
+    def series(self, i, j):
+        # riwayat konsentrasi di sel (i, j) untuk step 0..last_step, dan apakah nilainya eksak
+        if (i, j) in self.probes and self.probe_history is not None:
+            return np.array(self.probe_history[:, self.probes.index((i, j))]), True
+        values = np.array(self.frames[:, i, j], dtype=np.float64)
+        if self.has_every_step():
+            return values, True
+        return np.interp(np.arange(self.last_step + 1), self.steps, values), False
+
+    def transect(self, step, y_idx=None, x_idx=None):
+        # profil sepanjang x pada baris y_idx, atau sepanjang y pada kolom x_idx, di frame terdekat step
+        n = self.frame_index(step)
+        if y_idx is not None:
+            return int(self.steps[n]), np.array(self.frames[n, :, y_idx])
+        return int(self.steps[n]), np.array(self.frames[n, x_idx, :])
+
+    def field_max(self, step):
+        n = self.frame_index(step)
+        frame = np.asarray(self.frames[n])
+        i, j = np.unravel_index(int(np.argmax(frame)), frame.shape)
+        return {'value': float(frame[i, j]), 'i': int(i), 'j': int(j), 'x': float(self.x[i]), 'y': float(self.y[j]),
+                'step': int(self.steps[n]), 'time': int(self.steps[n]) * self.delta_t}
+
+    def worst(self, exclude=None):
+        # konsentrasi tertinggi di seluruh sungai selama run, dan di mana serta kapan terjadi.
+        # exclude: sel (i, j) yang diabaikan, misalnya sel pelepasan yang puncaknya selalu di t = 0
+        key = tuple(sorted(exclude or []))
+        if key not in self._worst:
+            if self.peak is not None:
+                peak, peak_step = np.array(self.peak, dtype=np.float64), np.asarray(self.peak_step)
+            else:
+                # run tanpa track_peaks: hanya resolusi frame
+                peak_idx = np.argmax(self.frames, axis=0)
+                peak = np.take_along_axis(np.asarray(self.frames, dtype=np.float64), peak_idx[None], axis=0)[0]
+                peak_step = self.steps[peak_idx]
+            for i, j in key:
+                peak[i, j] = -np.inf
+            i, j = np.unravel_index(int(np.argmax(peak)), peak.shape)
+            step = int(peak_step[i, j])
+            self._worst[key] = {'value': float(peak[i, j]), 'i': int(i), 'j': int(j), 'x': float(self.x[i]), 'y': float(self.y[j]),
+                                'step': step, 'time': step * self.delta_t}
+        return self._worst[key]
+
+    def peak_map(self):
+        return None if self.peak is None else np.asarray(self.peak)
+
+    def peak_time_map(self):
+        return None if self.peak_step is None else np.asarray(self.peak_step) * self.delta_t
+
+    def arrival_map(self, threshold, background=None):
+        # waktu (s) frame pertama saat konsentrasi melebihi background + threshold, NaN jika tidak pernah
+        if background is None:
+            background = float(np.median(self.frames[0]))
+        arrival = np.full(self.frames.shape[1:], np.nan)
+        for n, step in enumerate(self.steps):
+            reached = np.isnan(arrival) & (np.asarray(self.frames[n]) > background + threshold)
+            arrival[reached] = step * self.delta_t
+        return arrival
+
+def retarget_result(result, xt, yt, query):
+    # result analyze_stream dengan titik target (xt, yt) baru: probe 0 dan transect 0 (baris y = yt) diganti
+    # dengan nilai dari query, probe dan transect lain tetap. Dipakai agar mengganti target tidak menjalankan ulang run.
+    # target_exact False: riwayat target diinterpolasi antar snapshot, puncak di antara snapshot bisa terlewat.
+    # Riwayat probe asli disimpan di recorded_probes / recorded_history, jadi kembali ke target lama tetap eksak.
+    retargeted = dict(result)
+    history, exact = query.series(xt, yt)
+    last_step = result['last_step']
+    retargeted['recorded_probes'] = result.get('recorded_probes', result['probes'])
+    retargeted['recorded_history'] = result.get('recorded_history', result['probe_history'][:last_step+1])
+    probe_history = np.array(result['probe_history'][:last_step+1])
+    probe_history[:, 0] = history
+    retargeted['probe_history'] = probe_history
+    retargeted['probes'] = [(int(xt), int(yt))] + list(result['probes'][1:])
+    target_row = dict(result['transects'][0], y=int(yt))
+    rows = [query.transect(k, y_idx=yt) for k in result['transects'][0]['steps']]
+    target_row['steps'] = [step for step, _ in rows]
+    target_row['values'] = np.array([values for _, values in rows]).reshape(len(rows), len(query.x))
+    ix = np.arange(len(query.x))
+    target_row['cells'] = (ix, np.full(len(ix), int(yt)))
+    target_row['flat'] = np.ravel_multi_index(target_row['cells'], (len(query.x), len(query.y)))
+    retargeted['transects'] = [target_row] + list(result['transects'][1:])
+    retargeted['target_exact'] = exact
+    return retargeted
@@ -1,202 +1,211 @@
 import numpy as np
-import matplotlib.pyplot as plt
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import plotly.graph_objects as go
-import streamlit as st
 import io
+import os
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 import imageio
+from PIL import GifImagePlugin, Image, ImageDraw
+
+from instrument import log_event
+
+from core import (
+    get_uv, get_pr,
+    get_fields,
+    get_delta_t,
+    check_stability,
+    apply_bc,
+    cs_1_x, cs_1_y, cs_2_x, cs_2_y,
+    get_x_y_input,
+    get_meshgrid,
+    get_snapshot_steps,
+    get_snapshot_every,
+    FTCSOperator,
+    ADIOperator,
+    get_operator,
+    analyze_stream,
+    get_stream_result,
+    get_probe_result,
+    get_transect_cells,
+    get_transect_history,
+    get_monitoring_points,
+    analyze,
+    check_precision,
+    check_reference,
+    SPINUP_CELLS
+)
+
+# grafik target dan transect: Plotly Scattergl (WebGL) dengan data dikurangi sampai kira-kira satu atau
+# dua titik per piksel lebar grafik, PNG Matplotlib hanya dibuat saat tombol download ditekan (figure_png)
+CHART_WIDTH_PX = 800
+CHART_POINTS = 2 * CHART_WIDTH_PX # min-max: titik minimum dan maksimum per kolom piksel
+MARKER_POINTS = 100 # marker hanya digambar untuk riwayat pendek
+
+def decimate_minmax(x, y, max_points):
+    # titik minimum dan maksimum setiap bucket (ditambah titik pertama dan terakhir), puncak tidak pernah hilang
+    n = len(y)
+    if n <= max_points:
+        return np.asarray(x), np.asarray(y)
+    buckets = (max_points - 2) // 2
+    if buckets < 1:
+        return np.asarray(x)[[0, n - 1]], np.asarray(y)[[0, n - 1]]
+    size = -(-n // buckets)
+    padded = np.pad(np.asarray(y, dtype=np.float64), (0, buckets * size - n), mode="edge").reshape(buckets, size)
+    offset = np.arange(buckets) * size
+    idx = np.concatenate([[0, n - 1], offset + padded.argmin(axis=1), offset + padded.argmax(axis=1)])
+    idx = np.unique(np.minimum(idx, n - 1))
+    return np.asarray(x)[idx], np.asarray(y)[idx]
+
+def decimate_lttb(x, y, max_points):
+    # Largest-Triangle-Three-Buckets: satu titik per bucket yang membentuk segitiga terbesar dengan
+    # titik terpilih sebelumnya dan rata-rata bucket berikutnya, bentuk kurva lebih halus dari min-max
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= max_points:
+        return x, y
+    if max_points < 3:
+        return x[[0, n - 1]], y[[0, n - 1]]
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    idx = np.empty(max_points, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for b in range(max_points - 2):
+        start, stop = edges[b], edges[b + 1]
+        next_stop = edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        avg_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        idx[b + 1] = a
+    return x[idx], y[idx]
+
+def decimate(x, y, max_points=CHART_POINTS, method="minmax"):
+    if method == "lttb":
+        return decimate_lttb(x, y, max_points)
+    return decimate_minmax(x, y, max_points)
+
+def new_figure(figsize=(8, 6), dpi=None):
+    # figure Matplotlib tanpa pyplot: tidak ada state global, aman dibuat di thread job (lihat jobs.py)
+    # dan dibebaskan garbage collector seperti objek biasa, tidak perlu plt.close
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+def get_target_point_stats(t, delta_t, c_history):
+    time_points = np.arange(0, t+1) * delta_t
+    max_concentration_idx = int(np.argmax(c_history))
+    max_concentration = c_history[max_concentration_idx]
+    return max_concentration, max_concentration_idx, time_points[max_concentration_idx], delta_t, time_points[-1]
 
-def get_uv(u0, v0, a, b, x_grid, y_grid):
-  # print(x_grid[0], " ", x_grid[-1])
-  # print(u0 * (1 + a * x_grid[-1]))
-  u = np.zeros((len(x_grid), len(y_grid)))
-  v = np.zeros((len(x_grid), len(y_grid)))
-
-  for y in range(len(y_grid)):
-    for x in range(len(x_grid)):
-      u[x, y] = u0 * (1 + a * x_grid[x])
-
-  for x in range(len(x_grid)):
-    for y in range(len(y_grid)):
-      v[x, y] = v0 * (1 + b * y_grid[y])
-  print(f"u max = {u.max()}")
-  return u, v
-
-
-def get_pr(P0, R0, a, b, x_grid, y_grid):
-  P = np.zeros((len(x_grid), len(y_grid)))
-  R = np.zeros((len(x_grid), len(y_grid)))
-
-  for y in range(len(y_grid)):
-    for x in range(len(x_grid)):
-      P[x, y] = P0 * ((1 + a * x_grid[x])**2)
-
-  for x in range(len(x_grid)):
-    for y in range(len(y_grid)):
-      R[x, y] = R0 * ((1 + b * y_grid[y])**2)
-
-  return P, R
+def concentration_at_target_point(t, delta_t, c_history, xt, yt, max_points=CHART_POINTS, method="minmax"):
+    time_points = np.arange(0, t+1) * delta_t
+    log_event("concentration_at_target_point", logging.DEBUG, history_length=len(c_history), end_time=float(time_points[-1]))
+    fig, ax = new_figure()
+    plot_x, plot_y = decimate(time_points, c_history, max_points, method)
+    ax.plot(plot_x, plot_y, marker='o' if len(c_history) <= MARKER_POINTS else None)
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Concentration at target')
+    ax.set_title(f'Concentration Evolution at Target Point ({round(xt,2)}, {round(yt,2)})')
+    ax.grid(True)
+    return (fig,) + get_target_point_stats(t, delta_t, c_history)
+
+def concentration_at_y_across_x(c_x_history, x, yt, max_points=CHART_POINTS, method="minmax"):
+    # c_x_history: {step: profil sepanjang x}, hanya step yang direkam analyze (lihat get_transect_steps)
+    fig, ax = new_figure()
+    for t_idx in sorted(c_x_history)[1:]:
+        ax.plot(*decimate(x[:-1], c_x_history[t_idx][:-1], max_points, method), label=f't = {t_idx}')
+
+    ax.set_xlabel('x (m)')
+    ax.set_ylabel('Concentration')
+    ax.set_title(f'Concentration Evolution across X at y = {round(yt,2)}')
+    ax.legend()
+    ax.grid(True)
+    return fig
 
-def get_delta_t(u, v, delta_x, delta_y, P, R):
-    u_max = u.max() # m/s
-    v_max = v.max() # m/s
-    P_max = P.max() # m/s
-    R_max = R.max() # m/s
+def target_point_chart(t, delta_t, c_history, xt, yt, max_points=CHART_POINTS, method="minmax"):
+    time_points = np.arange(0, t+1) * delta_t
+    plot_x, plot_y = decimate(time_points, c_history, max_points, method)
+    fig = go.Figure(go.Scattergl(x=plot_x, y=plot_y, mode="lines+markers" if len(c_history) <= MARKER_POINTS else "lines"))
+    fig.update_layout(title=f'Concentration Evolution at Target Point ({round(xt,2)}, {round(yt,2)})', xaxis_title='Time (s)',
+                      yaxis_title='Concentration at target', height=450, margin=dict(l=10, r=10, t=40, b=10))
+    return fig
 
-    # Stabilitas advective
-    denom_adv = (abs(u_max)/delta_x) + (abs(v_max)/delta_y)
-    dt_adv = 1.0 / denom_adv if denom_adv > 0 else float('inf')
+def transect_chart(c_x_history, x, yt, max_points=CHART_POINTS, method="minmax"):
+    fig = go.Figure()
+    for t_idx in sorted(c_x_history)[1:]:
+        plot_x, plot_y = decimate(x[:-1], c_x_history[t_idx][:-1], max_points, method)
+        fig.add_trace(go.Scattergl(x=plot_x, y=plot_y, mode="lines", name=f't = {t_idx}'))
+    fig.update_layout(title=f'Concentration Evolution across X at y = {round(yt,2)}', xaxis_title='x (m)',
+                      yaxis_title='Concentration', height=450, margin=dict(l=10, r=10, t=40, b=10))
+    return fig
 
-    # Stabilitas diffusive
-    dt_diff = 0.5 / (P_max / delta_x**2 + R_max / delta_y**2)
+def figure_png(make_figure, *args, **kwargs):
+    # figure Matplotlib dibuat dan disimpan sebagai PNG, dipakai sebagai data tombol download
+    fig = make_figure(*args, **kwargs)
+    if isinstance(fig, tuple):
+        fig = fig[0]
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+def get_probe_labels(probe_points, x_grid, y_grid):
+    labels = []
+    for n, (i, j) in enumerate(probe_points):
+        name = "Target" if n == 0 else f"Probe {n}"
+        labels.append(f"{name} ({round(x_grid[i], 2)}, {round(y_grid[j], 2)})")
+    return labels
+
+def concentration_at_probes(delta_t, probe_history, labels):
+    time_points = np.arange(len(probe_history)) * delta_t
+    fig, ax = new_figure()
+    for n, label in enumerate(labels):
+        ax.plot(time_points, probe_history[:, n], label=label)
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Concentration')
+    ax.set_title('Concentration Evolution at Monitoring Points')
+    ax.legend()
+    ax.grid(True)
+    return fig
 
-    # Pilih timestep yang aman
-    dt_max = min(dt_adv, dt_diff)
-
-    print(u_max)
-    print(v_max)
-    print(dt_max)
-    return dt_max
-
-def check_stability(u, v, P, R, delta_x, delta_y, delta_t):
-    u_max = abs(u.max())
-    v_max = abs(v.max())
-    P_max = P.max()
-    R_max = R.max()
-
-    # Advection CFL check
-    CFL = delta_t * (u_max/delta_x + v_max/delta_y)
-    advective_stable = CFL <= 1.0
-
-    # Diffusion check
-    dt_diff_limit = 0.5 / (P_max / delta_x**2 + R_max / delta_y**2)
-    diffusive_stable = delta_t <= dt_diff_limit
-
-    return advective_stable and diffusive_stable, CFL, dt_diff_limit
-
-def apply_bc(c, t):
-    c[t, -1, :] = c[t, -2, :] # x = m
-    c[t, :, 0] = c[t, :, 1] # y = 0
-    c[t, :, -1] = c[t, :, -2] # y = n
-    return c
-
-def cs_1_x(var, delta_x):
-    return (var[2:,1:-1] - var[0:-2,1:-1]) / (2*delta_x)
-
-def cs_1_y(var, delta_y):
-    return (var[1:-1,2:] - var[1:-1,0:-2]) / (2*delta_y)
-
-def cs_2_x(var, delta_x):
-    return (var[2:,1:-1] - 2*var[1:-1,1:-1] + var[0:-2,1:-1]) / (delta_x**2)
-
-def cs_2_y(var, delta_y):
-    return (var[1:-1,2:] - 2*var[1:-1,1:-1] + var[1:-1,0:-2]) / (delta_y**2)
-
-def get_x_y_input(x, x0, y, y0, xt, yt):
-    nearest_x_to_target_idx = (np.abs(x - x0)).argmin()
-    nearest_y_to_target_idx = (np.abs(y - y0)).argmin()
-
-    if (nearest_x_to_target_idx==0):
-        nearest_x_to_target_idx += 1
-    if (nearest_x_to_target_idx==len(x)-1):
-        nearest_x_to_target_idx -= 1
-
-    if (nearest_y_to_target_idx==0):
-        nearest_y_to_target_idx += 1
-    if (nearest_y_to_target_idx==len(y)-1):
-        nearest_y_to_target_idx -= 1
-
-    nearest_x_to_target = x[nearest_x_to_target_idx]
-    nearest_y_to_target = y[nearest_y_to_target_idx]
-
-    nearest_xt_to_target_idx = (np.abs(x - xt)).argmin()
-    nearest_yt_to_target_idx = (np.abs(y - yt)).argmin()
-
-    if (nearest_xt_to_target_idx==0):
-        nearest_xt_to_target_idx += 1
-    if (nearest_xt_to_target_idx==len(x)-1):
-        nearest_xt_to_target_idx -= 1
-
-    if (nearest_yt_to_target_idx==0):
-        nearest_yt_to_target_idx += 1
-    if (nearest_yt_to_target_idx==len(y)-1):
-        nearest_yt_to_target_idx -= 1
-
-    nearest_xt_to_target = x[nearest_xt_to_target_idx]
-    nearest_yt_to_target = y[nearest_yt_to_target_idx]
-
-    return nearest_x_to_target, nearest_y_to_target, nearest_x_to_target_idx, nearest_y_to_target_idx, nearest_xt_to_target, nearest_yt_to_target, nearest_xt_to_target_idx, nearest_yt_to_target_idx
-
-def get_meshgrid(c, delta_x, delta_y):
-    nx, ny = c.shape[1], c.shape[2]
-
-    x = 0 + np.arange(nx) * delta_x
-    y = 0 + np.arange(ny) * delta_y
-
-    X, Y = np.meshgrid(x, y, indexing='ij')
-
-    return x, y, X, Y
-
-def analyze(t, c, P, R, u, v, delta_x, delta_y, delta_t, xt, yt):
-    print(delta_x, " ", delta_y, " ", delta_t, " ", xt, " ", yt)
-    c_history = []
-    c_x_history = {}
-    c_history = []
-    c_history.append(c[0, xt, yt])
-    print("c history at ", xt, yt, c[0, xt, yt])
-    c_x_profile = c[0, :, yt].copy()  # ambil semua x di y tertentu
-    c_x_history[0] = c_x_profile
-    for k in range(1, t+1):
-        apply_bc(c, k)
-        RHS = (cs_1_x(P, delta_x) *  cs_1_x(c[k-1], delta_x) +
-                P[1:-1,1:-1] * cs_2_x(c[k-1], delta_x) +
-                cs_1_y(R, delta_y) * cs_1_y(c[k-1], delta_y) +
-                R[1:-1,1:-1] * cs_2_y(c[k-1], delta_y) -
-                c[k-1][1:-1,1:-1] * cs_1_x(u, delta_x) -
-                u[1:-1,1:-1] * cs_1_x(c[k-1], delta_x) -
-                c[k-1][1:-1,1:-1] * cs_1_y(v, delta_y) -
-                v[1:-1,1:-1] * cs_1_y(c[k-1], delta_y))
-        c[k, 1:-1, 1:-1] = c[k-1, 1:-1, 1:-1] + delta_t * RHS
-        c_history.append(c[k, xt, yt])
-        c_x_profile = c[k, :, yt].copy()  # ambil semua x di y tertentu
-        c_x_history[k] = c_x_profile
-        # print(c[k])
-        apply_bc(c, k)
-        if (k%1000==0):
-            print(f"Step {k}: c.min={c[k].min()}, c.max={c[k].max()}")
-    return c, c_history, c_x_history
-  
-
-def concentration_at_target_point(t, delta_t, c_history, xt, yt):
-    time_points = np.arange(0, t+1) * delta_t
-    max_concentration = np.max(c_history)
-    max_concentration_idx = c_history.index(max_concentration)
-    print("len c history", len(c_history))
-    fig = plt.figure(figsize=(8, 6))
-    print("t*delta t", t*delta_t, "time point trakhir", time_points[-1])
-    plt.plot(time_points, c_history, marker='o')
-    plt.xlabel('Time (s)')
-    plt.ylabel('Concentration at target')
-    plt.title(f'Concentration Evolution at Target Point ({round(xt,2)}, {round(yt,2)})')
-    plt.grid(True)
-    return fig, max_concentration, max_concentration_idx, time_points[max_concentration_idx], delta_t, time_points[-1]
-
-def concentration_at_y_across_x(c_x_history, x, yt):
-    fig = plt.figure(figsize=(8, 6))
-    len_c = len(c_x_history)
-    # print(c_history)
-    t_plot = len_c - 1
-    t_print_list = [int(t_plot * frac) for frac in [0.25, 0.5, 0.75, 1]]
-    for t_idx in (t_print_list):
-        # if (t_idx < 5):
-        plt.plot(x[:-1], c_x_history[t_idx][:-1], label=f't = {t_idx}')
-
-    plt.xlabel('x (m)')
-    plt.ylabel('Concentration')
-    plt.title(f'Concentration Evolution across X at y = {round(yt,2)}')
-    plt.legend()
-    plt.grid(True)
+def get_transect_distance(transect, x_grid, y_grid):
+    # jarak kumulatif (m) sepanjang sel-sel transect
+    ix, iy = transect['cells']
+    segment = np.hypot(np.diff(x_grid[ix]), np.diff(y_grid[iy]))
+    return np.concatenate([[0.0], np.cumsum(segment)])
+
+def concentration_along_transect(transect, x_grid, y_grid):
+    fig, ax = new_figure()
+    distance = get_transect_distance(transect, x_grid, y_grid)
+    for step, values in get_transect_history(transect).items():
+        ax.plot(distance, values, label=f't = {step}')
+    ax.set_xlabel('Distance along transect (m)')
+    ax.set_ylabel('Concentration')
+    ax.set_title(f"Concentration along {transect['name']}")
+    ax.legend()
+    ax.grid(True)
     return fig
 
+def probes_to_csv(delta_t, probe_history, labels):
+    time_points = np.arange(len(probe_history)) * delta_t
+    buf = io.StringIO()
+    table = np.column_stack([time_points, probe_history])
+    np.savetxt(buf, table, delimiter=",", header=",".join(['time_s'] + [f'"{label}"' for label in labels]), comments="")
+    return buf.getvalue()
+
+def transect_to_csv(transect, x_grid, y_grid, delta_t):
+    # satu baris per sel transect, satu kolom per step yang direkam
+    ix, iy = transect['cells']
+    history = get_transect_history(transect)
+    table = np.column_stack([x_grid[ix], y_grid[iy], get_transect_distance(transect, x_grid, y_grid)] + list(history.values()))
+    header = ['x_m', 'y_m', 'distance_m'] + [f"t_{step * delta_t:.4f}s" for step in history]
+    buf = io.StringIO()
+    np.savetxt(buf, table, delimiter=",", header=",".join(header), comments="")
+    return buf.getvalue()
+
 def export_gif(fig, frames, fps=10, progress=None):
     images = []
     total = len(frames)
@@ -212,43 +221,223 @@ def export_gif(fig, frames, fps=10, progress=None):
     gif_bytes.seek(0)
     return gif_bytes
 
-def show_animation(c, dt_max, x_grid, y_grid):
-    st.markdown(
-        """
-        <style>
-            .plotly .updatemenu-button:hover rect {
-                fill: var(--secondary-background-color) !important;
-            }
-        </style>
-        """,
-        unsafe_allow_html=True
-    )
+# 240 warna Inferno untuk konsentrasi + 16 abu-abu untuk teks/axis, jadi frame bisa langsung
+# ditulis sebagai gambar palet GIF tanpa kuantisasi warna per frame
+RASTER_LEVELS = 240
+
+def get_raster_palette():
+    inferno = matplotlib.colormaps['inferno'](np.linspace(0, 1, RASTER_LEVELS))[:, :3]
+    greys = np.linspace(0, 1, 256 - RASTER_LEVELS)[:, None].repeat(3, axis=1)
+    return np.round(np.vstack([inferno, greys]) * 255).astype(np.uint8)
+
+def get_raster_template(zmax, x_grid, y_grid, palette):
+    # overlay statis (judul, axis, colorbar) dirender sekali dengan matplotlib,
+    # area plot diisi frame konsentrasi untuk setiap frame
+    fig, ax = new_figure(figsize=(7, 5), dpi=100)
+    image = ax.imshow(np.zeros((len(y_grid), len(x_grid))), cmap='inferno', vmin=0, vmax=zmax, origin='lower', aspect='auto',
+                      extent=(x_grid[0], x_grid[-1], y_grid[0], y_grid[-1]))
+    fig.colorbar(image, ax=ax, label='Concentration (kg/m\u00B3)')
+    ax.set_xlabel('X (m)')
+    ax.set_ylabel('Y (m)')
+    ax.set_title('Pollutant Dispersion Simulation')
+    fig.canvas.draw()
+    rgb = np.asarray(fig.canvas.buffer_rgba())[:, :, :3]
+    bbox = ax.get_window_extent()
+
+    height = rgb.shape[0]
+    box = (int(np.ceil(bbox.x0)), int(np.ceil(height - bbox.y1)), int(bbox.x1), int(height - bbox.y0)) # kiri, atas, kanan, bawah
+    palette_image = Image.new('P', (1, 1))
+    palette_image.putpalette(palette.flatten().tolist())
+    template = np.array(Image.fromarray(rgb).quantize(palette=palette_image, dither=Image.Dither.NONE))
+    return template, box
+
+def rasterize_frames(c, dt_max, x_grid, y_grid, steps, frame_idx, workers=4):
+    # generator gambar palet (PIL, mode "P") per frame, dirasterisasi paralel di thread pool
+    # dengan look-ahead terbatas sehingga tidak semua frame disimpan di memori sekaligus
+    palette = get_raster_palette()
+    zmax = float(np.max(c)) or 1.0
+    template, (left, top, right, bottom) = get_raster_template(zmax, x_grid, y_grid, palette)
+    # nearest-neighbour dari piksel area plot ke sel grid, y terbesar di atas
+    rows = (len(y_grid) - 1 - np.arange(bottom - top) * len(y_grid) // (bottom - top))
+    cols = np.arange(right - left) * len(x_grid) // (right - left)
+    scale = (RASTER_LEVELS - 1) / zmax
+    text_colour = RASTER_LEVELS # abu-abu paling gelap
+
+    def render(i):
+        k = frame_idx[i]
+        levels = np.clip(np.asarray(c[k]) * scale, 0, RASTER_LEVELS - 1).astype(np.uint8)
+        frame = template.copy()
+        frame[top:bottom, left:right] = levels.T[rows[:, None], cols[None, :]]
+        image = Image.fromarray(frame, mode='P')
+        image.putpalette(palette.flatten().tolist())
+        ImageDraw.Draw(image).text((left, 4), f"t = {steps[i] * dt_max:.2f} s", fill=text_colour)
+        return image
+
+    chunk = max(1, workers) * 4
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(frame_idx), chunk):
+            for image in executor.map(render, range(start, min(start + chunk, len(frame_idx)))):
+                yield image
+
+def write_gif(out, images, duration, loop=0):
+    # GIF ditulis frame per frame ke out, jadi hanya look-ahead rasterize_frames yang ada di memori
+    # (Image.save dengan append_images mengumpulkan semua frame dulu sebelum menulis).
+    # Semua frame memakai palet tetap get_raster_palette, cukup satu global color table di header.
+    # Seperti Pillow, setelah frame pertama hanya kotak piksel yang berubah dari frame sebelumnya yang ditulis.
+    count = 0
+    previous = None
+    for image in images:
+        frame = np.asarray(image)
+        part, offset = image, (0, 0)
+        if previous is None:
+            header, _ = GifImagePlugin.getheader(image, info={'loop': loop, 'duration': duration})
+            for block in header:
+                out.write(block)
+        else:
+            rows, cols = np.nonzero(frame != previous)
+            top, left = (int(rows.min()), int(cols.min())) if len(rows) else (0, 0)
+            bottom, right = (int(rows.max()) + 1, int(cols.max()) + 1) if len(rows) else (1, 1)
+            part, offset = image.crop((left, top, right, bottom)), (left, top)
+        for block in GifImagePlugin.getdata(part, offset, duration=duration):
+            out.write(block)
+        previous = frame
+        count += 1
+    if count:
+        out.write(b";") # trailer
+    return count
+
+def export_animation(c, dt_max, x_grid, y_grid, steps=None, fmt="gif", fps=10, max_frames=None, frame_sampling="uniform", workers=4, progress=None):
+    # ekspor langsung dari array konsentrasi (tanpa Kaleido): GIF ditulis bertahap (write_gif), MP4 lewat imageio-ffmpeg
+    # (juga bertahap), WebP lewat Pillow yang menahan semua frame terkompresi di encoder sampai selesai
+    # progress (opsional): dipanggil dengan fraksi frame selesai, jika mengembalikan False ekspor dihentikan dan hasilnya None
+    if steps is None:
+        steps = np.arange(c.shape[0])
+    frame_idx = select_animation_frames(c, max_frames, frame_sampling)
+    steps = np.asarray(steps)[frame_idx]
+    total = len(frame_idx)
+    stopped = []
+
+    def tracked(images):
+        for i, image in enumerate(images):
+            if progress is not None and progress((i + 1) / total) is False:
+                stopped.append(i)
+                return
+            yield image
+
+    images = tracked(rasterize_frames(c, dt_max, x_grid, y_grid, steps, frame_idx, workers))
+    out = io.BytesIO()
+    if fmt == "mp4":
+        try:
+            import imageio_ffmpeg  # noqa: F401
+        except ImportError:
+            raise RuntimeError("MP4 export requires imageio-ffmpeg (pip install imageio-ffmpeg).")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "animation.mp4")
+            with imageio.get_writer(path, format="FFMPEG", mode="I", fps=fps, macro_block_size=1) as writer:
+                for image in images:
+                    writer.append_data(np.asarray(image.convert('RGB')))
+            with open(path, "rb") as f:
+                out.write(f.read())
+    elif fmt == "gif":
+        write_gif(out, images, int(1000 / fps))
+    else:
+        images = (image.convert('RGB') for image in images)
+        first = next(images, None)
+        if first is not None:
+            first.save(out, format=fmt.upper(), save_all=True, append_images=images, duration=int(1000 / fps), loop=0, optimize=False)
+    if stopped:
+        return None
+    out.seek(0)
+    return out
+
+def select_animation_frames(c, max_frames=None, sampling="uniform"):
+    # pilih paling banyak max_frames frame, merata dalam waktu atau (adaptive)
+    # lebih rapat di bagian di mana field paling banyak berubah
+    n = c.shape[0]
+    if max_frames is None or n <= max_frames:
+        return np.arange(n)
+    if sampling == "adaptive":
+        change = np.array([np.abs(c[k] - c[k-1]).max() for k in range(1, n)])
+        cumulative = np.concatenate([[0.0], np.cumsum(change)])
+        if cumulative[-1] > 0:
+            idx = np.searchsorted(cumulative, np.linspace(0, cumulative[-1], max_frames))
+            return np.unique(np.concatenate([np.clip(idx, 0, n-1), [0, n-1]]))
+    return np.unique(np.linspace(0, n-1, max_frames).round().astype(int))
+
+def round_significant(z, digits):
+    # bulatkan setiap nilai ke digits digit signifikan (presisi relatif per nilai, bukan desimal tetap terhadap zmax)
+    z = np.asarray(z, dtype=np.float64)
+    magnitude = np.floor(np.log10(np.abs(z), out=np.zeros_like(z), where=z != 0))
+    shift = digits - 1 - magnitude
+    up = 10.0 ** np.maximum(shift, 0)
+    down = 10.0 ** np.maximum(-shift, 0) # dipisah agar pembaginya selalu pangkat 10 yang eksak
+    return np.round(z * up / down) * down / up
+
+def quantize_frame(z, zmax, quantize=None):
+    # payload heatmap yang lebih kecil: uint8 (0-255 terhadap zmax) atau float16 (~4 digit signifikan per nilai)
+    if quantize == "uint8":
+        return np.round(np.clip(z / zmax, 0, 1) * 255).astype(np.uint8)
+    if quantize == "float16":
+        # presisi float16 tanpa cast: m/Q bisa jauh di atas batas float16 (65504) dan menjadi inf,
+        # dan nilai kecil di ujung plume tetap punya presisi relatif yang sama
+        return round_significant(z, 4)
+    if z.dtype == np.float32:
+        # float32 (~7 digit signifikan) dibulatkan agar JSON tidak berisi digit sisa konversi ke float64
+        return round_significant(z, 7)
+    return z
+
+# style tombol play/pause animasi, ditampilkan halaman bersama chart animasi
+# (show_animation bisa berjalan di thread job, di luar script Streamlit)
+ANIMATION_CSS = """
+<style>
+    .plotly .updatemenu-button:hover rect {
+        fill: var(--secondary-background-color) !important;
+    }
+</style>
+"""
+
+def show_animation(c, dt_max, x_grid, y_grid, steps=None, max_frames=None, frame_sampling="uniform", max_cells=None, quantize=None):
+    # max_frames: batas jumlah frame di animasi, max_cells: batas jumlah sel per axis untuk tampilan,
+    # quantize: "uint8" / "float16" untuk memperkecil HTML dan payload chart
+
+    if steps is None:
+        steps = np.arange(c.shape[0])
+    frame_idx = select_animation_frames(c, max_frames, frame_sampling)
+    steps = np.asarray(steps)[frame_idx]
+    t = len(frame_idx)
+    stride = (steps[-1] - steps[0]) / (t - 1) if t > 1 else 1
+    # cukup desimal agar label waktu antar frame tidak sama
+    decimals = max(2, int(np.ceil(-np.log10(dt_max * stride))) + 1) if dt_max * stride > 0 else 2
+    zmax_val = float(np.max(c))
+    if zmax_val <= 0:
+        zmax_val = 1.0
+
+    # downsampling spasial hanya untuk tampilan
+    sx = int(np.ceil(len(x_grid) / max_cells)) if max_cells else 1
+    sy = int(np.ceil(len(y_grid) / max_cells)) if max_cells else 1
+    x_grid = x_grid[::sx]
+    y_grid = y_grid[::sy]
+
+    if quantize == "uint8":
+        heatmap_style = dict(colorscale='Inferno', zmin=0, zmax=255,
+                             colorbar=dict(tickvals=np.linspace(0, 255, 6).tolist(),
+                                           ticktext=[f"{v:.3g}" for v in np.linspace(0, zmax_val, 6)]))
+    else:
+        heatmap_style = dict(colorscale='Inferno', zmin=0, zmax=zmax_val)
+
+    def frame_z(k):
+        return quantize_frame(np.rot90(np.flipud(c[k, ::sx, ::sy]), k=-1), zmax_val, quantize)
 
-    t = c.shape[0]
-    ny, nx = c.shape[1], c.shape[2]
-    zmax_val = np.max(c)
     frames = [
         go.Frame(
-            data=[go.Heatmap(
-                z=np.rot90(np.flipud(c[k]), k=-1),
-                colorscale='Inferno',
-                zmin=0,
-                zmax=zmax_val
-                # zmax=np.percentile(c, 99)
-            )],
-            name=f"t={k * dt_max:.2f}s"
+            data=[go.Heatmap(z=frame_z(k), **heatmap_style)],
+            name=f"step={steps[i]}"
         )
-        for k in range(t)
+        for i, k in enumerate(frame_idx)
     ]
 
     fig = go.Figure(
-        data=[go.Heatmap(
-            z=np.rot90(np.flipud(c[0]), k=-1),
-            colorscale='Inferno',
-            zmin=0,
-            zmax=zmax_val
-            # zmax=np.percentile(c, 99)
-        )],
+        data=[go.Heatmap(z=frame_z(frame_idx[0]), **heatmap_style)],
         frames=frames
     )
 
@@ -267,7 +456,7 @@ def show_animation(c, dt_max, x_grid, y_grid):
         yaxis_title='Y (m)',
         updatemenus=[{
             "buttons": [
-                {"args": [None, {"frame": {"duration": 1000 * dt_max, "redraw": True},
+                {"args": [None, {"frame": {"duration": 1000 * dt_max * stride, "redraw": True},
                                  "fromcurrent": True, "mode": "immediate"}],
                  "label": "Play",
                  "method": "animate"},
@@ -283,9 +472,9 @@ def show_animation(c, dt_max, x_grid, y_grid):
         }],
         sliders=[{
             "steps": [
-                {"args": [[f"t={k * dt_max:.2f}s"],
+                {"args": [[f"step={steps[k]}"],
                           {"frame": {"duration": 0, "redraw": True}}],
-                 "label": f"{k * dt_max:.2f}s",
+                 "label": f"{steps[k] * dt_max:.{decimals}f}s",
                  "method": "animate"}
                 for k in range(t)
             ],
@@ -0,0 +1,129 @@
+import json
+import os
+
+import numpy as np
+
+# Penyimpanan hasil simulasi di disk: frames.npy (memory-mapped) + meta.json.
+# Frame ditulis langsung ke memmap selama analyze, dan dibaca kembali tanpa memuat seluruh array ke RAM.
+
+FRAMES_FILE = "frames.npy"
+HISTORY_FILE = "c_history.npy"
+PROBES_FILE = "probe_history.npy"
+CHECKPOINT_FILE = "checkpoint.npz"
+PEAK_FILE = "peak.npy"
+PEAK_STEP_FILE = "peak_step.npy"
+META_FILE = "meta.json"
+
+def create_store(path, steps, field_shape, meta=None, dtype=np.float64):
+    os.makedirs(path, exist_ok=True)
+    frames = np.lib.format.open_memmap(os.path.join(path, FRAMES_FILE), mode="w+", dtype=dtype,
+                                       shape=(len(steps),) + tuple(field_shape))
+    meta = dict(meta or {})
+    meta['steps'] = [int(k) for k in steps]
+    meta['shape'] = list(frames.shape)
+    meta['dtype'] = np.dtype(dtype).name
+    write_meta(path, meta)
+    return frames
+
+def extend_store(path, steps, frame_count):
+    # frames.npy berukuran tetap: buat file baru sepanjang steps, salin frame_count frame lama per blok, lalu ganti
+    old = np.load(os.path.join(path, FRAMES_FILE), mmap_mode="r")
+    tmp_path = os.path.join(path, FRAMES_FILE + ".tmp")
+    frames = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=old.dtype, shape=(len(steps),) + old.shape[1:])
+    for start in range(0, frame_count, 64):
+        stop = min(start + 64, frame_count)
+        frames[start:stop] = old[start:stop]
+    frames.flush()
+    del old, frames
+    os.replace(tmp_path, os.path.join(path, FRAMES_FILE))
+    meta = read_meta(path)
+    meta['steps'] = [int(k) for k in steps]
+    meta['shape'] = [len(steps)] + meta['shape'][1:]
+    write_meta(path, meta)
+    return np.load(os.path.join(path, FRAMES_FILE), mmap_mode="r+")
+
+def write_meta(path, meta):
+    with open(os.path.join(path, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2, default=float)
+
+def finalize_store(path, frames, c_history, probe_history=None, peak=None, peak_step=None, **extra_meta):
+    # simpan riwayat target (dan semua probe) serta jumlah frame yang benar-benar terisi (run bisa berhenti lebih awal)
+    # peak, peak_step: konsentrasi tertinggi per sel dan step-nya (core.PeakTracker), dibaca query.RunQuery
+    frames.flush()
+    np.save(os.path.join(path, HISTORY_FILE), np.asarray(c_history))
+    if probe_history is not None:
+        np.save(os.path.join(path, PROBES_FILE), np.asarray(probe_history))
+    if peak is not None:
+        np.save(os.path.join(path, PEAK_FILE), np.asarray(peak))
+        np.save(os.path.join(path, PEAK_STEP_FILE), np.asarray(peak_step))
+    meta = read_meta(path)
+    meta.update(extra_meta)
+    write_meta(path, meta)
+
+def save_checkpoint(path, checkpoint):
+    # field terakhir, step, dt dan hash koefisien (lihat core.get_fields_hash) untuk melanjutkan run
+    np.savez(os.path.join(path, CHECKPOINT_FILE), field=checkpoint['field'], step=checkpoint['step'],
+             delta_t=checkpoint['delta_t'], fields_hash=checkpoint['fields_hash'])
+
+def load_checkpoint(path):
+    with np.load(os.path.join(path, CHECKPOINT_FILE)) as data:
+        return {'field': data['field'], 'step': int(data['step']), 'delta_t': float(data['delta_t']),
+                'fields_hash': str(data['fields_hash'])}
+
+def load_run_state(path):
+    # run tersimpan sebagai dict result analyze_stream (tanpa transect), untuk analyze_stream(resume=...)
+    frames, meta = open_store(path)
+    probes = [tuple(point) for point in meta.get('probes') or [[meta['xt'], meta['yt']]]]
+    if os.path.exists(os.path.join(path, PROBES_FILE)):
+        probe_history = read_probe_history(path)
+    else:
+        probe_history = read_c_history(path)[:, None]
+    peak, peak_step = read_peaks(path)
+    return {
+        'frames': frames, 'steps': np.asarray(meta['steps'], dtype=int), 'frame_count': len(frames),
+        'probes': probes, 'probe_history': probe_history, 'transects': [],
+        'last_step': meta.get('last_step', int(meta['steps'][-1])), 'checkpoint': load_checkpoint(path),
+        'peak': peak, 'peak_step': peak_step
+    }
+
+def read_peaks(path):
+    # (peak, peak_step) atau (None, None) jika run disimpan tanpa track_peaks
+    if not os.path.exists(os.path.join(path, PEAK_FILE)):
+        return None, None
+    return np.load(os.path.join(path, PEAK_FILE)), np.load(os.path.join(path, PEAK_STEP_FILE))
+
+def read_meta(path):
+    with open(os.path.join(path, META_FILE)) as f:
+        return json.load(f)
+
+def open_store(path):
+    meta = read_meta(path)
+    frames = np.load(os.path.join(path, FRAMES_FILE), mmap_mode="r")
+    frame_count = meta.get('frame_count', frames.shape[0])
+    return frames[:frame_count], meta
+
+def read_c_history(path):
+    return np.load(os.path.join(path, HISTORY_FILE), mmap_mode="r")
+
+def read_probe_history(path):
+    # (last_step+1, n_probe), kolom 0 = titik target, koordinat indeks di meta['probes']
+    return np.load(os.path.join(path, PROBES_FILE), mmap_mode="r")
+
+def get_frame_index(meta, step):
+    # frame tersimpan yang paling dekat (tidak melewati) step yang diminta
+    steps = np.asarray(meta['steps'])
+    return max(int(np.searchsorted(steps, step, side="right")) - 1, 0)
+
+def read_frame(frames, meta, step):
+    return np.array(frames[get_frame_index(meta, step)])
+
+def read_probe(frames, x_idx, y_idx):
+    # riwayat satu titik di semua frame tersimpan
+    return np.array(frames[:, x_idx, y_idx])
+
+def read_transect(frames, meta, step, y_idx=None, x_idx=None):
+    # profil sepanjang x pada y_idx, atau sepanjang y pada x_idx
+    k = get_frame_index(meta, step)
+    if y_idx is not None:
+        return np.array(frames[k, :, y_idx])
+    return np.array(frames[k, x_idx, :])
@@ -0,0 +1,172 @@
+import os
+
+import numpy as np
+
+from core import (
+    get_fields,
+    check_params,
+    get_x_y_input,
+    get_monitoring_points,
+    get_operator,
+    get_transect_cells,
+    get_transect_steps,
+    get_snapshot_every,
+    analyze_stream
+)
+
+# Superposisi fungsi Green: FTCS/ADI linear dan koefisiennya tetap terhadap waktu, jadi
+#   c(k) = c_in B(k) + sum_s sum_j q_s(j) G_s(k - j)
+# dengan B respons field seragam 1 (termasuk baris x = 0 yang ditahan nol) dan G_s respons impuls satuan
+# di sel sumber s. B dan setiap G_s dihitung sekali lewat analyze_stream (frame snapshot, opsional memmap
+# di store_path), lalu kombinasi lokasi, massa dan jadwal pelepasan apa pun hanya butuh konvolusi waktu.
+#   - riwayat probe disimpan setiap step, jadi hasilnya eksak (konvolusi langsung, FFT untuk jadwal panjang)
+#   - frame hanya ada di step snapshot: pelepasan pada step j memakai frame respons dengan lag k - j,
+#     diinterpolasi linear antar lag tersimpan, eksak jika semua step pelepasan kelipatan snapshot_every
+# Massa mengikuti konvensi HydroVision: pelepasan m kg menambah konsentrasi sel sebesar m / Q.
+# Run Analyze biasa mengganti sel pelepasan dengan m / Q, setara dengan massa m - c_in Q di sini.
+
+FFT_THRESHOLD = 50000 # (jumlah step pelepasan) x (panjang respons) di atas ini memakai FFT
+
+def get_source_cell(x, y, source):
+    # titik (meter) ke sel interior terdekat, sama seperti titik pelepasan di get_x_y_input
+    _, _, x_in, y_in, _, _, _, _ = get_x_y_input(x, source[0], y, source[1], source[0], source[1])
+    return int(x_in), int(y_in)
+
+def get_schedule(release, t, delta_t, Q):
+    # release: {'mass': m} (sesaat pada 'step', default 0), {'schedule': [m_0, m_1, ...]} massa per step,
+    # atau {'rate': kg/s, 'start': s, 'stop': s} pelepasan kontinu. Hasil: kenaikan konsentrasi per step (t+1,)
+    schedule = np.zeros(t+1)
+    if 'schedule' in release:
+        masses = np.asarray(release['schedule'], dtype=float)[:t+1]
+        schedule[:len(masses)] = masses
+    elif 'rate' in release:
+        times = np.arange(t+1) * delta_t
+        start = release.get('start', 0.0)
+        stop = release.get('stop', t * delta_t)
+        schedule[(times >= start) & (times < stop)] = release['rate'] * delta_t
+    else:
+        step = int(release.get('step', 0))
+        if step <= t:
+            schedule[step] = release['mass']
+    return schedule / Q
+
+def convolve_schedule(schedule, response, method="auto"):
+    # (schedule * response)[k] = sum_j schedule[j] response[k - j] untuk k <= t, response boleh (t+1, n)
+    n = len(response)
+    schedule = np.asarray(schedule, dtype=float)[:n]
+    response = np.asarray(response, dtype=float)
+    release_steps = np.flatnonzero(schedule)
+    if method == "auto":
+        method = "fft" if len(release_steps) * n > FFT_THRESHOLD else "direct"
+    if method == "fft":
+        size = 1 << (2 * n - 1).bit_length()
+        spectrum = np.fft.rfft(schedule, size).reshape((-1,) + (1,) * (response.ndim - 1)) * np.fft.rfft(response, size, axis=0)
+        return np.fft.irfft(spectrum, size, axis=0)[:n]
+    out = np.zeros(response.shape)
+    for j in release_steps:
+        out[j:] += schedule[j] * response[:n-j]
+    return out
+
+def get_lag_weights(schedule, steps):
+    # W[a, m]: bobot frame respons dengan lag steps[m] untuk frame hasil pada steps[a].
+    # Lag yang tidak tersimpan dibagi linear ke dua lag tersimpan di sekitarnya.
+    weights = np.zeros((len(steps), len(steps)))
+    release_steps = np.flatnonzero(schedule)
+    for a, k in enumerate(steps):
+        j = release_steps[release_steps <= k]
+        if len(j) == 0:
+            continue
+        lag = k - j
+        lower = np.minimum(np.searchsorted(steps, lag, side="right") - 1, len(steps) - 2)
+        fraction = (lag - steps[lower]) / (steps[lower+1] - steps[lower])
+        weights[a] = np.bincount(lower, weights=schedule[j] * (1 - fraction), minlength=len(steps))
+        weights[a] += np.bincount(lower + 1, weights=schedule[j] * fraction, minlength=len(steps))
+    return weights
+
+class ResponseLibrary:
+    # library = ResponseLibrary(params, sources=[(100, 500), (300, 200)])
+    # result = library.superpose([{'source': 0, 'mass': 5000}, {'source': 1, 'rate': 2.0, 'start': 0, 'stop': 600}])
+    # result punya format yang sama dengan analyze_stream, jadi get_stream_result dan plot bisa dipakai langsung.
+    def __init__(self, params, sources, snapshot_every=None, store_path=None, profiler=None):
+        self.params = params
+        fields = get_fields(params)
+        self.x, self.y, delta_x, delta_y, u, v, P, R = fields
+        stable, CFL, dt_diff_limit, self.delta_t = check_params(params, fields)
+        if not stable:
+            raise ValueError(f"Unstable parameters: CFL = {CFL}, delta t limit = {dt_diff_limit}")
+        self.t = int(params['t'])
+        solver = params.get('solver', 'ftcs')
+        if solver == "analytic":
+            raise ValueError("Response libraries need a numerical solver (ftcs or adi).")
+        _, _, _, _, _, _, xt_idx, yt_idx = get_x_y_input(self.x, params['x0'], self.y, params['y0'], params['xt'], params['yt'])
+        self.target = (int(xt_idx), int(yt_idx))
+        self.probes, self.transects = get_monitoring_points(params, self.x, self.y)
+        self.sources = [get_source_cell(self.x, self.y, source) for source in sources]
+        if snapshot_every is None:
+            snapshot_every = get_snapshot_every(params)
+        self.snapshot_every = snapshot_every
+        self.store_path = store_path
+
+        dtype = params.get('dtype', 'float64')
+        operator = get_operator(solver, u, v, P, R, delta_x, delta_y, self.delta_t, params.get('backend', 'numpy'), dtype=dtype)
+        self._run_args = (P, R, u, v, delta_x, delta_y, self.delta_t)
+        self._operator = operator
+        self._solver = solver
+
+        # respons background: field seragam 1, baris x = 0 ditahan nol seperti run biasa
+        self.background = self._run(np.ones((len(self.x), len(self.y)), dtype=dtype), "background", profiler)
+        self.responses = []
+        for n, (i, j) in enumerate(self.sources):
+            c0 = np.zeros((len(self.x), len(self.y)), dtype=dtype)
+            c0[i, j] = 1
+            self.responses.append(self._run(c0, f"source_{n}", profiler, active_region=solver == "ftcs"))
+        self.steps = self.background['steps']
+
+    def _run(self, c0, name, profiler, active_region=False):
+        result = {}
+        store_path = os.path.join(self.store_path, name) if self.store_path is not None else None
+        P, R, u, v, delta_x, delta_y, delta_t = self._run_args
+        stream = analyze_stream(self.t, c0, P, R, u, v, delta_x, delta_y, delta_t, *self.target, snapshot_every=self.snapshot_every,
+                                operator=self._operator, solver=self._solver, result=result, store_path=store_path,
+                                store_meta={'params': self.params, 'response': name}, probes=self.probes,
+                                transect_steps=[0], active_region=active_region)
+        if profiler is not None:
+            with profiler.stage("response", name=name, t=self.t) as record:
+                for _ in stream:
+                    pass
+                record['active_full_step'] = result['active_full_step']
+        else:
+            for _ in stream:
+                pass
+        return result
+
+    def superpose(self, releases, c_in=None, method="auto"):
+        # releases: list of dict dengan 'source' (indeks di sources) dan massa/jadwal (lihat get_schedule)
+        c_in = self.params.get('c_in', 0.1) if c_in is None else c_in
+        Q = self.params['Q']
+        probe_history = c_in * np.asarray(self.background['probe_history'], dtype=float)
+        frames = c_in * np.asarray(self.background['frames'], dtype=float)
+        flat = frames.reshape(len(self.steps), -1)
+        for release in releases:
+            response = self.responses[release['source']]
+            schedule = get_schedule(release, self.t, self.delta_t, Q)
+            probe_history += convolve_schedule(schedule, response['probe_history'], method)
+            flat += get_lag_weights(schedule, self.steps) @ np.asarray(response['frames']).reshape(len(self.steps), -1)
+
+        # transect diambil dari frame hasil superposisi pada frame terdekat (tidak melewati) step transect
+        record_steps = get_transect_steps(self.t)
+        frame_idx = np.unique(np.searchsorted(self.steps, record_steps, side="right") - 1)
+        transect_data = []
+        nx, ny = len(self.x), len(self.y)
+        for transect in [{'kind': "row", 'y': self.target[1], 'name': "target_row"}] + list(self.transects):
+            ix, iy = get_transect_cells(transect, nx, ny)
+            transect_data.append({
+                'name': transect.get('name', f"transect_{len(transect_data)}"), 'kind': transect['kind'],
+                'cells': (ix, iy), 'flat': np.ravel_multi_index((ix, iy), (nx, ny)),
+                'steps': [int(self.steps[n]) for n in frame_idx], 'values': frames[frame_idx][:, ix, iy]
+            })
+        return {
+            'frames': frames, 'steps': self.steps, 'frame_count': len(self.steps),
+            'probes': self.background['probes'], 'probe_history': probe_history, 'transects': transect_data,
+            'last_step': self.t, 'stop_reason': None, 'stop_step': None, 'active_full_step': None
+        }
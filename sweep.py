@@ -0,0 +1,98 @@
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from core import (
+    DEFAULT_PARAMS,
+    check_params,
+    run_simulation
+)
+
+# Sweep parameter yang mengubah ukuran grid (grid_x, grid_y, len_x, len_y, t) sehingga
+# tidak bisa ditumpuk seperti ensemble. Setiap case dijalankan di worker ProcessPoolExecutor
+# dengan pipeline yang sama seperti app.py.
+
+RESULT_COLUMNS = ['case', 'stable', 'skipped', 'CFL', 'dt_diff_limit', 'delta_t', 'end_time',
+                  'max_concentration', 'max_concentration_t', 'max_concentration_idx']
+
+def expand_grid(grid, base_params=None):
+    # grid: dict {key: [nilai, ...]} (cartesian product) atau list of dict
+    base = dict(DEFAULT_PARAMS if base_params is None else base_params)
+    if isinstance(grid, dict):
+        keys = list(grid.keys())
+        combos = [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+    else:
+        combos = list(grid)
+    return [{**base, **combo} for combo in combos]
+
+def case_key(params):
+    return json.dumps(params, sort_keys=True, default=str)
+
+def get_stability_row(params, stable, CFL, dt_diff_limit, delta_t, skipped=False):
+    return {'case': case_key(params), 'stable': stable, 'skipped': skipped, 'CFL': CFL,
+            'dt_diff_limit': dt_diff_limit, 'delta_t': delta_t, 'end_time': int(params['t']) * delta_t}
+
+def run_case(params):
+    summary, _ = run_simulation(params, snapshot_every=int(params['t']))
+    row = {'case': case_key(params), 'skipped': False}
+    row.update(summary)
+    return row
+
+def load_results(results_path):
+    rows = {}
+    if results_path is not None and os.path.exists(results_path):
+        with open(results_path) as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    rows[row['case']] = row
+    return rows
+
+def run_sweep(cases, max_workers=None, results_path=None, progress=None):
+    # results_path: file JSON lines, setiap hasil ditulis begitu selesai,
+    # sehingga sweep yang terhenti bisa dilanjutkan tanpa mengulang case yang sudah selesai.
+    done = load_results(results_path)
+    rows = {}
+    pending = []
+    for params in cases:
+        key = case_key(params)
+        if key in done:
+            rows[key] = done[key]
+            continue
+        stable, CFL, dt_diff_limit, delta_t = check_params(params)
+        if not stable:
+            # case tidak stabil tidak dikirim ke worker
+            rows[key] = get_stability_row(params, stable, CFL, dt_diff_limit, delta_t, skipped=True)
+            append_result(results_path, rows[key])
+        else:
+            pending.append(params)
+
+    total = len(pending)
+    if total > 0:
+        # spawn, bukan fork: proses yang sudah menjalankan kernel numba paralel (thread TBB/OpenMP) bisa macet setelah fork
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = {executor.submit(run_case, params): case_key(params) for params in pending}
+            for i, future in enumerate(as_completed(futures)):
+                row = future.result()
+                rows[futures[future]] = row
+                append_result(results_path, row)
+                if progress is not None:
+                    progress((i + 1) / total)
+
+    return [rows[case_key(params)] for params in cases]
+
+def append_result(results_path, row):
+    if results_path is None:
+        return
+    with open(results_path, 'a') as f:
+        f.write(json.dumps(row) + '\n')
+
+def write_table(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS, extrasaction='ignore')
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
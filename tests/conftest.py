@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modul HydroVision ada di root repo (tanpa package), sama seperti benchmarks/run_benchmarks.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
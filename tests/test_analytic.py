@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from analytic import GaussianPuff
+from core import DEFAULT_PARAMS, SPINUP_CELLS, check_reference, get_fields, get_initial_field, run_simulation
+
+# plume di tengah sungai, jauh dari tepi selama run, sebaran beberapa sel setelah spin-up
+PUFF = dict(DEFAULT_PARAMS, a=0.0, b=0.0, x0=300, y0=500, xt=500, yt=500, v0=0.0, P0=10.0, R0=10.0, t=200)
+
+def test_analytic_solver_frames_are_the_puff():
+    params = dict(PUFF, solver="analytic", snapshot_every=50)
+    summary, (frames, c_history, _, steps) = run_simulation(params)
+    x, y, delta_x, delta_y, u, v, P, R = get_fields(params)
+    c0, points = get_initial_field(params, x, y)
+    puff = GaussianPuff(u, v, P, R, c0, x, y)
+    for frame, k in zip(frames, steps):
+        np.testing.assert_allclose(frame, puff.frame(k * summary['delta_t']), rtol=1e-12)
+    np.testing.assert_allclose(c_history, puff.history(np.arange(params['t'] + 1) * summary['delta_t'], points[6], points[7]), rtol=1e-12)
+
+def test_puff_conserves_mass_away_from_the_boundaries():
+    params = dict(PUFF, c_in=0.0)
+    x, y, delta_x, delta_y, u, v, P, R = get_fields(params)
+    c0, _ = get_initial_field(params, x, y)
+    puff = GaussianPuff(u, v, P, R, c0, x, y)
+    for time in (50.0, 200.0, 600.0): # pusat puff bergerak u0 t = 25 .. 300 m, masih jauh dari x = m
+        assert puff.frame(time).sum() == pytest.approx(c0.sum(), rel=1e-3)
+
+def test_check_reference_agrees_for_adi_after_spin_up():
+    check = check_reference(dict(PUFF, solver="adi"))
+    assert check['agrees']
+    assert check['max_rel_error_target'] < 0.05 and check['max_rel_error_field'] < 0.05
+    # ADI dt sekitar 20 s: sebaran sqrt(2 P k dt) mencapai SPINUP_CELLS sel (dx sekitar 10 m) pada step 7
+    assert check['spinup_step'] == 7
+
+def test_check_reference_rejects_a_puff_narrower_than_the_grid():
+    # default R0 = 0.01: sebaran lateral tidak pernah mencapai SPINUP_CELLS sel selama run
+    with pytest.raises(ValueError, match=f"narrower than {SPINUP_CELLS} grid cells"):
+        check_reference(dict(DEFAULT_PARAMS, a=0.0, b=0.0, solver="adi"))
+
+def test_check_reference_can_be_stopped():
+    assert check_reference(dict(PUFF, solver="adi"), progress=lambda fraction: fraction < 0.5) is None
@@ -0,0 +1,57 @@
+import numpy as np
+
+from cache import ResultCache, params_key, simulation_key
+from core import DEFAULT_PARAMS
+
+def test_keys_ignore_ui_and_query_params():
+    params = dict(DEFAULT_PARAMS)
+    assert params_key(params) == params_key(dict(params, live=True, backend="numba"))
+    assert params_key(params) == params_key(dict(params, t=float(params['t'])))
+    assert params_key(params) != params_key(dict(params, t=params['t'] + 1))
+    assert simulation_key(params) == simulation_key(dict(params, xt=500, yt=200, chart_points=400))
+    assert params_key(params) != params_key(dict(params, xt=500))
+
+def test_target_threshold_keeps_the_target_in_the_key():
+    # run yang berhenti saat konsentrasi target turun lagi tidak boleh dipakai ulang untuk target lain
+    params = dict(DEFAULT_PARAMS, stop_criteria={'target_threshold': 0.1})
+    assert simulation_key(params) != simulation_key(dict(params, xt=500))
+    assert simulation_key(params) != simulation_key(dict(params, yt=200))
+    assert simulation_key(params) == simulation_key(dict(params, chart_points=400))
+    steady = dict(DEFAULT_PARAMS, stop_criteria={'steady_tol': 1e-4, 'steady_steps': 10})
+    assert simulation_key(steady) == simulation_key(dict(steady, xt=500))
+
+def test_get_returns_a_copy():
+    cache = ResultCache(memory_bytes=2**20, disk_bytes=0)
+    cache.put("a", {'frames': np.arange(4.0)})
+    first = cache.get("a")
+    first['frames'][0] = 99
+    np.testing.assert_array_equal(cache.get("a")['frames'], np.arange(4.0))
+    assert cache.get("b") is None
+    assert cache.summary()['memory_hits'] == 2 and cache.summary()['misses'] == 1
+
+def test_memory_lru_eviction():
+    cache = ResultCache(memory_bytes=3000, disk_bytes=0)
+    for key in "abc":
+        assert cache.put(key, {'frames': np.zeros(100)})
+    cache.get("a") # a baru dipakai, b paling lama
+    cache.put("d", {'frames': np.zeros(100)})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("d") is not None
+    assert cache.summary()['memory_bytes_used'] <= 3000
+
+def test_disk_tier(tmp_path):
+    cache = ResultCache(memory_bytes=0, disk_bytes=2**20, cache_dir=str(tmp_path))
+    cache.put("a", {'frames': np.ones(10)})
+    reopened = ResultCache(memory_bytes=2**20, disk_bytes=2**20, cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(reopened.get("a")['frames'], np.ones(10))
+    assert reopened.summary()['disk_hits'] == 1
+
+def test_oversized_entry_is_rejected_before_pickling(tmp_path):
+    class Unpicklable:
+        def __reduce__(self):
+            raise AssertionError("pickled an entry that is over the budget")
+    cache = ResultCache(memory_bytes=1000, disk_bytes=2000, cache_dir=str(tmp_path))
+    frames = np.lib.format.open_memmap(str(tmp_path / "frames.npy"), mode="w+", dtype=np.float64, shape=(10, 10, 10))
+    assert not cache.put("a", {'frames': frames, 'figure': Unpicklable()})
+    assert cache.get("a") is None
+    assert cache.summary()['rejected'] == 1 and cache.summary()['disk_entries'] == 0
@@ -0,0 +1,47 @@
+import json
+
+import numpy as np
+import pytest
+
+from cli import main
+from store import open_store, read_c_history
+
+PARAMS = {'grid_x': 30, 'grid_y': 20, 't': 40, 'x0': 200, 'y0': 500, 'xt': 400, 'yt': 500, 'snapshot_every': 10}
+
+def write_params(tmp_path, **overrides):
+    path = tmp_path / "params.json"
+    path.write_text(json.dumps(dict(PARAMS, **overrides)))
+    return str(path)
+
+def read_summary(output):
+    with open(f"{output}/summary.json") as f:
+        return json.load(f)
+
+def test_run_writes_summary_and_frames(tmp_path, capsys):
+    output = str(tmp_path / "out")
+    assert main([write_params(tmp_path), "-o", output]) == 0
+    assert "Peak concentration" in capsys.readouterr().out
+    summary = read_summary(output)
+    assert summary['stable'] and summary['last_step'] == PARAMS['t']
+    assert summary['params']['grid_x'] == PARAMS['grid_x']
+    assert [stage['stage'] for stage in summary['stages']] == ["fields", "stability", "stepping"]
+    frames, meta = open_store(output)
+    assert list(meta['steps']) == [0, 10, 20, 30, 40]
+    assert frames.shape == (5, PARAMS['grid_x'], PARAMS['grid_y'])
+    assert len(read_c_history(output)) == PARAMS['t'] + 1
+
+def test_continue_matches_a_single_longer_run(tmp_path):
+    params_path = write_params(tmp_path)
+    output = str(tmp_path / "out")
+    assert main([params_path, "-o", output]) == 0
+    assert main([params_path, "-o", output, "--continue", "20"]) == 0
+    assert read_summary(output)['last_step'] == 60
+
+    direct = str(tmp_path / "direct")
+    assert main([write_params(tmp_path, t=60), "-o", direct]) == 0
+    np.testing.assert_allclose(read_c_history(output), read_c_history(direct), rtol=1e-12)
+    np.testing.assert_allclose(np.asarray(open_store(output)[0]), np.asarray(open_store(direct)[0]), rtol=1e-12)
+
+def test_continue_needs_a_saved_run(tmp_path):
+    with pytest.raises(SystemExit, match="No saved run"):
+        main([write_params(tmp_path), "-o", str(tmp_path / "empty"), "--continue", "10"])
@@ -0,0 +1,293 @@
+import numpy as np
+import pytest
+
+from store import load_run_state, open_store
+
+from core import (
+    DEFAULT_PARAMS, ActiveRegion, FTCSOperator, analyze, analyze_stream, check_precision, check_stability, get_delta_t, get_fields,
+    get_initial_field, get_probe_result, get_snapshot_every, get_transect_cells, get_transect_history, thomas_factor, thomas_solve,
+    cs_1_x, cs_1_y, cs_2_x, cs_2_y
+)
+
+def baseline_analyze(t, c0, P, R, u, v, delta_x, delta_y, delta_t, xt, yt):
+    # loop analyze asli (array penuh (t+1, nx, ny), RHS dari cs_* di setiap step), sebagai acuan
+    c = np.zeros((t + 1,) + c0.shape)
+    c[0] = c0
+    for k in range(1, t + 1):
+        RHS = (cs_1_x(P, delta_x) * cs_1_x(c[k-1], delta_x) +
+               P[1:-1,1:-1] * cs_2_x(c[k-1], delta_x) +
+               cs_1_y(R, delta_y) * cs_1_y(c[k-1], delta_y) +
+               R[1:-1,1:-1] * cs_2_y(c[k-1], delta_y) -
+               c[k-1][1:-1,1:-1] * cs_1_x(u, delta_x) -
+               u[1:-1,1:-1] * cs_1_x(c[k-1], delta_x) -
+               c[k-1][1:-1,1:-1] * cs_1_y(v, delta_y) -
+               v[1:-1,1:-1] * cs_1_y(c[k-1], delta_y))
+        c[k, 1:-1, 1:-1] = c[k-1, 1:-1, 1:-1] + delta_t * RHS
+        c[k, -1, :] = c[k, -2, :] # x = m
+        c[k, :, 0] = c[k, :, 1] # y = 0
+        c[k, :, -1] = c[k, :, -2] # y = n
+    return c, c[:, xt, yt], {k: c[k, :, yt] for k in range(t + 1)}
+
+def setup_run(**overrides):
+    params = dict(DEFAULT_PARAMS, grid_x=40, grid_y=30, t=60, x0=200, y0=500, xt=400, yt=500, **overrides)
+    x, y, delta_x, delta_y, u, v, P, R = get_fields(params)
+    delta_t = get_delta_t(u, v, delta_x, delta_y, P, R)
+    c0, points = get_initial_field(params, x, y)
+    xt, yt = points[6], points[7]
+    return params, (c0, P, R, u, v, delta_x, delta_y, delta_t, xt, yt)
+
+def test_ftcs_operator_matches_baseline_step():
+    params, (c0, P, R, u, v, delta_x, delta_y, delta_t, xt, yt) = setup_run(a=0.02, b=0.03)
+    expected = baseline_analyze(1, c0, P, R, u, v, delta_x, delta_y, delta_t, xt, yt)[0][1]
+    c_next = np.zeros_like(c0)
+    FTCSOperator(u, v, P, R, delta_x, delta_y, delta_t).step(c0, c_next)
+    np.testing.assert_allclose(c_next[1:-1, 1:-1], expected[1:-1, 1:-1], rtol=1e-12, atol=1e-12 * np.abs(expected).max())
+
+@pytest.mark.parametrize("a, b", [(0.0, 0.0), (0.01, 0.01), (0.02, -0.01)])
+def test_analyze_matches_baseline(a, b):
+    params, args = setup_run(a=a, b=b)
+    c0, P, R, u, v, delta_x, delta_y, delta_t, xt, yt = args
+    t = params['t']
+    expected, expected_history, expected_x_history = baseline_analyze(t, *args)
+    frames, c_history, c_x_history, steps = analyze(t, c0.copy(), *args[1:], snapshot_every=1, transect_steps=list(range(t + 1)))
+    scale = np.abs(expected).max()
+    assert list(steps) == list(range(t + 1))
+    np.testing.assert_allclose(np.asarray(frames), expected, rtol=0, atol=1e-13 * scale)
+    np.testing.assert_allclose(c_history, expected_history, rtol=0, atol=1e-13 * scale)
+    for k, values in c_x_history.items():
+        np.testing.assert_allclose(values, expected_x_history[k], rtol=0, atol=1e-13 * scale)
+
+def test_analyze_stream_snapshots_and_history():
+    # frame hanya di setiap snapshot_every, riwayat target tetap setiap step
+    params, args = setup_run()
+    t = params['t']
+    expected, expected_history, _ = baseline_analyze(t, *args)
+    result = {}
+    streamed = [k for k, _, _ in analyze_stream(t, args[0].copy(), *args[1:], snapshot_every=7, stream_every=10, result=result)]
+    frames, c_history, _, steps = analyze(t, args[0].copy(), *args[1:], snapshot_every=7)
+    assert streamed == [0, 10, 20, 30, 40, 50, 60]
+    assert list(steps) == list(range(0, t + 1, 7)) + [t]
+    scale = np.abs(expected).max()
+    np.testing.assert_allclose(np.asarray(frames), expected[steps], rtol=0, atol=1e-13 * scale)
+    np.testing.assert_allclose(c_history, expected_history, rtol=0, atol=1e-13 * scale)
+
+def test_snapshot_every_defaults_to_max_frames():
+    # tanpa snapshot_every hanya sekitar max_frames frame disimpan, bukan t+1
+    assert get_snapshot_every(dict(DEFAULT_PARAMS, t=4000)) == 20
+    assert get_snapshot_every(dict(DEFAULT_PARAMS, t=4000, max_frames=1000)) == 4
+    assert get_snapshot_every(dict(DEFAULT_PARAMS, t=50)) == 1
+    assert get_snapshot_every(dict(DEFAULT_PARAMS, t=4000, snapshot_every=1)) == 1
+
+def test_thomas_solve_matches_dense_solve():
+    rng = np.random.default_rng(3)
+    n, batch = 12, 4
+    lower, upper = rng.uniform(-1, 0, (n, batch)), rng.uniform(-1, 0, (n, batch))
+    diag = 3 + rng.uniform(0, 1, (n, batch))
+    rhs = rng.normal(size=(n, batch))
+    out = thomas_solve(thomas_factor(lower, diag, upper), rhs, np.empty_like(rhs))
+    for b in range(batch):
+        matrix = np.diag(diag[:, b]) + np.diag(lower[1:, b], -1) + np.diag(upper[:-1, b], 1)
+        np.testing.assert_allclose(out[:, b], np.linalg.solve(matrix, rhs[:, b]), rtol=1e-12)
+
+@pytest.mark.parametrize("R0", [0.01, 5.0])
+def test_adi_agrees_with_ftcs_at_small_dt(R0):
+    params, args = setup_run(a=0.01, b=0.01, R0=R0)
+    c0, P, R, u, v, delta_x, delta_y, delta_t, xt, yt = args
+    t = 4 * params['t']
+    ftcs = analyze(t, c0.copy(), P, R, u, v, delta_x, delta_y, delta_t / 4, xt, yt, snapshot_every=4)[0]
+    adi = analyze(t, c0.copy(), P, R, u, v, delta_x, delta_y, delta_t / 4, xt, yt, snapshot_every=4, solver="adi")[0]
+    scale = np.abs(np.asarray(ftcs[1:])).max()
+    assert np.abs(np.asarray(adi[1:]) - np.asarray(ftcs[1:])).max() / scale < 0.01
+
+def test_adi_is_stable_beyond_the_ftcs_diffusion_limit():
+    params, args = setup_run(R0=5.0)
+    c0, P, R, u, v, delta_x, delta_y, delta_t, xt, yt = args
+    delta_t_adi = get_delta_t(u, v, delta_x, delta_y, P, R, solver="adi")
+    assert delta_t_adi > delta_t
+    assert check_stability(u, v, P, R, delta_x, delta_y, delta_t_adi, solver="adi")[0]
+    assert not check_stability(u, v, P, R, delta_x, delta_y, delta_t_adi)[0]
+    frames = np.asarray(analyze(params['t'], c0.copy(), P, R, u, v, delta_x, delta_y, delta_t_adi, xt, yt, solver="adi")[0])
+    assert np.isfinite(frames).all()
+    assert frames[1:].max() <= c0.max()
+
+def early_stop_run(t=600):
+    # a = b = 0 dan c_in = 0: plume lewat titik target lalu keluar dari potongan sungai dalam t step
+    params, args = setup_run(a=0.0, b=0.0, c_in=0.0)
+    frames, c_history, _, _ = analyze(t, args[0].copy(), *args[1:], snapshot_every=1)
+    return args, np.asarray(frames), np.asarray(c_history)
+
+def expected_stop_step(frames, c_history, criteria):
+    # aturan EarlyStop dihitung ulang dari run penuh (background = 0)
+    quiet = 0
+    reached = False
+    release = frames[0].sum()
+    for k in range(1, len(frames)):
+        if 'steady_tol' in criteria:
+            quiet = quiet + 1 if np.abs(frames[k] - frames[k-1]).max() < criteria['steady_tol'] else 0
+            if quiet >= criteria['steady_steps']:
+                return k, "steady_state"
+        if 'mass_fraction' in criteria and np.maximum(frames[k], 0).sum() < criteria['mass_fraction'] * release:
+            return k, "plume_exit"
+        if 'target_threshold' in criteria:
+            if c_history[k] >= criteria['target_threshold']:
+                reached = True
+            elif reached:
+                return k, "target_decayed"
+    return None, None
+
+@pytest.mark.parametrize("criteria", [
+    {'steady_tol': 30.0, 'steady_steps': 5},
+    {'mass_fraction': 0.5},
+    {'target_threshold': 50.0}
+])
+def test_early_stop_truncates_the_run_at_the_stop_step(criteria):
+    args, full_frames, full_history = early_stop_run()
+    stop_step, reason = expected_stop_step(full_frames, full_history, criteria)
+    assert 0 < stop_step < len(full_frames) - 1
+    result = {}
+    frames, c_history, c_x_history, steps = analyze(len(full_frames) - 1, args[0].copy(), *args[1:], snapshot_every=40,
+                                                    stop_criteria=dict(criteria, c_background=0.0), result=result, transect_steps=[0, 100, 200, 300, 400, 500, 600])
+    assert (result['stop_reason'], result['stop_step'], result['last_step']) == (reason, stop_step, stop_step)
+    # frame terakhir selalu step berhenti, frame lain tetap di kelipatan snapshot_every sebelum step itu
+    assert list(steps) == [k for k in range(0, stop_step, 40)] + [stop_step]
+    np.testing.assert_array_equal(np.asarray(frames), full_frames[steps])
+    np.testing.assert_array_equal(c_history, full_history[:stop_step+1])
+    assert sorted(c_x_history) == [k for k in range(0, stop_step, 100)] + [stop_step]
+    for k, values in c_x_history.items():
+        np.testing.assert_array_equal(values, full_frames[k, :, args[-1]])
+    assert result['checkpoint']['step'] == stop_step
+    np.testing.assert_array_equal(result['checkpoint']['field'], full_frames[stop_step])
+
+def test_early_stop_is_recorded_in_the_store(tmp_path):
+    args, full_frames, _ = early_stop_run()
+    path = str(tmp_path / "run")
+    result = {}
+    analyze(len(full_frames) - 1, args[0].copy(), *args[1:], snapshot_every=40, stop_criteria={'mass_fraction': 0.5, 'c_background': 0.0},
+            store_path=path, result=result)
+    frames, meta = open_store(path)
+    assert meta['stop_reason'] == "plume_exit" and meta['last_step'] == result['stop_step']
+    assert meta['steps'][:meta['frame_count']][-1] == result['stop_step']
+    np.testing.assert_array_equal(np.asarray(frames[-1]), full_frames[result['stop_step']])
+
+def test_check_precision_flags_float32_drift():
+    params = dict(DEFAULT_PARAMS, grid_x=40, grid_y=30, t=200, x0=200, y0=500, xt=400, yt=500)
+    same = check_precision(params, dtype="float64")
+    assert same['agrees'] and same['max_rel_error_target'] == 0 and same['max_rel_error_field'] == 0
+    report = check_precision(params)
+    # float32: ~7 digit signifikan, jadi ada drift kecil tetapi masih jauh di bawah rtol bawaan
+    assert report['dtype'] == "float32" and report['agrees']
+    assert 1e-9 < report['max_rel_error_target'] < 1e-5
+    drift = check_precision(params, rtol=report['max_rel_error_target'] / 2)
+    assert not drift['agrees']
+    assert check_precision(params, progress=lambda fraction: fraction < 0.5) is None
+
+def probe_run(**kwargs):
+    params, args = setup_run(a=0.01, b=0.01)
+    probes = [(5, 5), (20, 15), (38, 28)]
+    transects = [{'kind': "column", 'x': 12, 'name': "across"}, {'kind': "polyline", 'points': [(2, 3), (30, 20), (35, 1)], 'name': "bend"}]
+    result = {}
+    frames, _, _, steps = analyze(params['t'], args[0].copy(), *args[1:], snapshot_every=1, probes=probes, transects=transects,
+                                  result=result, **kwargs)
+    return args, probes, result, np.asarray(frames), steps
+
+def test_probe_history_matches_the_frames():
+    (c0, P, R, u, v, delta_x, delta_y, delta_t, xt, yt), probes, result, frames, steps = probe_run()
+    probe_history, probe_points = get_probe_result(result)
+    assert probe_points == [(xt, yt)] + probes
+    assert probe_history.shape == (len(steps), len(probes) + 1)
+    for n, (i, j) in enumerate(probe_points):
+        np.testing.assert_array_equal(probe_history[:, n], frames[:, i, j])
+
+def test_transects_sample_the_frames_at_the_recorded_steps():
+    args, _, result, frames, _ = probe_run(transect_steps=[0, 17, 60])
+    names = [transect['name'] for transect in result['transects']]
+    assert names == ["target_row", "across", "bend"]
+    for transect in result['transects']:
+        ix, iy = transect['cells']
+        history = get_transect_history(transect)
+        assert list(history) == [0, 17, 60]
+        for k, values in history.items():
+            np.testing.assert_array_equal(values, frames[k][ix, iy])
+
+def test_polyline_transect_visits_every_cell_along_the_segments():
+    ix, iy = get_transect_cells({'kind': "polyline", 'points': [(0, 0), (4, 2), (4, 5)]}, 10, 10)
+    assert list(zip(ix, iy)) == [(0, 0), (1, 0), (2, 1), (3, 2), (4, 2), (4, 3), (4, 4), (4, 5)]
+    ix, iy = get_transect_cells({'kind': "polyline", 'points': [(2, 3), (30, 20), (35, 1)]}, 40, 30)
+    # sel berurutan selalu bertetangga (termasuk diagonal), tanpa celah
+    assert (ix[0], iy[0]) == (2, 3) and (ix[-1], iy[-1]) == (35, 1)
+    assert np.abs(np.diff(ix)).max() <= 1 and np.abs(np.diff(iy)).max() <= 1
+    ix, iy = get_transect_cells({'kind': "polyline", 'points': [(-3, 2), (12, 2)]}, 10, 5)
+    assert ix.min() == 0 and ix.max() == 9 and (iy == 2).all()
+    with pytest.raises(ValueError, match="Unknown transect kind"):
+        get_transect_cells({'kind': "circle"}, 10, 10)
+
+@pytest.mark.parametrize("c_in, a", [(0.0, 0.0), (0.0, 0.02), (1.0, 0.0), (1.0, 0.02)])
+def test_active_region_is_identical_to_full_update(c_in, a):
+    # tol = 0: hasil harus sama persis, termasuk background != 0 dengan div(u) != 0
+    params, args = setup_run(a=a, b=a, c_in=c_in)
+    t = params['t']
+    full = analyze(t, args[0].copy(), *args[1:], snapshot_every=3)
+    result = {}
+    active = analyze(t, args[0].copy(), *args[1:], snapshot_every=3, active_region=True, result=result)
+    np.testing.assert_array_equal(np.asarray(active[0]), np.asarray(full[0]))
+    np.testing.assert_array_equal(active[1], full[1])
+    assert result['active_full_step'] is None or 0 < result['active_full_step'] <= t
+
+def test_active_region_starts_small_for_a_clean_river():
+    params, args = setup_run(c_in=0.0, a=0.0, b=0.0)
+    c0, P, R, u, v, delta_x, delta_y, delta_t = args[:8]
+    region = ActiveRegion(FTCSOperator(u, v, P, R, delta_x, delta_y, delta_t), c0)
+    assert region.fraction() == 1 / c0.size
+    i0, i1, j0, j1 = region.grow()
+    assert (i1 - i0, j1 - j0) == (3, 3)
+
+@pytest.mark.parametrize("solver", ["ftcs", "adi"])
+def test_resume_matches_a_direct_run(solver):
+    params, args = setup_run(a=0.01, b=0.01)
+    t = params['t']
+    direct = {}
+    analyze(t, args[0].copy(), *args[1:], snapshot_every=4, solver=solver, result=direct, probes=[(5, 5)], track_peaks=True)
+    first = {}
+    # checkpoint di kelipatan snapshot_every, jadi frame step terakhir run pertama juga frame run langsung
+    analyze(24, args[0].copy(), *args[1:], snapshot_every=4, solver=solver, result=first, probes=[(5, 5)], track_peaks=True)
+    resumed = {}
+    analyze(t, None, *args[1:], snapshot_every=4, solver=solver, result=resumed, resume=first, track_peaks=True)
+    frame_count = direct['frame_count']
+    assert resumed['frame_count'] == frame_count
+    np.testing.assert_array_equal(resumed['steps'][:frame_count], direct['steps'][:frame_count])
+    np.testing.assert_array_equal(np.asarray(resumed['frames'][:frame_count]), np.asarray(direct['frames'][:frame_count]))
+    np.testing.assert_array_equal(resumed['probe_history'], direct['probe_history'])
+    np.testing.assert_array_equal(resumed['peak'], direct['peak'])
+    np.testing.assert_array_equal(resumed['checkpoint']['field'], direct['checkpoint']['field'])
+
+def test_resume_from_store_matches_a_direct_run(tmp_path):
+    params, args = setup_run()
+    t = params['t']
+    direct = analyze(t, args[0].copy(), *args[1:], snapshot_every=5)
+    path = str(tmp_path / "run")
+    analyze(30, args[0].copy(), *args[1:], snapshot_every=5, store_path=path)
+    resumed = analyze(t, None, *args[1:], snapshot_every=5, store_path=path, resume=load_run_state(path))
+    np.testing.assert_array_equal(np.asarray(resumed[0]), np.asarray(direct[0]))
+    np.testing.assert_array_equal(resumed[1], direct[1])
+    frames, meta = open_store(path)
+    assert meta['last_step'] == t and frames.shape[0] == len(direct[3])
+
+def test_resume_rejects_a_different_run():
+    params, args = setup_run()
+    first = {}
+    analyze(20, args[0].copy(), *args[1:], result=first)
+    c0, P, R, u, v, delta_x, delta_y, delta_t, xt, yt = args
+    with pytest.raises(ValueError, match="different coefficients"):
+        analyze(40, None, P * 2, R, u, v, delta_x, delta_y, delta_t, xt, yt, resume=first)
+    with pytest.raises(ValueError, match="already reached step 20"):
+        analyze(20, None, *args[1:], resume=first)
+
+def test_resume_accepts_copied_fields():
+    # cache hasil menyalin run_info lewat pickle: view broadcast menjadi array penuh dengan nilai yang sama
+    params, args = setup_run()
+    c0, P, R, u, v, delta_x, delta_y, delta_t, xt, yt = args
+    assert 0 in u.strides
+    first = {}
+    analyze(20, c0.copy(), *args[1:], result=first)
+    resumed = analyze(40, None, np.array(P), np.array(R), np.array(u), np.array(v), delta_x, delta_y, delta_t, xt, yt, resume=first)
+    np.testing.assert_array_equal(resumed[1], analyze(40, c0.copy(), *args[1:])[1])
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from core import DEFAULT_PARAMS, run_simulation
+from ensemble import MEMBER_KEYS, run_ensemble
+
+GRID = dict(grid_x=40, grid_y=30, len_x=1000, len_y=1000, t=60, x0=200, y0=500, xt=400, yt=500)
+
+MEMBERS = [
+    {key: DEFAULT_PARAMS[key] for key in MEMBER_KEYS},
+    dict({key: DEFAULT_PARAMS[key] for key in MEMBER_KEYS}, u0=0.8, P0=40.0, a=0.02, m=5000),
+    dict({key: DEFAULT_PARAMS[key] for key in MEMBER_KEYS}, v0=0.05, R0=0.5, b=0.0, Q=2.0, c_in=0.0)
+]
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_member_matches_a_single_run(dtype):
+    # dt_mode="member": setiap member memakai dt-nya sendiri, sama seperti run tunggal
+    result = run_ensemble(MEMBERS, dt_mode="member", dtype=dtype, **GRID)
+    for n, member in enumerate(MEMBERS):
+        summary, (frames, c_history, _, _) = run_simulation(dict(DEFAULT_PARAMS, **GRID, **member, dtype=np.dtype(dtype).name), snapshot_every=GRID['t'])
+        rtol = 1e-12 if dtype == np.float64 else 1e-5
+        assert result['delta_t'][n] == pytest.approx(summary['delta_t'], rel=1e-12)
+        np.testing.assert_allclose(result['c_history'][n], c_history, rtol=0, atol=rtol * np.abs(c_history).max())
+        np.testing.assert_allclose(result['c_last'][n], frames[-1], rtol=0, atol=rtol * np.abs(frames[0]).max())
+        assert result['max_concentration'][n] == pytest.approx(summary['max_concentration'], rel=rtol)
+
+def test_shared_dt_uses_the_smallest_member_dt():
+    shared = run_ensemble(MEMBERS, dt_mode="shared", **GRID)
+    member = run_ensemble(MEMBERS, dt_mode="member", **GRID)
+    assert shared['delta_t'] == member['delta_t'].min()
+    assert shared['stable'].all()
+    np.testing.assert_allclose(shared['time_common'], np.arange(GRID['t'] + 1) * shared['delta_t'])
+    low, mid, high = (shared['envelope'][p] for p in (5, 50, 95))
+    assert np.all(low <= mid) and np.all(mid <= high)
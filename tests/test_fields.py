@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from core import DEFAULT_PARAMS, analyze, get_delta_t, get_fields, get_initial_field, get_pr, get_uv, run_simulation
+from fields import build_field
+
+PARAMS = dict(DEFAULT_PARAMS, grid_x=40, grid_y=30, t=60, x0=200, y0=500, xt=400, yt=500, a=0.02, b=0.03)
+
+def baseline_uv_pr(u0, v0, P0, R0, a, b, x_grid, y_grid):
+    # loop per sel get_uv / get_pr asli, sebagai acuan
+    u = np.zeros((len(x_grid), len(y_grid)))
+    v = np.zeros((len(x_grid), len(y_grid)))
+    P = np.zeros((len(x_grid), len(y_grid)))
+    R = np.zeros((len(x_grid), len(y_grid)))
+    for x in range(len(x_grid)):
+        for y in range(len(y_grid)):
+            u[x, y] = u0 * (1 + a * x_grid[x])
+            v[x, y] = v0 * (1 + b * y_grid[y])
+            P[x, y] = P0 * ((1 + a * x_grid[x])**2)
+            R[x, y] = R0 * ((1 + b * y_grid[y])**2)
+    return u, v, P, R
+
+def run(params, u, v, P, R):
+    x, y, delta_x, delta_y = get_fields(params)[:4]
+    delta_t = get_delta_t(u, v, delta_x, delta_y, P, R)
+    c0, points = get_initial_field(params, x, y)
+    return analyze(int(params['t']), c0, P, R, u, v, delta_x, delta_y, delta_t, points[6], points[7], snapshot_every=10)
+
+def test_uniform_fields_are_bit_identical_to_the_baseline_loops():
+    x, y, _, _, u, v, P, R = get_fields(PARAMS)
+    expected = baseline_uv_pr(PARAMS['u0'], PARAMS['v0'], PARAMS['P0'], PARAMS['R0'], PARAMS['a'], PARAMS['b'], x, y)
+    for field, reference in zip((u, v, P, R), expected):
+        np.testing.assert_array_equal(field, reference)
+    np.testing.assert_array_equal(np.concatenate(get_uv(PARAMS['u0'], PARAMS['v0'], PARAMS['a'], PARAMS['b'], x, y)), np.concatenate(expected[:2]))
+    np.testing.assert_array_equal(np.concatenate(get_pr(PARAMS['P0'], PARAMS['R0'], PARAMS['a'], PARAMS['b'], x, y)), np.concatenate(expected[2:]))
+    # view hasil broadcast tidak mengubah analyze sama sekali
+    frames, c_history, _, steps = run(PARAMS, u, v, P, R)
+    baseline_frames, baseline_history, _, baseline_steps = run(PARAMS, *expected)
+    np.testing.assert_array_equal(np.asarray(frames), np.asarray(baseline_frames))
+    np.testing.assert_array_equal(c_history, baseline_history)
+    np.testing.assert_array_equal(steps, baseline_steps)
+
+def test_rank1_profiles_are_not_materialized():
+    x, y, _, _, u, v, P, R = get_fields(PARAMS)
+    assert u.strides[1] == 0 and v.strides[0] == 0
+    assert not u.flags.writeable
+
+@pytest.mark.parametrize("suffix", [".npy", ".csv"])
+def test_raster_field_is_read_from_a_file(tmp_path, suffix):
+    x, y = get_fields(PARAMS)[:2]
+    raster = 0.3 + 0.2 * np.random.default_rng(0).random((len(x), len(y)))
+    path = str(tmp_path / f"u{suffix}")
+    if suffix == ".npy":
+        np.save(path, raster)
+    else:
+        np.savetxt(path, raster, delimiter=",", fmt="%.17g")
+    u = get_fields(dict(PARAMS, u_field=path))[4]
+    np.testing.assert_array_equal(u, raster)
+    summary, result = run_simulation(dict(PARAMS, u_field=path), snapshot_every=10)
+    direct = run(PARAMS, raster, *get_fields(PARAMS)[5:])
+    np.testing.assert_array_equal(np.asarray(result[0]), np.asarray(direct[0]))
+
+def test_raster_with_the_wrong_shape_is_rejected():
+    with pytest.raises(ValueError, match="does not match the \\(40, 30\\) grid"):
+        get_fields(dict(PARAMS, P_field=np.ones((30, 40))))
+
+def test_callable_field_is_evaluated_on_the_grid():
+    x, y = get_fields(PARAMS)[:2]
+    spec = lambda X, Y: 80.0 * (1 + 0.001 * X) + 5.0 * np.sin(Y / 200.0)
+    expected = 80.0 * (1 + 0.001 * x[:, None]) + 5.0 * np.sin(y[None, :] / 200.0)
+    P = build_field(spec, x, y)
+    np.testing.assert_array_equal(P, expected)
+    assert build_field(spec, x, y, dtype=np.float32).dtype == np.float32
+    _, result = run_simulation(dict(PARAMS, P_field=spec), snapshot_every=10)
+    u, v, _, R = get_fields(PARAMS)[4:]
+    direct = run(PARAMS, u, v, expected, R)
+    np.testing.assert_array_equal(np.asarray(result[0]), np.asarray(direct[0]))
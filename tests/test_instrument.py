@@ -0,0 +1,46 @@
+import threading
+import tracemalloc
+
+import numpy as np
+
+from instrument import Profiler, array_info
+
+def test_stage_records_time_and_allocations():
+    profiler = Profiler(track_memory=True)
+    with profiler.stage("outer", t=3) as record:
+        data = np.ones(2**20)
+        record['arrays'] = array_info(data=data)
+        with profiler.stage("inner"):
+            np.ones(2**19)
+    inner, outer = profiler.records
+    assert (outer['stage'], outer['t']) == ("outer", 3)
+    assert outer['alloc_peak_bytes'] >= data.nbytes and inner['alloc_peak_bytes'] >= 2**19 * 8
+    assert outer['arrays']['data']['nbytes'] == data.nbytes
+    assert profiler.total() == outer['wall_s'] + inner['wall_s']
+    assert not tracemalloc.is_tracing()
+
+def test_concurrent_jobs_do_not_share_tracemalloc():
+    # tracemalloc berlaku untuk seluruh proses: job kedua dicatat tanpa byte alokasi, job pertama tetap utuh
+    first, second = Profiler(track_memory=True), Profiler(track_memory=True)
+    started, checked = threading.Event(), threading.Event()
+
+    def job():
+        with first.stage("stepping"):
+            data = np.ones(2**20)
+            started.set()
+            checked.wait(10)
+            del data
+
+    thread = threading.Thread(target=job)
+    thread.start()
+    started.wait(10)
+    with second.stage("stepping"):
+        np.ones(2**18)
+    checked.set()
+    thread.join()
+    assert first.records[0]['alloc_peak_bytes'] >= 2**20 * 8
+    assert 'alloc_bytes' not in second.records[0] and second.records[0]['memory_skipped']
+    assert not tracemalloc.is_tracing()
+    with second.stage("after"):
+        pass
+    assert 'alloc_bytes' in second.records[1]
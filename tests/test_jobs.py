@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JobManager
+
+def wait(job, timeout=5.0):
+    deadline = time.time() + timeout
+    while not job.done() and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+def test_job_result_and_progress():
+    manager = JobManager(max_workers=1, max_queued=1)
+
+    def work(job, n):
+        for i in range(n):
+            job.report((i + 1) / n, f"step {i}")
+        return n * 2
+
+    job = wait(manager.get(manager.submit(work, 5)))
+    assert (job.status, job.result, job.progress, job.message) == ("done", 10, 1.0, "step 4")
+    assert manager.pop(job.id) is job and manager.get(job.id) is None
+
+def test_failed_job_keeps_the_error():
+    manager = JobManager(max_workers=1)
+
+    def work(job):
+        raise ValueError("bad parameters")
+
+    job = wait(manager.get(manager.submit(work)))
+    assert job.status == "failed" and job.error == "ValueError: bad parameters"
+
+def test_cancel_running_and_queued_jobs():
+    manager = JobManager(max_workers=1, max_queued=2)
+    started = threading.Event()
+
+    def work(job):
+        started.set()
+        while not job.cancelled():
+            time.sleep(0.01)
+        return "partial"
+
+    running = manager.get(manager.submit(work))
+    queued = manager.get(manager.submit(work))
+    assert started.wait(5)
+    manager.cancel(queued.id)
+    assert queued.status == "cancelled" # belum mulai, langsung selesai
+    manager.cancel(running.id)
+    assert wait(running).status == "cancelled" and running.result == "partial"
+    assert wait(queued).result is None
+
+def test_submit_is_refused_when_the_queue_is_full():
+    manager = JobManager(max_workers=1, max_queued=1)
+    release = threading.Event()
+    ids = [manager.submit(lambda job: release.wait(5)) for _ in range(2)]
+    with pytest.raises(RuntimeError, match="already running 2 jobs"):
+        manager.submit(lambda job: None)
+    assert manager.summary()['running'] + manager.summary()['queued'] == 2
+    release.set()
+    for job_id in ids:
+        assert wait(manager.get(job_id)).status == "done"
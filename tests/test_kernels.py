@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import numpy as np
+import pytest
+
+from core import analyze
+from test_core import setup_run
+
+pytest.importorskip("numba")
+
+@pytest.mark.parametrize("dtype, active_region", [("float64", False), ("float32", False), ("float64", True)])
+def test_numba_backend_matches_numpy(dtype, active_region):
+    params, args = setup_run(a=0.01, b=0.01, c_in=0.0, dtype=dtype)
+    c0, rest = args[0], args[1:]
+    t = params['t']
+    expected = analyze(t, c0.copy(), *rest, snapshot_every=5, active_region=active_region)
+    frames, c_history, _, steps = analyze(t, c0.copy(), *rest, snapshot_every=5, backend="numba", active_region=active_region)
+    assert np.asarray(frames).dtype == np.dtype(dtype)
+    tolerance = 1e-5 if dtype == "float32" else 1e-12
+    scale = np.abs(np.asarray(expected[0])).max()
+    np.testing.assert_allclose(np.asarray(frames), np.asarray(expected[0]), rtol=0, atol=tolerance * scale)
+    np.testing.assert_allclose(c_history, expected[1], rtol=0, atol=tolerance * scale)
+    # boundary dari kernel fused sama dengan apply_bc: x = 0 nol, Neumann di x = m dan y = 0, n
+    last = np.asarray(frames[-1])
+    assert (last[0] == 0).all()
+    np.testing.assert_array_equal(last[-1], last[-2])
+    np.testing.assert_array_equal(last[:, 0], last[:, 1])
+    np.testing.assert_array_equal(last[:, -1], last[:, -2])
+
+def test_numba_backend_runs_in_concurrent_job_threads(tmp_path):
+    # dua job JobManager dengan backend numba: workqueue menghentikan proses (exit 134) jika kernel paralel
+    # dipanggil bersamaan dari dua thread, TBB macet saat interpreter keluar. Dijalankan di proses terpisah.
+    script = tmp_path / "jobs.py"
+    script.write_text(textwrap.dedent(f"""
+        import sys, threading
+        sys.path.insert(0, {os.path.dirname(os.path.dirname(os.path.abspath(__file__)))!r})
+        sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})
+        import numpy as np
+        from core import analyze
+        from test_core import setup_run
+        params, args = setup_run()
+        expected = analyze(params['t'], args[0].copy(), *args[1:], snapshot_every=10)
+        results = [None, None]
+        def run(n):
+            results[n] = analyze(params['t'], args[0].copy(), *args[1:], snapshot_every=10, backend="numba")
+        threads = [threading.Thread(target=run, args=(n,)) for n in range(2)]
+        [thread.start() for thread in threads]
+        [thread.join() for thread in threads]
+        for result in results:
+            np.testing.assert_allclose(np.asarray(result[0]), np.asarray(expected[0]), rtol=0, atol=1e-12 * np.abs(expected[0]).max())
+    """))
+    for layer in ("workqueue", "default"):
+        done = subprocess.run([sys.executable, str(script)], env=dict(os.environ, NUMBA_THREADING_LAYER=layer), capture_output=True, text=True, timeout=120)
+        assert done.returncode == 0, done.stderr
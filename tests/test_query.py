@@ -0,0 +1,87 @@
+import numpy as np
+
+from core import analyze, get_transect_history
+from query import RunQuery, retarget_result
+from test_core import setup_run
+
+def run(snapshot_every, xt=None, yt=None, track_peaks=True):
+    params, args = setup_run(a=0.01, b=0.01)
+    c0, P, R, u, v, delta_x, delta_y, delta_t, target_x, target_y = args
+    xt = target_x if xt is None else xt
+    yt = target_y if yt is None else yt
+    result = {}
+    analyze(params['t'], c0.copy(), P, R, u, v, delta_x, delta_y, delta_t, xt, yt, snapshot_every=snapshot_every, result=result, track_peaks=track_peaks)
+    x = np.arange(c0.shape[0]) * delta_x
+    y = np.arange(c0.shape[1]) * delta_y
+    return result, RunQuery.from_result(result, x, y, delta_t)
+
+def test_series_is_exact_with_every_step_stored():
+    result, query = run(1)
+    direct, _ = run(1, xt=25, yt=10)
+    values, exact = query.series(25, 10)
+    assert exact
+    np.testing.assert_array_equal(values, direct['probe_history'][:, 0])
+
+def test_series_is_interpolated_between_snapshots():
+    result, query = run(5)
+    direct, _ = run(1, xt=25, yt=10)
+    values, exact = query.series(25, 10)
+    assert not exact
+    steps = result['steps'][:result['frame_count']]
+    np.testing.assert_allclose(values[steps], direct['probe_history'][steps, 0], rtol=1e-12)
+    # target yang direkam tetap eksak
+    values, exact = query.series(*result['probes'][0])
+    assert exact
+    np.testing.assert_array_equal(values, result['probe_history'][:, 0])
+
+def test_retarget_back_to_the_original_target_is_exact():
+    result, query = run(5)
+    original = result['probes'][0]
+    moved = retarget_result(result, 25, 10, query)
+    assert not moved['target_exact']
+    assert moved['probes'][0] == (25, 10)
+    x, y = query.x, query.y
+    back = retarget_result(moved, *original, RunQuery.from_result(moved, x, y, query.delta_t))
+    assert back['target_exact']
+    np.testing.assert_array_equal(back['probe_history'][:, 0], result['probe_history'][:, 0])
+
+def test_continuing_a_retargeted_run_keeps_the_recorded_history():
+    # seperti continue_run di app: lanjutkan probe yang direkam, lalu target dibaca ulang dari frame
+    params, args = setup_run(a=0.01, b=0.01)
+    c0, P, R, u, v, delta_x, delta_y, delta_t, xt, yt = args
+    t = params['t']
+    full, query = run(5)
+    first = {}
+    analyze(t // 2, c0.copy(), P, R, u, v, delta_x, delta_y, delta_t, xt, yt, snapshot_every=5, result=first, track_peaks=True)
+    moved = retarget_result(first, 25, 10, RunQuery.from_result(first, query.x, query.y, delta_t))
+    resume = dict(moved, probes=moved['recorded_probes'], probe_history=moved['recorded_history'])
+    continued = {}
+    analyze(t, None, P, R, u, v, delta_x, delta_y, delta_t, 25, 10, snapshot_every=5, result=continued, resume=resume, track_peaks=True)
+    assert continued['probes'][0] == full['probes'][0]
+    np.testing.assert_allclose(continued['probe_history'], full['probe_history'], rtol=1e-12)
+    continued = retarget_result(continued, 25, 10, RunQuery.from_result(continued, query.x, query.y, delta_t))
+    expected = retarget_result(full, 25, 10, query)
+    assert not continued['target_exact']
+    np.testing.assert_allclose(continued['recorded_history'], full['probe_history'], rtol=1e-12)
+    np.testing.assert_allclose(continued['probe_history'][:, 0], expected['probe_history'][:, 0], rtol=1e-12)
+
+def test_retarget_matches_a_direct_run_with_every_step_stored():
+    result, query = run(1)
+    direct, _ = run(1, xt=25, yt=10)
+    moved = retarget_result(result, 25, 10, query)
+    assert moved['target_exact']
+    np.testing.assert_array_equal(moved['probe_history'][:, 0], direct['probe_history'][:, 0])
+    expected = get_transect_history(direct['transects'][0])
+    for step, values in get_transect_history(moved['transects'][0]).items():
+        np.testing.assert_array_equal(values, expected[step])
+
+def test_worst_matches_the_frames():
+    result, query = run(1)
+    frames = np.asarray(result['frames'])
+    worst = query.worst()
+    assert worst['value'] == frames.max()
+    assert worst['step'] == np.unravel_index(frames.argmax(), frames.shape)[0]
+    untracked, untracked_query = run(1, track_peaks=False)
+    assert untracked_query.worst() == worst
+    release = np.unravel_index(frames[0].argmax(), frames[0].shape)
+    assert query.worst(exclude=[release])['value'] < worst['value']
@@ -0,0 +1,147 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageSequence
+
+from core import analyze, get_probe_result
+from simulation import (
+    decimate_lttb, decimate_minmax, export_animation, get_probe_labels, probes_to_csv, quantize_frame, rasterize_frames, select_animation_frames, transect_to_csv, write_gif
+)
+from test_core import setup_run
+
+def get_frames(n=12, nx=30, ny=20):
+    rng = np.random.default_rng(1)
+    c = rng.uniform(0, 5, (n, nx, ny))
+    return c, np.arange(nx) * 10.0, np.arange(ny) * 10.0
+
+def get_series(n=5000):
+    rng = np.random.default_rng(2)
+    x = np.arange(n) * 0.5
+    y = np.sin(x / 40) + rng.normal(0, 0.1, n)
+    y[n // 4] = 5.0 # puncak tajam satu titik
+    y[2 * n // 3] = -4.0
+    return x, y
+
+@pytest.mark.parametrize("decimate", [decimate_minmax, decimate_lttb])
+@pytest.mark.parametrize("max_points", [2, 3, 50, 499, 500])
+def test_decimate_keeps_endpoints_and_extrema(decimate, max_points):
+    x, y = get_series()
+    dx, dy = decimate(x, y, max_points)
+    assert len(dx) <= max_points and len(dx) == len(dy)
+    assert dx[0] == x[0] and dx[-1] == x[-1]
+    assert np.all(np.diff(dx) > 0)
+    # titik yang dipilih adalah titik asli
+    np.testing.assert_array_equal(dy, y[np.searchsorted(x, dx)])
+    if max_points >= 50:
+        assert dy.max() == y.max() and dy.min() == y.min()
+
+@pytest.mark.parametrize("decimate", [decimate_minmax, decimate_lttb])
+def test_decimate_passes_short_series_through(decimate):
+    x, y = get_series(200)
+    dx, dy = decimate(x, y, 200)
+    np.testing.assert_array_equal(dx, x)
+    np.testing.assert_array_equal(dy, y)
+
+def get_blob_frames(n=12, nx=30, ny=20):
+    # hanya sebagian kecil frame yang berubah antar step (frame GIF ditulis sebagai kotak yang berubah saja)
+    c = np.zeros((n, nx, ny))
+    for k in range(n):
+        c[k, 2 + k:5 + k, 8:11] = 5.0
+    c[-1] = c[-2]
+    return c, np.arange(nx) * 10.0, np.arange(ny) * 10.0
+
+@pytest.mark.parametrize("make_frames", [get_frames, get_blob_frames])
+def test_gif_export_matches_the_rasterized_frames(make_frames):
+    c, x, y = make_frames()
+    steps = np.arange(len(c))
+    out = export_animation(c, 2.0, x, y, steps, fmt="gif", fps=5)
+    expected = list(rasterize_frames(c, 2.0, x, y, steps, select_animation_frames(c)))
+    with Image.open(out) as gif:
+        frames = [frame.convert("RGB") for frame in ImageSequence.Iterator(gif)]
+        assert gif.info['duration'] == 200 and gif.info['loop'] == 0
+    assert len(frames) == len(expected)
+    for frame, image in zip(frames, expected):
+        np.testing.assert_array_equal(np.asarray(frame), np.asarray(image.convert("RGB")))
+
+def test_write_gif_streams_frames():
+    # setiap frame ditulis sebelum frame berikutnya diminta dari iterator
+    c, x, y = get_frames()
+    images = list(rasterize_frames(c, 1.0, x, y, np.arange(len(c)), np.arange(len(c))))
+    requested = []
+
+    def produce():
+        for n, image in enumerate(images):
+            requested.append(n)
+            yield image
+
+    class Recorder(io.BytesIO):
+        writes = []
+
+        def write(self, data):
+            self.writes.append(len(requested))
+            return super().write(data)
+
+    out = Recorder()
+    assert write_gif(out, produce(), 100) == len(images)
+    assert sorted(set(out.writes)) == list(range(1, len(images) + 1))
+
+@pytest.mark.parametrize("fmt", ["gif", "webp"])
+def test_export_can_be_stopped(fmt):
+    c, x, y = get_frames()
+    seen = []
+
+    def progress(fraction):
+        seen.append(fraction)
+        return fraction < 0.5
+
+    assert export_animation(c, 1.0, x, y, fmt=fmt, progress=progress) is None
+    assert max(seen) < 1.0
+
+@pytest.mark.parametrize("zmax", [2.0, 2000.0, 1e8])
+def test_float16_quantization_keeps_relative_precision(zmax):
+    # m / Q bisa jauh di atas batas float16 (65504), nilai kecil tetap punya presisi float16 (~5e-4 relatif)
+    z = np.concatenate([[0.0], np.geomspace(1e-6 * zmax, zmax, 200)]).reshape(-1, 1)
+    quantized = quantize_frame(z, zmax, "float16")
+    assert np.isfinite(quantized).all()
+    assert quantized[0, 0] == 0
+    np.testing.assert_allclose(quantized[1:], z[1:], rtol=5e-4, atol=0)
+
+def test_float16_quantization_keeps_small_plume_values():
+    z = np.array([[1.0, 1.3, 1.7, 2.4, -0.013, 1234567.0]])
+    np.testing.assert_array_equal(quantize_frame(z, 2000.0, "float16"), [[1.0, 1.3, 1.7, 2.4, -0.013, 1235000.0]])
+
+def test_float32_frames_are_rounded_per_value():
+    z = np.array([[2000.0, 0.1, 3e-5]], dtype=np.float32)
+    np.testing.assert_allclose(quantize_frame(z, 2000.0), [[2000.0, 0.1, 3e-5]], rtol=1e-7, atol=0)
+
+def test_uint8_quantization_uses_the_full_range():
+    z = np.array([[0.0, 0.5, 1.0, 3.0]])
+    np.testing.assert_array_equal(quantize_frame(z, 1.0, "uint8"), [[0, 128, 255, 255]])
+
+def test_probe_and_transect_csv_layout():
+    params, args = setup_run()
+    c0, P, R, u, v, delta_x, delta_y, delta_t, xt, yt = args
+    x = np.arange(c0.shape[0]) * delta_x
+    y = np.arange(c0.shape[1]) * delta_y
+    result = {}
+    analyze(params['t'], c0.copy(), *args[1:], probes=[(5, 5), (20, 15)], transect_steps=[0, 30, 60],
+            transects=[{'kind': "polyline", 'points': [(2, 3), (30, 20)], 'name': "bend"}], result=result)
+    probe_history, probe_points = get_probe_result(result)
+    labels = get_probe_labels(probe_points, x, y)
+    lines = probes_to_csv(delta_t, probe_history, labels).splitlines()
+    assert lines[0] == ",".join(['time_s'] + [f'"{label}"' for label in labels])
+    assert len(lines) == params['t'] + 2
+    table = np.loadtxt(lines[1:], delimiter=",")
+    np.testing.assert_allclose(table[:, 0], np.arange(params['t'] + 1) * delta_t)
+    np.testing.assert_allclose(table[:, 1:], probe_history)
+
+    transect = result['transects'][1]
+    lines = transect_to_csv(transect, x, y, delta_t).splitlines()
+    assert lines[0].split(",") == ['x_m', 'y_m', 'distance_m'] + [f"t_{step * delta_t:.4f}s" for step in (0, 30, 60)]
+    assert len(lines) == len(transect['cells'][0]) + 1
+    table = np.loadtxt(lines[1:], delimiter=",")
+    np.testing.assert_allclose(table[:, 0], x[transect['cells'][0]])
+    np.testing.assert_allclose(table[:, 1], y[transect['cells'][1]])
+    assert table[0, 2] == 0 and np.all(np.diff(table[:, 2]) > 0)
+    np.testing.assert_allclose(table[:, 3:], transect['values'][:3].T)
@@ -0,0 +1,47 @@
+import numpy as np
+
+from core import DEFAULT_PARAMS, run_simulation, get_fields, get_x_y_input, analyze, check_params
+from superposition import ResponseLibrary, convolve_schedule, get_schedule
+
+PARAMS = dict(DEFAULT_PARAMS, grid_x=40, grid_y=30, t=60, x0=200, y0=500, xt=400, yt=500, snapshot_every=5)
+
+def test_single_release_matches_a_direct_run():
+    # run biasa mengganti sel pelepasan dengan m / Q, setara dengan massa m - c_in Q di library
+    library = ResponseLibrary(PARAMS, sources=[(PARAMS['x0'], PARAMS['y0'])])
+    result = library.superpose([{'source': 0, 'mass': PARAMS['m'] - PARAMS['c_in'] * PARAMS['Q']}])
+    _, (frames, c_history, _, steps) = run_simulation(PARAMS)
+    scale = np.abs(np.asarray(frames)).max()
+    assert list(result['steps']) == list(steps)
+    np.testing.assert_allclose(result['frames'], np.asarray(frames), rtol=0, atol=1e-10 * scale)
+    np.testing.assert_allclose(result['probe_history'][:, 0], c_history, rtol=0, atol=1e-10 * scale)
+
+def test_two_sources_match_a_direct_run_with_both_releases():
+    sources = [(200, 500), (300, 200)]
+    library = ResponseLibrary(PARAMS, sources=sources)
+    result = library.superpose([{'source': 0, 'mass': 2000.0}, {'source': 1, 'mass': 500.0}], c_in=0.0)
+    x, y, delta_x, delta_y, u, v, P, R = get_fields(PARAMS)
+    delta_t = check_params(PARAMS)[3]
+    c0 = np.zeros((len(x), len(y)))
+    for (px, py), mass in zip(sources, (2000.0, 500.0)):
+        _, _, i, j, _, _, xt, yt = get_x_y_input(x, px, y, py, PARAMS['xt'], PARAMS['yt'])
+        c0[i, j] += mass / PARAMS['Q']
+    frames, c_history, _, _ = analyze(PARAMS['t'], c0, P, R, u, v, delta_x, delta_y, delta_t, xt, yt, snapshot_every=5)
+    scale = np.abs(np.asarray(frames)).max()
+    np.testing.assert_allclose(result['frames'], np.asarray(frames), rtol=0, atol=1e-10 * scale)
+    np.testing.assert_allclose(result['probe_history'][:, 0], c_history, rtol=0, atol=1e-10 * scale)
+
+def test_delayed_release_shifts_the_response():
+    library = ResponseLibrary(PARAMS, sources=[(200, 500)])
+    now = library.superpose([{'source': 0, 'mass': 1000.0}], c_in=0.0)
+    later = library.superpose([{'source': 0, 'mass': 1000.0, 'step': 10}], c_in=0.0)
+    np.testing.assert_allclose(later['probe_history'][10:], now['probe_history'][:-10], rtol=1e-12, atol=1e-15)
+    assert (later['probe_history'][:10] == 0).all()
+    # step pelepasan kelipatan snapshot_every: frame eksak, frame step 15 = frame respons lag 5
+    np.testing.assert_allclose(later['frames'][3], now['frames'][1], rtol=1e-12, atol=1e-15)
+
+def test_fft_and_direct_convolution_agree():
+    rng = np.random.default_rng(0)
+    schedule = get_schedule({'rate': 2.0, 'start': 0.0, 'stop': 40.0}, 200, 1.0, 5.0)
+    response = rng.normal(size=(201, 3))
+    np.testing.assert_allclose(convolve_schedule(schedule, response, "fft"), convolve_schedule(schedule, response, "direct"), atol=1e-12)
+    assert np.count_nonzero(schedule) == 40 and np.isclose(schedule.sum(), 2.0 * 40 / 5.0)
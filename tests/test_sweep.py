@@ -0,0 +1,42 @@
+import json
+
+from core import DEFAULT_PARAMS
+from sweep import RESULT_COLUMNS, case_key, expand_grid, load_results, run_sweep, write_table
+
+BASE = dict(DEFAULT_PARAMS, grid_x=20, grid_y=20, t=20, x0=200, y0=500, xt=400, yt=500)
+
+def read_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def test_expand_grid_is_a_cartesian_product():
+    cases = expand_grid({'t': [10, 20], 'u0': [0.1, 0.2, 0.3]}, BASE)
+    assert len(cases) == 6
+    assert {(case['t'], case['u0']) for case in cases} == {(t, u0) for t in (10, 20) for u0 in (0.1, 0.2, 0.3)}
+    assert all(case['grid_x'] == 20 for case in cases)
+
+def test_resume_skips_finished_cases(tmp_path):
+    results_path = str(tmp_path / "sweep.jsonl")
+    first = expand_grid({'u0': [0.1, 0.2]}, BASE)
+    rows = run_sweep(first, max_workers=1, results_path=results_path)
+    assert [row['case'] for row in rows] == [case_key(case) for case in first]
+    assert all(row['stable'] and not row['skipped'] for row in rows)
+    assert len(read_lines(results_path)) == 2
+
+    # sweep dilanjutkan dengan satu case baru: hanya case itu yang dijalankan dan ditambahkan ke file
+    second = expand_grid({'u0': [0.1, 0.2, 0.3]}, BASE)
+    resumed = run_sweep(second, max_workers=1, results_path=results_path)
+    lines = read_lines(results_path)
+    assert len(lines) == 3
+    assert lines[2]['case'] == case_key(second[2])
+    assert resumed[:2] == rows
+    assert set(load_results(results_path)) == {case_key(case) for case in second}
+
+def test_write_table_has_one_row_per_case(tmp_path):
+    cases = expand_grid({'u0': [0.1, 0.2]}, BASE)
+    rows = run_sweep(cases, max_workers=1)
+    write_table(rows, str(tmp_path / "sweep.csv"))
+    with open(tmp_path / "sweep.csv") as f:
+        lines = f.read().splitlines()
+    assert lines[0].split(",") == RESULT_COLUMNS
+    assert len(lines) == 3
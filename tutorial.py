@@ -31,7 +31,7 @@ STEPS = [
     },
     {
         "title": "Iteration", 
-        "text": "t is the number of iterations or time steps. If the t value is too big you might need to wait longer for the plot to finish rendering."
+        "text": "t is the number of iterations or time steps. If the t value is too big you might need to wait longer for the plot to finish rendering. The animation frame interval keeps only every N-th iteration for the animation, which saves memory on long runs."
     },
     {
         "title": "Analyze and Run Simulation", 
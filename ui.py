@@ -50,6 +50,38 @@ def show_sidebar_menu():
                 st.session_state.show_tutorial = True
         
 
+def parse_point(text):
+    px, py = (float(value) for value in text.split(","))
+    return [px, py]
+
+def parse_monitoring(probe_text, transect_text):
+    # titik pantau: satu "x, y" per baris
+    # transect: "y = 500" (sepanjang x), "x = 300" (melintang sungai) atau "x1, y1; x2, y2; ..." (polyline)
+    probes, transects, invalid = [], [], []
+    for line in probe_text.splitlines():
+        if line.strip():
+            try:
+                probes.append(parse_point(line))
+            except ValueError:
+                invalid.append(line.strip())
+    for line in transect_text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            if line.replace(" ", "").startswith("y="):
+                transects.append({'kind': "row", 'y': float(line.split("=")[1])})
+            elif line.replace(" ", "").startswith("x="):
+                transects.append({'kind': "column", 'x': float(line.split("=")[1])})
+            else:
+                points = [parse_point(point) for point in line.split(";") if point.strip()]
+                if len(points) < 2:
+                    raise ValueError(line)
+                transects.append({'kind': "polyline", 'points': points})
+        except ValueError:
+            invalid.append(line)
+    return probes, transects, invalid
+
 def render_input_panel():
     col1, col2 = st.columns(2)
     ss2 = "\u00B2"
@@ -82,6 +114,48 @@ def render_input_panel():
         with col2_2:
             params['v0'] = st.number_input("Initial Velocity v0 for Y axis (m/s)", min_value=0.0, max_value=100.0, value=0.02, step=0.01, format="%.2f")
         params['t'] = st.number_input("Iterations", min_value=1, max_value=4000, value=100)
+        params['snapshot_every'] = st.number_input("Animation Frame Interval (iterations)", min_value=1, max_value=4000, value=None, placeholder="automatic",
+                                                   help="leave empty to keep about as many frames as the Maximum Animation Frames option, 1 keeps every iteration")
+        solvers = {"FTCS (explicit)": "ftcs", "ADI (implicit diffusion)": "adi", "Analytical (Gaussian puff, a = b = 0)": "analytic"}
+        solver_label = st.selectbox("Numerical Scheme", list(solvers), help="The analytical solution evaluates any time directly without iterating. It needs uniform velocity and diffusion (a = b = 0).")
+        params['solver'] = solvers[solver_label]
+        if params['solver'] == "analytic" and (params['a'] != 0 or params['b'] != 0):
+            st.warning("The analytical solution needs a = 0 and b = 0.")
+        params['backend'] = st.selectbox("Compute Backend", ["numpy", "numba"], help="numba is optional and only used by the FTCS scheme. If it is not installed, numpy is used.")
+        params['dtype'] = st.selectbox("Numerical Precision", ["float64", "float32"], help="float32 halves the memory use and is faster on large grids, with about 6 significant digits")
+        params['active_region'] = st.checkbox("Only update the region reached by the pollutant", value=False, help="FTCS only. Cells that still hold the background concentration are skipped until the pollutant reaches them, with identical results. This speeds up the early iterations on large grids when the background concentration is 0 or the velocity is uniform (a = b = 0).")
+        params['live'] = st.checkbox("Show live progress while simulating", value=True)
+        params['save_run'] = st.checkbox("Save run to disk (runs folder)", value=False)
+        params['profile'] = st.checkbox("Show performance details", value=False, help="shows the time spent in every stage of the run")
+        params['profile_memory'] = params['profile'] and st.checkbox("Record memory allocations", value=False, help="uses Python memory tracing, which makes the run several times slower")
+        with st.expander("Early stopping"):
+            stop_criteria = {}
+            if st.checkbox("Stop when the field stops changing"):
+                stop_criteria['steady_tol'] = st.number_input(f"Steady-State Tolerance (kg/m{ss3} per step)", min_value=0.0, value=1e-4, format="%.6f")
+                stop_criteria['steady_steps'] = st.number_input("Consecutive Steady Steps", min_value=1, max_value=1000, value=10)
+            if st.checkbox("Stop when the plume has left the river section"):
+                stop_criteria['mass_fraction'] = st.number_input("Remaining Mass Fraction", min_value=0.0, max_value=1.0, value=0.05, step=0.01, format="%.2f")
+            if st.checkbox("Stop when the target concentration has peaked and decayed"):
+                stop_criteria['target_threshold'] = st.number_input(f"Target Threshold above Background (kg/m{ss3})", min_value=0.0, value=0.1, format="%.4f")
+            params['stop_criteria'] = stop_criteria or None
+        with st.expander("Monitoring points and transects"):
+            probe_text = st.text_area("Monitoring Points (one \"x, y\" per line, in meters)", placeholder="200, 500\n600, 450")
+            transect_text = st.text_area("Transects (one per line, in meters)", placeholder="y = 500\nx = 300\n0, 500; 400, 300; 1000, 500",
+                                         help="\"y = 500\" records the concentration along the river at y = 500, \"x = 300\" records it across the river at x = 300, and a list of \"x, y\" points separated by semicolons records it along that polyline.")
+            probes, transects, invalid = parse_monitoring(probe_text, transect_text)
+            if invalid:
+                st.warning("These lines could not be read and are ignored: " + ", ".join(invalid))
+            params['probes'] = probes or None
+            params['transects'] = transects or None
+        with st.expander("Animation options"):
+            params['max_frames'] = st.number_input("Maximum Animation Frames", min_value=2, max_value=4001, value=200)
+            params['frame_sampling'] = st.selectbox("Frame Sampling", ["uniform", "adaptive"], help="adaptive keeps more frames where the concentration changes the most")
+            params['max_cells'] = st.number_input("Maximum Display Cells per Axis", min_value=10, max_value=300, value=150)
+            params['quantize'] = st.selectbox("Animation Precision", ["uint8", "float16", "full"], help="lower precision makes the animation and the HTML download much smaller")
+        with st.expander("Chart options"):
+            params['chart_points'] = st.number_input("Maximum Points per Chart Line", min_value=100, max_value=20000, value=1600, help="long histories are reduced to about this many points before plotting, the PNG downloads use the same points")
+            decimations = {"Min-max (keeps every peak)": "minmax", "LTTB (smoother shape)": "lttb"}
+            params['chart_decimation'] = decimations[st.selectbox("Point Reduction", list(decimations))]
         params['Q'] = st.number_input(f"Volumetric Flow Rate Q (m{ss3}/s)", min_value=0.0001, max_value=1000.0, value=5.0)
         col2_3, col2_4 = st.columns(2)
         with col2_3:
@@ -97,6 +171,8 @@ def render_help():
     st.write("This menu is used to provide an explanation of how the model works and the meaning of each parameter available in the Analyze menu.")
     st.subheader("Forward Time Centered Space")
     st.write("FTCS (Forward Time–Central Space) scheme is a simple numerical method used to estimate how something changes over time and space. In the context of a river, it helps us predict how pollution moves and spreads by updating the pollutant concentration step by step: moving forward in time and looking at differences between neighboring points along the river. \n\nWhen applied to pollutant transport, FTCS works by dividing the river into small segments (grids) and repeatedly calculating how the pollutant drifts downstream with the flow and spreads out naturally. By running these calculations many times, we can simulate how the pollutant moves, how quickly it spreads, and how its concentration changes over time.")
+    st.subheader("Alternating Direction Implicit")
+    st.write("The ADI (Alternating Direction Implicit) scheme is an alternative to FTCS. Each time step is split into two halves: the first half treats the x-direction implicitly and the y-direction explicitly, the second half does the opposite. Each half only needs a simple tridiagonal solve along one direction. Because diffusion is treated implicitly, the time step is no longer limited by the diffusion stability condition, only by the advection (CFL) condition. This allows much larger time steps, so the same number of iterations covers a much longer simulated time on fine grids or with strong diffusion.")
     st.subheader("Parameters Explanation")
     st.subheader("Grid & Domain")
     st.write("The X and Y grid numbers define how many grid points are used along the river\'s length and width; higher values produce a finer spatial discretization and improved accuracy, at the expense of greater computational cost. The lengths of X and Y represent the physical dimensions of the observed river domain in meters and are used to compute the grid spacing.")
@@ -111,7 +187,7 @@ def render_help():
     st.subheader("Pollutant Injection & Flow")
     st.write("The parameter (m) represents the total mass of pollutant injected into the river, while (Q) denotes the volumetric flow rate associated with the injection process. Together, these parameters determine the initial strength and distribution of the pollutant source in the model. A larger injected mass results in higher initial pollutant concentrations, while the flow rate influences how the pollutant is introduced into the river system and affects its initial dilution and transport behavior.")
     st.subheader("Iteration")
-    st.write("t is the number of iterations or time steps. Concentration for each time step will be calculated based on the forward time and centered space scheme. The pollutant dispersion will be simulated and animated after the calculation has finished.")
+    st.write("t is the number of iterations or time steps. Concentration for each time step will be calculated based on the forward time and centered space scheme. The pollutant dispersion will be simulated and animated after the calculation has finished. The animation frame interval controls how often a frame is kept for the animation: with an interval of N, only every N-th iteration (plus the first and last) is stored, so long runs on fine grids use far less memory.")
     st.subheader("Injection and Target Point")
     st.write("The pollutant injection coordinate specifies the location where the pollutant is released into the river, while the target coordinate represents the point of interest where the pollutant concentration is observed and plotted. The application discretizes the river domain by automatically dividing the x- and y-directions into a fixed number of grid cells. As a result, the exact release and target coordinates entered by the user may not coincide exactly with the grid points used in the numerical model. To address this, the program automatically identifies and uses the grid points closest to the specified release and target locations.")
 